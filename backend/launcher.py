@@ -0,0 +1,432 @@
+"""
+Multi-worker Launcher
+Runs several server processes so one founder's turn is not queued behind
+everyone else's JSON and base64 work on a single core.
+
+Modes (WORKER_MODE):
+- sticky:    each worker listens on a loopback port and the launcher owns PORT,
+             proxying every connection to a worker. Session IDs and resume tokens
+             start with the worker ID, so a reconnect (?resume=...), a spectator
+             with ?token=... or a report request (connection_id in the JSON
+             body) goes back to the worker holding the session. The worker is
+             picked per request: plain HTTP requests are sent upstream with
+             Connection: close, so a keep-alive client's next request (say a
+             report after loading the page) is routed on its own.
+             New connections go to the worker with the fewest open connections.
+- shared:    uvicorn's own multi-process mode, all workers accept from one socket.
+- reuseport: every worker binds PORT with SO_REUSEPORT and the kernel spreads
+             connections (Linux only).
+shared and reuseport have no session affinity - a reconnect that lands on
+another worker starts a fresh session.
+
+Draining: SIGHUP replaces the workers one at a time. The replacement takes new
+sessions while the old worker keeps its open connections (and resumes of its
+sessions) until they close or DRAIN_TIMEOUT passes. Sessions with no open
+socket at that point are not carried over. SIGTERM/SIGINT stop accepting,
+drain every worker and exit.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from backend.logging_config import setup_logging, shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = "backend.main:app"
+
+# Longest request head the proxy reads before picking a worker
+MAX_HEAD_BYTES = 16384
+PIPE_CHUNK = 65536
+# POST endpoints that name their session in the JSON body (connection_id), not the query
+BODY_SESSION_PATHS = {"/api/generate-report", "/api/pre-score"}
+# Larger bodies are not read before picking a worker (they go to the least loaded one)
+MAX_BODY_PEEK_BYTES = 1024 * 1024
+
+
+def worker_id_of(token: Optional[str]) -> Optional[str]:
+    """Worker ID prefix of a session ID or resume token ("w3.abc..." -> "w3")"""
+    if not token or "." not in token:
+        return None
+    return token.split(".", 1)[0]
+
+
+class Worker:
+    """One uvicorn process behind the sticky proxy"""
+
+    def __init__(self, worker_id: str, port: int):
+        self.worker_id = worker_id
+        self.port = port
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.connections = 0
+        self.assigned = 0  # New connections routed here - breaks ties between idle workers
+        self.draining = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def spawn(self):
+        env = dict(os.environ, WORKER_ID=self.worker_id)
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", APP,
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "--timeout-graceful-shutdown", str(int(config.DRAIN_TIMEOUT)),
+            cwd=PROJECT_ROOT,
+            env=env,
+        )
+
+    async def wait_ready(self, timeout: float = 60.0) -> bool:
+        """Wait until the worker accepts connections"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.alive:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+                writer.close()
+                return True
+            except OSError:
+                await asyncio.sleep(0.2)
+        return False
+
+    async def stop(self):
+        """SIGTERM (uvicorn finishes in-flight requests), then SIGKILL if it hangs"""
+        if not self.alive:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), config.DRAIN_TIMEOUT + 5)
+        except asyncio.TimeoutError:
+            logger.warning("Worker %s did not exit - killing it", self.worker_id)
+            self.process.kill()
+            await self.process.wait()
+
+
+class StickyLauncher:
+    def __init__(self, host: str, port: int, workers: int, port_base: int):
+        self.host = host
+        self.port = port
+        self.size = max(1, workers)
+        self.workers: Dict[str, Worker] = {}
+        self._ids = itertools.count(1)
+        self._ports = itertools.count(port_base)
+        self._stopping = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # --- worker lifecycle ------------------------------------------------
+
+    async def _start_worker(self) -> Optional[Worker]:
+        worker = Worker(f"w{next(self._ids)}", next(self._ports))
+        await worker.spawn()
+        if not await worker.wait_ready():
+            logger.error("Worker %s failed to start", worker.worker_id)
+            await worker.stop()
+            return None
+        self.workers[worker.worker_id] = worker
+        self._tasks.append(asyncio.create_task(self._supervise(worker)))
+        logger.info("🚀 Worker %s ready on port %d (pid %d)", worker.worker_id, worker.port, worker.process.pid)
+        return worker
+
+    async def _supervise(self, worker: Worker):
+        """Replace a worker that exits on its own"""
+        await worker.process.wait()
+        self.workers.pop(worker.worker_id, None)
+        if self._stopping or worker.draining:
+            return
+        logger.error("Worker %s exited with code %s - replacing it", worker.worker_id, worker.process.returncode)
+        while not self._stopping and await self._start_worker() is None:
+            await asyncio.sleep(5)
+
+    async def _drain(self, worker: Worker):
+        """Stop routing new sessions to a worker, wait for its connections, then stop it"""
+        worker.draining = True
+        deadline = time.monotonic() + config.DRAIN_TIMEOUT
+        while worker.connections and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        if worker.connections:
+            logger.warning("Worker %s still has %d connection(s) after draining", worker.worker_id, worker.connections)
+        await worker.stop()
+        self.workers.pop(worker.worker_id, None)
+        logger.info("🛑 Worker %s stopped", worker.worker_id)
+
+    async def reload(self):
+        """Rolling restart - each worker is replaced before the old one drains"""
+        logger.info("🔄 Rolling restart of %d worker(s)", self.size)
+        for old in [w for w in self.workers.values() if not w.draining]:
+            if self._stopping:
+                return
+            if await self._start_worker() is None:
+                logger.error("Replacement for worker %s failed - keeping it", old.worker_id)
+                continue
+            self._tasks.append(asyncio.create_task(self._drain(old)))
+
+    async def shutdown(self):
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info("Draining %d worker(s) before exit", len(self.workers))
+        if self._server is not None:
+            self._server.close()
+        await asyncio.gather(*(self._drain(w) for w in list(self.workers.values())))
+
+    # --- proxy -----------------------------------------------------------
+
+    @staticmethod
+    async def _read_body(head: bytes, reader: asyncio.StreamReader) -> bytes:
+        """Body of a report request, read ahead so its connection_id can pick the worker"""
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) < 2 or parts[0] != "POST" or urlsplit(parts[1]).path not in BODY_SESSION_PATHS:
+            return b""
+        length = 0
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip()) if value.strip().isdigit() else 0
+        if not 0 < length <= MAX_BODY_PEEK_BYTES:
+            return b""
+        return await asyncio.wait_for(reader.readexactly(length), timeout=30)
+
+    @staticmethod
+    def _rewrite_head(head: bytes, client_ip: Optional[str]) -> bytes:
+        """Head as sent upstream - one request per connection, and the client address appended to X-Forwarded-For"""
+        lines = head.decode("latin-1").split("\r\n")[:-2]
+        forwarded = []
+        upgrade = False
+        kept = [lines[0]]
+        for line in lines[1:]:
+            name = line.partition(":")[0].strip().lower()
+            value = line.partition(":")[2].strip()
+            if name == "x-forwarded-for":
+                forwarded.append(value)
+                continue
+            if name == "upgrade":
+                upgrade = True
+            elif name in ("connection", "keep-alive"):
+                continue
+            kept.append(line)
+        # WebSockets keep their socket; anything else is answered and closed, and the next request picks again
+        kept.append("Connection: Upgrade" if upgrade else "Connection: close")
+        # Appended, never trusted as sent - uvicorn believes this header from 127.0.0.1
+        if client_ip:
+            forwarded.append(client_ip)
+        if forwarded:
+            kept.append("X-Forwarded-For: " + ", ".join(forwarded))
+        return ("\r\n".join(kept) + "\r\n\r\n").encode("latin-1")
+
+    def _pick(self, head: bytes, body: bytes = b"") -> Optional[Worker]:
+        request_line = head.split(b"\r\n", 1)[0].decode("latin-1")
+        parts = request_line.split(" ")
+        tokens = []
+        if len(parts) >= 2:
+            params = parse_qs(urlsplit(parts[1]).query)
+            tokens = [params.get(name, [None])[0] for name in ("resume", "token")]
+        if body:
+            try:
+                tokens.append(json.loads(body).get("connection_id"))
+            except (ValueError, AttributeError):
+                pass
+        for token in tokens:
+            worker = self.workers.get(worker_id_of(token if isinstance(token, str) else None))
+            if worker is not None and worker.alive:
+                # Draining workers still take back their own sessions
+                return worker
+        candidates = [w for w in self.workers.values() if w.alive and not w.draining]
+        if not candidates:
+            return None
+        worker = min(candidates, key=lambda w: (w.connections, w.assigned))
+        worker.assigned += 1
+        return worker
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                data = await reader.read(PIPE_CHUNK)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        try:
+            head = await asyncio.wait_for(client_reader.readuntil(b"\r\n\r\n"), timeout=30)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            client_writer.close()
+            return
+        try:
+            body = await self._read_body(head, client_reader)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            client_writer.close()
+            return
+
+        worker = self._pick(head, body)
+        if worker is None:
+            client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            client_writer.close()
+            return
+
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", worker.port)
+        except OSError as e:
+            logger.error("Could not reach worker %s: %s", worker.worker_id, e)
+            client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            client_writer.close()
+            return
+
+        # Let the worker log the real client address
+        peer = client_writer.get_extra_info("peername")
+        head = self._rewrite_head(head, peer[0] if peer else None)
+
+        worker.connections += 1
+        try:
+            upstream_writer.write(head + body)
+            await asyncio.gather(
+                self._pipe(client_reader, upstream_writer),
+                self._pipe(upstream_reader, client_writer),
+            )
+        finally:
+            worker.connections -= 1
+
+    # --- entry point -----------------------------------------------------
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+
+        async def stop():
+            await self.shutdown()
+            stopped.set()
+
+        for _ in range(self.size):
+            if await self._start_worker() is None:
+                await stop()
+                raise RuntimeError("Worker failed to start")
+
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEAD_BYTES)
+        logger.info("🔀 Sticky proxy listening on %s:%d with %d worker(s)", self.host, self.port, self.size)
+
+        loop.add_signal_handler(signal.SIGHUP, lambda: self._tasks.append(asyncio.create_task(self.reload())))
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, lambda: self._tasks.append(asyncio.create_task(stop())))
+
+        await stopped.wait()
+
+
+# --- reuseport mode ------------------------------------------------------
+
+def _serve_reuseport(worker_id: str, host: str, port: int, ready=None):
+    """Worker process entry point - bind PORT alongside the other workers, set ready once serving"""
+    import uvicorn
+
+    class Server(uvicorn.Server):
+        async def startup(self, sockets=None):
+            # Lifespan startup has run and the socket is listening
+            await super().startup(sockets=sockets)
+            if self.started and ready is not None:
+                ready.set()
+
+    os.environ["WORKER_ID"] = worker_id
+    config.WORKER_ID = worker_id
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    server = Server(uvicorn.Config(APP, timeout_graceful_shutdown=int(config.DRAIN_TIMEOUT)))
+    server.run(sockets=[sock])
+
+
+def _run_reuseport(host: str, port: int, workers: int):
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("WORKER_MODE=reuseport needs SO_REUSEPORT (Linux)")
+
+    context = multiprocessing.get_context("spawn")
+    ids = itertools.count(1)
+    signals: List[int] = []
+
+    def start(ready=None):
+        process = context.Process(target=_serve_reuseport, args=(f"w{next(ids)}", host, port, ready))
+        process.start()
+        return process
+
+    def start_ready(timeout: float = 60.0):
+        """Start a worker and wait until it serves - None if it failed to start"""
+        ready = context.Event()
+        process = start(ready)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and process.is_alive():
+            if ready.wait(0.2):
+                return process
+        process.terminate()
+        process.join(5)
+        return None
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(sig, lambda signum, frame: signals.append(signum))
+
+    processes = [start() for _ in range(workers)]
+    logger.info("🔀 %d reuseport worker(s) listening on %s:%d", workers, host, port)
+    while True:
+        time.sleep(0.5)
+        # Reap workers that exited after being replaced
+        multiprocessing.active_children()
+        if signals:
+            signum = signals.pop(0)
+            if signum == signal.SIGHUP:
+                # Each replacement serves before the old worker stops, so the port never stops accepting
+                replaced = 0
+                for i, old in enumerate(processes):
+                    new = start_ready()
+                    if new is None:
+                        logger.error("Replacement worker failed to start - keeping the old one")
+                        continue
+                    processes[i] = new
+                    old.terminate()
+                    replaced += 1
+                logger.info("🔄 Replaced %d of %d reuseport worker(s)", replaced, workers)
+                continue
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join(config.DRAIN_TIMEOUT + 5)
+            return
+        for i, process in enumerate(processes):
+            if process.exitcode is not None and process.exitcode != 0 and not signals:
+                logger.error("Worker exited with code %s - replacing it", process.exitcode)
+                processes[i] = start()
+
+
+def run_workers(host: str, port: int, workers: int, mode: str):
+    """Run `workers` server processes on host:port using the given WORKER_MODE"""
+    setup_logging()
+    try:
+        if mode == "shared":
+            import uvicorn
+            uvicorn.run(APP, host=host, port=port, workers=workers,
+                        timeout_graceful_shutdown=int(config.DRAIN_TIMEOUT))
+        elif mode == "reuseport":
+            _run_reuseport(host, port, workers)
+        elif mode == "sticky":
+            asyncio.run(StickyLauncher(host, port, workers, config.WORKER_PORT_BASE).run())
+        else:
+            raise ValueError(f"Unknown WORKER_MODE: {mode}")
+    finally:
+        shutdown_logging()
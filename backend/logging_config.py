@@ -0,0 +1,173 @@
+"""
+Structured, non-blocking logging
+- Records are handed to a queue and written by a background listener thread,
+  so the event loop never waits on stderr
+- JSON output carries the session and turn IDs of the task that logged
+- Hot-path debug events (extra=HOT) are sampled per session, so a sampled
+  session produces a complete trace and the rest produce nothing
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import zlib
+from typing import Optional
+
+import config
+
+# Pass as extra= on per-frame / per-chunk debug logs so they go through sampling
+HOT = {"hot": True}
+
+_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("log_session_id", default=None)
+_turn_id: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("log_turn_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Attributes every LogRecord has - anything else came in through extra=
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "hot"}
+
+
+def bind_session(session_id: Optional[str]):
+    """Tag every log from the current task with this session ID"""
+    _session_id.set(session_id)
+    _turn_id.set(None)
+
+
+def current_session() -> Optional[str]:
+    """Session ID bound to the current task, if any"""
+    return _session_id.get()
+
+
+def bind_turn(turn_id: Optional[int]):
+    """Tag every log from the current task with this turn number"""
+    _turn_id.set(turn_id)
+
+
+class ContextFilter(logging.Filter):
+    """Copy session/turn IDs onto the record while still in the logging task"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = _session_id.get()
+        record.turn_id = _turn_id.get()
+        return True
+
+
+class SessionSampler(logging.Filter):
+    """
+    Drop hot-path records unless the session is sampled.
+    The decision is a stable hash of the session ID, so a sampled session
+    keeps all of its hot events.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 10000)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "hot", False):
+            return True
+        if self.threshold >= 10000:
+            return True
+        if self.threshold <= 0:
+            return False
+        session_id = getattr(record, "session_id", None) or ""
+        return zlib.crc32(session_id.encode()) % 10000 < self.threshold
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "session_id", None):
+            entry["session_id"] = record.session_id
+        if getattr(record, "turn_id", None) is not None:
+            entry["turn_id"] = record.turn_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and key not in ("session_id", "turn_id") and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable format for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(context)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        context = ""
+        if getattr(record, "session_id", None):
+            context = f" [{record.session_id}"
+            if getattr(record, "turn_id", None) is not None:
+                context += f"#{record.turn_id}"
+            context += "]"
+        record.context = context
+        return super().format(record)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps extra fields and exception text for the listener"""
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        # Never block the caller - drop the record if the writer has fallen behind
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message here (args may be mutable), but leave formatting
+        # of the final line to the listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(stream=None):
+    """Route all logging through a queue to a background writer thread (stderr by default)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    level = getattr(logging, config.LOG_LEVEL.upper(), logging.INFO)
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SessionSampler(config.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records - call once on application shutdown"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,12 +1,15 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, Response
 from pathlib import Path
+from contextlib import asynccontextmanager
 import json
 import asyncio
 import logging
-from typing import Dict
+import secrets
+import time
+from typing import Dict, Optional
 
 import sys
 from pathlib import Path
@@ -17,15 +20,85 @@ sys.path.insert(0, str(project_root))
 
 from backend.services.vc_agent import VCAgent
 from backend.services.audio_handler import AudioHandler
-from backend.services.heygen_handler import HeyGenHandler
-from backend.services.did_handler import DIDHandler
+from backend.services.avatar_pool import avatar_pool
 from backend.services.report_generator import ReportGenerator
+from backend.services.rate_limiter import (
+    admission_controller,
+    set_queue_notifier,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_REPORT,
+)
+from backend.services.transcript_journal import transcript_journal
+from backend.services.session_manager import Session, session_manager, CLOSE_SUPERSEDED
+from backend.services.spectators import spectator_hub
+from backend.services.profiler import run_profile
+from backend.services.loop_watchdog import loop_watchdog
+from backend.services.metrics import metrics
+from backend.services.usage_tracker import usage_tracker
+from backend.services.model_router import model_router
+from backend.services.key_pool import key_pools
+from backend.services.report_store import report_store
+from backend.static_assets import StaticAssets, load_static_assets
+from backend.logging_config import setup_logging, shutdown_logging, bind_session, bind_turn, HOT
 import config
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="VC Investor Voice Agent")
+# Fixed lines - synthesized once at startup and shared by every session
+WELCOME_TEXT = "Alright, pitch me. What's your startup?"
+ERROR_TEXT = "Sorry, I'm having technical difficulties. Let me try again - what's your startup about?"
+
+async def prewarm_phrases():
+    try:
+        await AudioHandler().prewarm([WELCOME_TEXT, ERROR_TEXT])
+    except Exception as e:
+        logger.warning("TTS phrase pre-warming skipped: %s", e)
+
+def load_frontend():
+    """Build and load the optimized frontend - plain files keep being served if this fails"""
+    global static_assets
+    if not config.STATIC_ASSETS_OPTIMIZED:
+        return
+    try:
+        static_assets = load_static_assets(build=config.ASSET_BUILD_ON_START)
+    except Exception as e:
+        logger.error("Error building frontend assets, serving plain files: %s", e, exc_info=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Here rather than at import - importing the app must not write to frontend/dist
+    await asyncio.to_thread(load_frontend)
+    # Background services live for the whole worker process
+    if config.TRANSCRIPT_ENABLED:
+        await transcript_journal.start()
+    if config.REPORT_STORE_ENABLED:
+        try:
+            report_store.open()
+        except Exception as e:
+            logger.error("Report store unavailable, reports will not be kept: %s", e)
+    await session_manager.start()
+    if config.LOOP_WATCHDOG_ENABLED:
+        await loop_watchdog.start()
+    if avatar_pool is not None:
+        await avatar_pool.start()
+    # In the background - sessions that start first just synthesize the line themselves
+    prewarm_task = asyncio.create_task(prewarm_phrases()) if config.ELEVENLABS_API_KEY else None
+    yield
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+    await loop_watchdog.close()
+    if avatar_pool is not None:
+        for session in list(session_manager.sessions.values()):
+            avatar_pool.release(session.avatar_session)
+        await avatar_pool.close()
+    await session_manager.close()
+    # Flush buffered transcript entries, stored reports and log records before the process exits
+    await transcript_journal.close()
+    report_store.close()
+    shutdown_logging()
+
+app = FastAPI(title="VC Investor Voice Agent", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -36,89 +109,183 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store active connections
-active_connections: Dict[str, Dict] = {}
+# Store active connections (session id -> Session)
+active_connections: Dict[str, Session] = session_manager.sessions
 
-# Serve static files
+def release_session(session: Session):
+    """Session released for good - end its avatar stream and close its usage account"""
+    if avatar_pool is not None:
+        avatar_pool.release(session.avatar_session)
+    usage_tracker.release(session.session_id)
+    spectator_hub.close_room(session.session_id)
+
+session_manager.on_remove = release_session
+
+# Serve static files - the optimized build once the lifespan has loaded it, plain files otherwise
 frontend_path = Path(__file__).parent.parent / "frontend"
-app.mount("/static", StaticFiles(directory=str(frontend_path)), name="static")
+plain_files = StaticFiles(directory=str(frontend_path))
+static_assets: Optional[StaticAssets] = None
+
+turn_playback_seconds = metrics.histogram(
+    "turn_playback_seconds",
+    "Founder transcript received until the VC reply starts playing in the browser (includes the report back)",
+    buckets=(0.5, 0.75, 1, 1.5, 2, 2.5, 3, 4, 5, 7.5, 10, 15),
+)
+client_audio_delay_seconds = metrics.histogram(
+    "client_audio_delay_seconds",
+    "Audio frame arrival until playback start in the browser (decode and queueing)",
+)
+
+page_load_seconds = metrics.histogram(
+    "page_load_seconds",
+    "Time from navigation until the first pitch can start (WebSocket open), as reported by the browser",
+    buckets=(0.25, 0.5, 1, 1.5, 2, 3, 5, 8, 13, 20),
+)
 
 @app.get("/")
-async def read_root():
-    return FileResponse(str(frontend_path / "index.html"))
+async def read_root(request: Request):
+    if static_assets is None:
+        return FileResponse(str(frontend_path / "index.html"))
+    return static_assets.serve_index(request)
+
+@app.get("/static/{path:path}")
+async def static_file(path: str, request: Request):
+    if static_assets is None:
+        return await plain_files.get_response(path, request.scope)
+    response = static_assets.serve(path, request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
+
+@app.post("/api/page-timing")
+async def page_timing_endpoint(request: Request):
+    """Browser beacon: first-pitch page-load time, split by asset serving mode and cache state"""
+    try:
+        data = json.loads(await request.body())
+        ready = float(data["ready_ms"]) / 1000
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid timing")
+    if 0 <= ready < 600:
+        page_load_seconds.observe(
+            ready,
+            assets="optimized" if static_assets is not None else "plain",
+            cache="warm" if data.get("cached") else "cold",
+        )
+    return Response(status_code=204)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    connection_id = id(websocket)
+    session = None
+    connection_id = None
     
     try:
-        # Initialize services for this connection
-        vc_agent = VCAgent()
-        audio_handler = AudioHandler()
-        
-        # Initialize avatar handler (D-ID or HeyGen - optional)
-        # NOTE: Free animated avatar with lip sync is always available if FREE_AVATAR_IMAGE_URL is set
-        avatar_handler = None
-        avatar_session = None
-        avatar_embed_url = None
-        avatar_type = None
+        # Reconnecting clients pass their resume token to pick up where they left off
+        session = session_manager.find_by_token(websocket.query_params.get("resume"))
+        resumed = session is not None
         
-        # Skip D-ID and HeyGen - use free animated avatar instead
-        # (Uncomment below if you want to use D-ID/HeyGen)
-        # # Try D-ID first (free tier available)
-        # try:
-        #     did_handler = DIDHandler()
-        #     if did_handler.api_key and did_handler.avatar_id:
-        #         logger.info("D-ID credentials found - attempting to create streaming session")
-        #         avatar_session = await did_handler.create_streaming_session()
-        #         if avatar_session:
-        #             avatar_embed_url = did_handler.get_embed_url(avatar_session.get("session_id") or avatar_session.get("agent_id"))
-        #             avatar_handler = did_handler
-        #             avatar_type = "did"
-        #             logger.info("D-ID avatar session created successfully")
-        #         else:
-        #             logger.warning("D-ID session creation failed - using free avatar")
-        #     else:
-        #         logger.info("D-ID not configured - using free avatar")
-        # except Exception as e:
-        #     logger.warning(f"D-ID initialization failed - using free avatar: {e}")
+        if resumed:
+            previous_socket = session_manager.attach(session, websocket)
+            if previous_socket is not None:
+                # Same session open elsewhere (e.g. a duplicated tab) - the newest socket wins
+                try:
+                    await previous_socket.close(code=CLOSE_SUPERSEDED)
+                except Exception:
+                    pass
+            vc_agent = session.vc_agent
+            audio_handler = session.audio_handler
+            connection_id = session.session_id
+            logger.info("🔁 Session %s resumed (%d turns)", connection_id, len(vc_agent.turns))
+            transcript_journal.record("resume", connection_id)
+        else:
+            # Initialize services for this connection
+            vc_agent = VCAgent()
+            audio_handler = AudioHandler()
+            
+            # Initialize avatar handler (D-ID or HeyGen - optional)
+            # NOTE: Free animated avatar with lip sync is always available if FREE_AVATAR_IMAGE_URL is set
+            avatar_handler = None
+            avatar_session = None
+            avatar_type = None
+            
+            if avatar_pool is not None:
+                # Pre-created in the background - no billed round trip while the user waits
+                avatar_session = await avatar_pool.acquire()
+                if avatar_session:
+                    avatar_handler = avatar_pool.handler
+                    avatar_type = avatar_pool.provider
+                    logger.info("%s avatar session %s attached", avatar_type, avatar_session.get("session_id"))
+                else:
+                    logger.warning("Avatar session unavailable - using free avatar")
+            else:
+                # Free animated avatar (no API needed)
+                logger.info("Using free animated avatar with Web Audio lip sync")
+            
+            session = session_manager.create(vc_agent, audio_handler, websocket)
+            session.avatar_handler = avatar_handler
+            session.avatar_session = avatar_session
+            session.avatar_type = avatar_type
+            connection_id = session.session_id
+            transcript_journal.record("session_start", connection_id)
         
-        # Free animated avatar is always used (no API needed)
-        logger.info("Using free animated avatar with Web Audio lip sync")
+        bind_session(connection_id)
         
-        active_connections[connection_id] = {
-            "vc_agent": vc_agent,
-            "audio_handler": audio_handler,
-            "avatar_handler": avatar_handler,
-            "avatar_session": avatar_session,
-            "avatar_type": avatar_type,
-            "websocket": websocket
-        }
+        # Tell the client when its turn is waiting on admission or provider rate limits
+        async def notify_queue_status(status: str, **info):
+            await session.send({"type": "status", "status": status, **info})
         
-        # Send welcome message
-        welcome_text = "Alright, pitch me. What's your startup?"
-        welcome_audio = await audio_handler.text_to_speech(welcome_text)
+        set_queue_notifier(notify_queue_status)
         
         # Get free avatar image URL if configured (no API needed)
         free_avatar_url = getattr(config, 'FREE_AVATAR_IMAGE_URL', None)
         
-        # Send welcome message to client (with free avatar image URL)
-        await websocket.send_json({
-            "type": "audio",
-            "data": welcome_audio,
-            "text": welcome_text,
-            "avatar_image_url": free_avatar_url  # Free animated avatar with lip sync
-        })
+        # Resume token lets the client reconnect to this session after a dropped connection
+        session_info = {
+            "type": "session",
+            "session_id": connection_id,
+            "resume_token": session.resume_token,
+            "watch_token": session.watch_token,
+            "resumed": resumed,
+            "avatar_image_url": free_avatar_url
+        }
+        if session.avatar_session:
+            session_info["avatar_type"] = session.avatar_type
+            session_info["avatar_embed_url"] = session.avatar_handler.get_embed_url(
+                session.avatar_session.get("session_id")
+            )
+        if resumed:
+            session_info["history"] = [
+                {"role": role, "content": content} for role, content in vc_agent.turns
+            ]
+        await session.send(session_info)
         
-        # Skip sending to D-ID/HeyGen - free avatar handles everything client-side
+        if resumed:
+            # Resend any turn response the client never acknowledged - no new welcome
+            redelivered = await session.redeliver()
+            if redelivered:
+                logger.info("Redelivered %d unacknowledged frame(s) to session %s", redelivered, connection_id)
+        else:
+            # Send welcome message
+            welcome_text = WELCOME_TEXT
+            if avatar_pool is not None:
+                avatar_pool.say(session.avatar_session, welcome_text)
+            async with admission_controller.slot(connection_id, PRIORITY_INTERACTIVE):
+                welcome_audio = await audio_handler.text_to_speech(welcome_text, endpoint="welcome")
+            
+            # Send welcome message to client (with free avatar image URL)
+            await session.send({
+                "type": "audio",
+                "data": welcome_audio,
+                "text": welcome_text,
+                "avatar_image_url": free_avatar_url  # Free animated avatar with lip sync
+            }, reliable=True)
         
         # Main conversation loop
         logger.info("Entering main conversation loop, waiting for messages...")
         while True:
             try:
                 data = await websocket.receive()
-                logger.info(f"📨 Received WebSocket data - type: {type(data)}, keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}, content: {str(data)[:200]}")
+                logger.debug("📨 Received WebSocket frame: %.200s", data, extra=HOT)
             except RuntimeError as e:
                 # WebSocket disconnected
                 if "disconnect" in str(e).lower():
@@ -126,7 +293,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     break
                 raise
             except Exception as e:
-                logger.error(f"Error receiving WebSocket data: {e}", exc_info=True)
+                logger.error("Error receiving WebSocket data: %s", e, exc_info=True)
                 break
             
             # Check if this is a disconnect message
@@ -134,21 +301,61 @@ async def websocket_endpoint(websocket: WebSocket):
                 logger.info("Received disconnect message")
                 break
             
+            # Any frame proves the socket is alive
+            session.touch()
+            
             if "text" in data:
                 # Text message received
                 try:
                     message = json.loads(data["text"])
-                    logger.info(f"Parsed message: {message}")
+                    logger.debug("Parsed message: %.200s", message, extra=HOT)
                 except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse message: {data.get('text')} - {e}")
+                    logger.error("Failed to parse message: %.200s - %s", data.get('text'), e)
+                    continue
+                
+                if message.get("type") == "pong":
+                    # Heartbeat reply - already recorded by touch()
                     continue
                 
+                if message.get("type") == "ack":
+                    # Client handled reliable frames up to this sequence number
+                    try:
+                        session.ack(int(message.get("seq", 0)))
+                    except (TypeError, ValueError):
+                        pass
+                    continue
+                
+                if message.get("type") == "playback":
+                    # Browser started or finished playing a reply - closes the end-to-end measurement
+                    try:
+                        turn = int(message.get("turn", 0))
+                        delay = max(0.0, float(message.get("delay_ms", 0)) / 1000)
+                    except (TypeError, ValueError):
+                        continue
+                    started_at = session.turn_started_at.pop(turn, None) if message.get("event") == "start" else None
+                    if started_at is not None:
+                        latency = time.perf_counter() - started_at
+                        turn_playback_seconds.observe(latency)
+                        client_audio_delay_seconds.observe(delay)
+                        transcript_journal.record(
+                            "playback",
+                            connection_id,
+                            turn=turn,
+                            e2e_ms=round(latency * 1000, 1),
+                            client_delay_ms=round(delay * 1000, 1),
+                        )
+                    continue
+                
+                if message.get("type") in ("text", "reset"):
+                    session.touch(activity=True)
+                
                 if message.get("type") == "text":
                     # Text transcript received (from browser Speech Recognition)
                     transcript = message.get("text", "").strip()
                     
                     if transcript:
-                        logger.info(f"User said: {transcript}")
+                        bind_turn(session.turn_index + 1)
+                        logger.info("User said: %s", transcript)
                         
                         try:
                             # Check if WebSocket is still connected before sending
@@ -157,63 +364,93 @@ async def websocket_endpoint(websocket: WebSocket):
                                 break
                             
                             # Add user message to UI
-                            try:
-                                await websocket.send_json({
-                                    "type": "user_message",
-                                    "text": transcript
-                                })
-                            except Exception as send_err:
-                                logger.warning(f"Failed to send user message: {send_err}")
+                            if not await session.send({
+                                "type": "user_message",
+                                "text": transcript
+                            }):
+                                logger.warning("Failed to send user message")
                                 break
                             
-                            # Get VC response
-                            logger.info("Getting VC response...")
-                            vc_response = await vc_agent.get_response(transcript)
-                            logger.info(f"VC response: {vc_response}")
-                            
-                            if not vc_response:
-                                raise ValueError("No response generated from VC agent")
+                            turn_started = time.perf_counter()
+                            # Backpressure - no new reply while the client is still receiving old ones
+                            await session.wait_writable()
+                            async with admission_controller.slot(connection_id, PRIORITY_INTERACTIVE):
+                                admitted_at = time.perf_counter()
+                                
+                                # Avatar speaks sentence by sentence while the reply is still streaming
+                                avatar_feed = avatar_pool.speak_stream(session.avatar_session) if avatar_pool is not None else None
+                                
+                                # Get VC response
+                                logger.debug("Getting VC response...", extra=HOT)
+                                try:
+                                    vc_response = await vc_agent.get_response(transcript, on_sentence=avatar_feed)
+                                finally:
+                                    if avatar_feed is not None:
+                                        avatar_feed(None)
+                                logger.info("VC response: %s", vc_response)
+                                llm_done_at = time.perf_counter()
+                                
+                                if not vc_response:
+                                    raise ValueError("No response generated from VC agent")
+                                
+                                # Convert to speech
+                                logger.debug("Converting to speech...", extra=HOT)
+                                vc_audio = await audio_handler.text_to_speech(vc_response)
+                                logger.debug("Speech conversion complete", extra=HOT)
+                                tts_done_at = time.perf_counter()
                             
-                            # Convert to speech
-                            logger.info("Converting to speech...")
-                            vc_audio = await audio_handler.text_to_speech(vc_response)
-                            logger.info("Speech conversion complete")
+                            session.turn_index += 1
+                            if len(session.turn_started_at) >= 8:
+                                # Client never reported playback for old turns (autoplay blocked, closed tab)
+                                session.turn_started_at.clear()
+                            session.turn_started_at[session.turn_index] = turn_started
+                            transcript_journal.record(
+                                "turn",
+                                connection_id,
+                                turn=session.turn_index,
+                                user=transcript,
+                                vc=vc_response,
+                                provider=vc_agent.last_provider,
+                                model=vc_agent.last_model,
+                                tts_model=audio_handler.last_model,
+                                queue_ms=round((admitted_at - turn_started) * 1000, 1),
+                                llm_ms=round((llm_done_at - admitted_at) * 1000, 1),
+                                tts_ms=round((tts_done_at - llm_done_at) * 1000, 1),
+                                total_ms=round((tts_done_at - turn_started) * 1000, 1),
+                            )
                             
-                            # Check connection again before sending response
-                            if websocket.client_state.name != "CONNECTED":
-                                logger.warning("WebSocket disconnected during processing, skipping response")
+                            # Send back to client (free avatar handles lip sync client-side).
+                            # The response is kept until acked, so if the socket dropped while
+                            # we were processing it is redelivered when the client resumes.
+                            if await session.send({
+                                "type": "audio",
+                                "data": vc_audio,
+                                "text": vc_response,
+                                "turn": session.turn_index,  # Echoed back in playback events
+                                "avatar_image_url": free_avatar_url  # Free animated avatar with Web Audio lip sync
+                            }, reliable=True):
+                                logger.debug("Response sent to client", extra=HOT)
+                            elif session.websocket is not websocket:
+                                # Client reconnected on another socket - it already has the response
                                 break
-                            
-                            # Get free avatar image URL if configured
-                            free_avatar_url = getattr(config, 'FREE_AVATAR_IMAGE_URL', None)
-                            
-                            # Send back to client (free avatar handles lip sync client-side)
-                            try:
-                                await websocket.send_json({
-                                    "type": "audio",
-                                    "data": vc_audio,
-                                    "text": vc_response,
-                                    "avatar_image_url": free_avatar_url  # Free animated avatar with Web Audio lip sync
-                                })
-                                logger.info("Response sent to client")
-                            except Exception as send_err:
-                                logger.warning(f"Failed to send response: {send_err}")
+                            else:
+                                logger.warning("WebSocket disconnected during processing, response kept for redelivery")
                                 break
                             
                         except Exception as e:
-                            logger.error(f"Error processing message: {e}", exc_info=True)
+                            logger.error("Error processing message: %s", e, exc_info=True)
                             # Send error message to client
-                            error_message = "Sorry, I'm having technical difficulties. Let me try again - what's your startup about?"
+                            error_message = ERROR_TEXT
                             try:
-                                error_audio = await audio_handler.text_to_speech(error_message)
-                                await websocket.send_json({
+                                error_audio = await audio_handler.text_to_speech(error_message, endpoint="error")
+                                await session.send({
                                     "type": "audio",
                                     "data": error_audio,
                                     "text": error_message
-                                })
+                                }, reliable=True)
                             except:
                                 # If TTS also fails, just send text
-                                await websocket.send_json({
+                                await session.send({
                                     "type": "text_error",
                                     "text": error_message
                                 })
@@ -221,28 +458,107 @@ async def websocket_endpoint(websocket: WebSocket):
                 elif message.get("type") == "reset":
                     # Reset conversation
                     vc_agent.reset_conversation()
-                    welcome_text = "Alright, pitch me. What's your startup?"
-                    welcome_audio = await audio_handler.text_to_speech(welcome_text)
+                    session.turn_index = 0
+                    # Playback reports of old turns would match the new turn numbers
+                    session.turn_started_at.clear()
+                    # Replies still queued for a slow client belong to the old conversation
+                    dropped = session.supersede()
+                    if dropped:
+                        logger.info("Dropped %d stale audio frame(s) on reset", dropped)
+                    spectator_hub.publish(connection_id, {"type": "reset"})
+                    transcript_journal.record("reset", connection_id)
+                    welcome_text = WELCOME_TEXT
+                    async with admission_controller.slot(connection_id, PRIORITY_INTERACTIVE):
+                        welcome_audio = await audio_handler.text_to_speech(welcome_text, endpoint="welcome")
                     
-                    await websocket.send_json({
+                    await session.send({
                         "type": "audio",
                         "data": welcome_audio,
                         "text": welcome_text
-                    })
+                    }, reliable=True)
                     
     except WebSocketDisconnect:
-        logger.info(f"Client {connection_id} disconnected normally")
+        logger.info("Client %s disconnected normally", connection_id)
     except RuntimeError as e:
         if "disconnect" in str(e).lower():
-            logger.info(f"Client {connection_id} disconnected")
+            logger.info("Client %s disconnected", connection_id)
         else:
-            logger.error(f"WebSocket runtime error: {e}", exc_info=True)
+            logger.error("WebSocket runtime error: %s", e, exc_info=True)
     except Exception as e:
-        logger.error(f"Error in websocket: {e}", exc_info=True)
+        logger.error("Error in websocket: %s", e, exc_info=True)
+    finally:
+        if session is not None:
+            # Keep the session around for a while in case the client reconnects
+            transcript_journal.record("disconnect", connection_id)
+            session_manager.detach(session, websocket)
+            logger.debug("Detached connection %s", connection_id)
+
+@app.websocket("/ws/watch")
+async def spectator_endpoint(websocket: WebSocket, token: str = ""):
+    """Read-only view of a live session - costs no LLM or TTS calls"""
+    await websocket.accept()
+    # The watch token, never the session id - that one also drives reports and pre-scores
+    target = session_manager.find_by_watch_token(token) if config.SPECTATORS_ENABLED else None
+    if target is None:
+        await websocket.close(code=4404, reason="No such session")
+        return
+    session = target.session_id
+    spectator = spectator_hub.join(session, websocket)
+    if spectator is None:
+        await websocket.close(code=4429, reason="Too many spectators")
+        return
+    
+    # Queued (not sent) so it cannot interleave with frames the writer is sending
+    spectator.offer(json.dumps({
+        "type": "spectate",
+        "history": [{"role": role, "content": content} for role, content in target.vc_agent.turns],
+        "avatar_image_url": getattr(config, 'FREE_AVATAR_IMAGE_URL', None),
+        "spectators": spectator_hub.count(session),
+    }))
+    logger.info("👀 Spectator joined %s (%d watching)", session, spectator_hub.count(session))
+    
+    async def drain():
+        # Spectators have nothing to say - just notice when they leave
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    
+    receiver = asyncio.create_task(drain())
+    try:
+        # Ends when the viewer leaves, or the writer stops (session over, socket failed)
+        await asyncio.wait({receiver, spectator.task}, return_when=asyncio.FIRST_COMPLETED)
     finally:
-        if connection_id in active_connections:
-            del active_connections[connection_id]
-            logger.debug(f"Cleaned up connection {connection_id}")
+        viewer_left = receiver.done()
+        receiver.cancel()
+        spectator_hub.leave(session, spectator)
+        if not viewer_left:
+            await spectator.task
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
+@app.post("/api/pre-score")
+async def pre_score_endpoint(request: Request):
+    """Instant provisional report from conversation heuristics, shown until the LLM report arrives"""
+    try:
+        data = await request.json()
+        connection_id = data.get("connection_id")
+        conversation_history = data.get("conversation_history", [])
+        
+        if connection_id and connection_id in active_connections:
+            conversation_history = active_connections[connection_id].vc_agent.conversation_history
+        
+        # Pure NumPy over the transcript - no provider call, no admission slot
+        report = ReportGenerator(None, None, False).pre_score(conversation_history)
+        return {"success": True, "report": report}
+        
+    except Exception as e:
+        logger.error("Error pre-scoring conversation: %s", e, exc_info=True)
+        return {
+            "success": False,
+            "error": str(e),
+            "report": ReportGenerator(None, None, False)._get_default_report()
+        }
 
 @app.post("/api/generate-report")
 async def generate_report_endpoint(request: Request):
@@ -252,9 +568,14 @@ async def generate_report_endpoint(request: Request):
         connection_id = data.get("connection_id")
         conversation_history = data.get("conversation_history", [])
         
+        known_session = bool(connection_id) and connection_id in active_connections
+        # Provider usage from this report counts towards the pitch session - only a live one,
+        # usage under an unknown or expired id would never be released
+        bind_session(connection_id if known_session else None)
+        
         # Try to use existing connection's agent if available
-        if connection_id and connection_id in active_connections:
-            vc_agent = active_connections[connection_id]["vc_agent"]
+        if known_session:
+            vc_agent = active_connections[connection_id].vc_agent
             # Use conversation history from the agent
             conversation_history = vc_agent.conversation_history
         else:
@@ -276,15 +597,27 @@ async def generate_report_endpoint(request: Request):
             vc_agent.is_groq
         )
         
-        # Generate report
-        report = await report_generator.generate_report(conversation_history)
+        # Generate report - waits behind interactive turns when the worker is busy
+        async with admission_controller.slot(str(connection_id or "report"), PRIORITY_REPORT):
+            report = await report_generator.generate_report(conversation_history)
+        
+        logger.info("✅ Report generated successfully: %s%% probability", report.get('investment_probability'))
+        
+        # Kept for analytics - conversations without a single answer only get the static default
+        answers = len(ReportGenerator._pair_turns(conversation_history))
+        if answers:
+            # Column writes and the meta.json rewrite stay off the event loop
+            await asyncio.to_thread(report_store.append, report, answers, data.get("cohort"))
         
-        logger.info(f"✅ Report generated successfully: {report.get('investment_probability')}% probability")
+        # Tokens, TTS characters and estimated cost of the whole session so far
+        usage = usage_tracker.summary(connection_id)
+        if usage:
+            report["usage"] = usage
         
         return {"success": True, "report": report}
         
     except Exception as e:
-        logger.error(f"Error generating report: {e}", exc_info=True)
+        logger.error("Error generating report: %s", e, exc_info=True)
         # Return default report on error
         default_report = ReportGenerator(None, None, False)._get_default_report()
         return {
@@ -293,6 +626,96 @@ async def generate_report_endpoint(request: Request):
             "report": default_report
         }
 
+def require_admin(request: Request):
+    """Reject the request unless it carries the configured admin token"""
+    admin_token = getattr(config, "ADMIN_TOKEN", None)
+    if not admin_token:
+        # Admin endpoints are off entirely when no token is configured
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("x-admin-token", "")
+    authorization = request.headers.get("authorization", "")
+    if not supplied and authorization.lower().startswith("bearer "):
+        # Prometheus scrape configs send credentials this way
+        supplied = authorization[7:].strip()
+    if not secrets.compare_digest(supplied.encode(), admin_token.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app.post("/admin/profile")
+async def profile_endpoint(
+    request: Request,
+    seconds: float = 10,
+    mode: str = "cpu",
+    session_id: Optional[str] = None,
+    interval_ms: float = 5
+):
+    """
+    Profile the event loop for a time window, optionally for one session only.
+    Returns collapsed stacks - pipe into flamegraph.pl or open in speedscope.
+    """
+    require_admin(request)
+    seconds = max(0.1, min(seconds, config.PROFILE_MAX_SECONDS))
+    interval = max(0.001, interval_ms / 1000)
+    
+    try:
+        profile = await run_profile(mode, seconds, interval, session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={
+            "X-Profile-Samples": str(profile.sample_count),
+            "X-Profile-Idle-Samples": str(profile.idle_count),
+        }
+    )
+
+@app.get("/admin/metrics")
+async def metrics_endpoint(request: Request):
+    """Prometheus text exposition of all in-process metrics"""
+    require_admin(request)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/loop-stats")
+async def loop_stats_endpoint(request: Request):
+    """Event loop lag histogram and the stacks captured for recent stalls"""
+    require_admin(request)
+    return loop_watchdog.snapshot()
+
+@app.get("/admin/usage")
+async def usage_endpoint(request: Request, limit: int = 20):
+    """Live sessions with the largest prompts, with their token, TTS and cost totals"""
+    require_admin(request)
+    sessions = sorted(
+        usage_tracker.sessions.items(),
+        key=lambda item: item[1].max_prompt_tokens,
+        reverse=True,
+    )[:max(1, limit)]
+    return {
+        "tracked_sessions": len(usage_tracker.sessions),
+        "sessions": {session_id: usage.summary() for session_id, usage in sessions},
+    }
+
+@app.get("/admin/models")
+async def models_endpoint(request: Request):
+    """Groq router state: smoothed latency, error rate and health per model and purpose"""
+    require_admin(request)
+    return model_router.snapshot()
+
+@app.get("/admin/reports/analytics")
+async def report_analytics_endpoint(request: Request, cohort: Optional[str] = None, days: Optional[float] = None):
+    """Score distributions, percentiles, correlations and cohort comparison over all stored reports"""
+    require_admin(request)
+    # Off the loop - it waits on the appends' lock and reads other workers' shards from disk
+    return await asyncio.to_thread(report_store.analytics, cohort=cohort, days=days)
+
+@app.get("/admin/keys")
+async def keys_endpoint(request: Request):
+    """API key pools: calls in flight, cooldown and rate limit headroom per key (fingerprints only)"""
+    require_admin(request)
+    return {provider: pool.snapshot() for provider, pool in key_pools.items()}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
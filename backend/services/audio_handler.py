@@ -1,60 +1,164 @@
-from elevenlabs.client import ElevenLabs
 from elevenlabs import VoiceSettings
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import base64
 import sys
 import os
 import io
+import random
+import time
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
 import logging
+from backend.services.key_pool import key_pools
+from backend.services.usage_tracker import usage_tracker
+from backend.services.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
+# Configure voice settings for a more natural, human-like tone
+# Lower stability = more variation and naturalness
+# Lower similarity_boost = more natural variation
+# Higher style = more expressiveness and emotion
+VOICE_SETTINGS = VoiceSettings(
+    stability=0.35,  # Lower = more natural variation (was 0.5)
+    similarity_boost=0.5,  # Lower = more natural speech patterns (was 0.75)
+    style=0.6,  # Higher = more expressive and human-like (was 0.3)
+    use_speaker_boost=True
+)
+
+def encode_audio(chunks) -> str:
+    """Collect audio chunks and return them base64 encoded"""
+    # One join instead of repeated bytes concatenation (which copies on every chunk)
+    audio_bytes = b"".join(chunk for chunk in chunks if chunk)
+    return base64.b64encode(audio_bytes).decode('utf-8')
+
+# Synthesis latency per model and text length - the numbers to tune the TTS policy by
+LENGTH_BUCKETS = ((60, "short"), (160, "medium"), (float("inf"), "long"))
+tts_synthesis_seconds = metrics.histogram(
+    "tts_synthesis_seconds", "ElevenLabs synthesis time by model and text length bucket"
+)
+# (model, length bucket) -> smoothed seconds, read by choose_tts_model
+_latency_ewma: Dict[Tuple[str, str], float] = {}
+# (model, length bucket) -> monotonic time of the last sample (or exploring pick)
+_last_sample: Dict[Tuple[str, str], float] = {}
+LATENCY_ALPHA = 0.2
+
+# (voice, text) -> base64 audio for fixed lines, synthesized ahead of time
+_phrase_cache: Dict[Tuple[str, str], str] = {}
+
+
+def length_bucket(text: str) -> str:
+    for limit, name in LENGTH_BUCKETS:
+        if len(text) <= limit:
+            return name
+    return LENGTH_BUCKETS[-1][1]
+
+
+def record_tts_latency(model: str, text: str, seconds: float):
+    bucket = length_bucket(text)
+    tts_synthesis_seconds.observe(seconds, model=model, bucket=bucket)
+    previous = _latency_ewma.get((model, bucket))
+    _latency_ewma[(model, bucket)] = seconds if previous is None else previous + LATENCY_ALPHA * (seconds - previous)
+    _last_sample[(model, bucket)] = time.monotonic()
+
+
+def choose_tts_model(text: str, latency_budget: Optional[float]) -> str:
+    """
+    Pick the ElevenLabs model for a line.
+    - no latency budget (pre-warming, background work): the quality model
+    - short lines: the fast model - the quality difference is not audible in a few words
+    - otherwise the quality model, unless its measured latency for lines this
+      long does not fit the budget. Then it still gets a line now and then
+      (TTS_EXPLORE_RATE, or once its measurement is TTS_STALE_AFTER old) so a
+      recovered quality model is noticed, like model_router's exploration
+    """
+    if latency_budget is None:
+        return config.TTS_QUALITY_MODEL
+    if len(text) <= config.TTS_FAST_MAX_CHARS:
+        return config.TTS_FAST_MODEL
+    key = (config.TTS_QUALITY_MODEL, length_bucket(text))
+    expected = _latency_ewma.get(key)
+    if expected is None or expected <= latency_budget:
+        return config.TTS_QUALITY_MODEL
+    now = time.monotonic()
+    if now - _last_sample.get(key, 0.0) > config.TTS_STALE_AFTER or random.random() < config.TTS_EXPLORE_RATE:
+        # Counts as fresh until it reports back - one re-measuring line at a time
+        _last_sample[key] = now
+        return config.TTS_QUALITY_MODEL
+    return config.TTS_FAST_MODEL
+
+
 class AudioHandler:
+    # One handler per connection - slots keep idle sessions small
+    __slots__ = ("voice_id", "model_id", "last_model", "voice_settings")
+    
     def __init__(self):
         if not config.ELEVENLABS_API_KEY:
             raise ValueError("ELEVENLABS_API_KEY not set in environment variables")
         
-        self.client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
         self.voice_id = config.ELEVENLABS_VOICE_ID
-        
-        # Configure voice settings for a more natural, human-like tone
-        # Lower stability = more variation and naturalness
-        # Lower similarity_boost = more natural variation
-        # Higher style = more expressiveness and emotion
-        self.voice_settings = VoiceSettings(
-            stability=0.35,  # Lower = more natural variation (was 0.5)
-            similarity_boost=0.5,  # Lower = more natural speech patterns (was 0.75)
-            style=0.6,  # Higher = more expressive and human-like (was 0.3)
-            use_speaker_boost=True
+        self.model_id = config.TTS_QUALITY_MODEL
+        self.last_model = None  # Model that voiced the most recent line (for the transcript journal)
+        self.voice_settings = VOICE_SETTINGS
+    
+    def _synthesize(self, client, text: str, model_id: str) -> str:
+        """Blocking ElevenLabs call - the SDK streams the audio back synchronously"""
+        # Voice settings (stability, style) control expressiveness - no need for emotion tags
+        audio_generator = client.text_to_speech.convert(
+            voice_id=self.voice_id,
+            text=text,
+            model_id=model_id,
+            voice_settings=self.voice_settings
         )
+        return encode_audio(audio_generator)
     
-    async def text_to_speech(self, text: str) -> str:
-        """Convert text to speech using ElevenLabs and return base64 encoded audio"""
+    async def text_to_speech(self, text: str, endpoint: str = "turn",
+                             latency_budget: Optional[float] = config.TTS_LATENCY_BUDGET) -> str:
+        """
+        Convert text to speech using ElevenLabs and return base64 encoded audio.
+        The model comes from choose_tts_model; pass latency_budget=None when
+        nobody is waiting for the result.
+        """
+        cached = _phrase_cache.get((self.voice_id, text))
+        if cached is not None:
+            self.last_model = "cache"
+            return cached
+        
+        model_id = choose_tts_model(text, latency_budget)
         try:
-            # Use the new SDK API structure
-            # eleven_multilingual_v2 provides natural, expressive speech through voice settings
-            # Voice settings (stability, style) control expressiveness - no need for emotion tags
-            audio_generator = self.client.text_to_speech.convert(
-                voice_id=self.voice_id,
-                text=text,
-                model_id="eleven_multilingual_v2",  # Natural, human-like voice
-                voice_settings=self.voice_settings
-            )
-            
-            # Collect all audio chunks
-            audio_bytes = b""
-            for chunk in audio_generator:
-                if chunk:
-                    audio_bytes += chunk
+            async def synthesize(key) -> str:
+                # Timed after the key's rate limit wait - the policy compares model speed
+                started = time.perf_counter()
+                audio = await asyncio.to_thread(self._synthesize, key.client, text, model_id)
+                record_tts_latency(model_id, text, time.perf_counter() - started)
+                return audio
             
-            # Convert audio bytes to base64
-            audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
-            return audio_base64
+            # Shared clients, one HTTP pool per key - the pool picks the least loaded key
+            audio = await key_pools["elevenlabs"].run(synthesize)
+            usage_tracker.record_tts(text, model_id, endpoint)
+            self.last_model = model_id
+            return audio
             
         except Exception as e:
-            logger.error(f"Error in text_to_speech: {e}")
+            logger.error("Error in text_to_speech (%s): %s", model_id, e)
             raise
-
+    
+    async def prewarm(self, phrases: List[str]) -> int:
+        """Synthesize fixed lines once with the quality model so every session reuses them"""
+        warmed = 0
+        for text in phrases:
+            if (self.voice_id, text) in _phrase_cache:
+                continue
+            try:
+                _phrase_cache[(self.voice_id, text)] = await self.text_to_speech(
+                    text, endpoint="prewarm", latency_budget=None
+                )
+                warmed += 1
+            except Exception as e:
+                logger.warning("Could not pre-warm phrase %.40s: %s", text, e)
+        if warmed:
+            logger.info("🔥 Pre-warmed %d TTS phrase(s)", warmed)
+        return warmed
@@ -0,0 +1,237 @@
+"""
+Avatar Session Pool (OPTIONAL)
+Creating a D-ID/HeyGen streaming session is a slow, billed round trip. The
+pool keeps a few sessions created ahead of time so a new connection gets one
+immediately, discards sessions that sat unused past their TTL, and refills
+in the background.
+
+Speech is sent to the avatar sentence by sentence, in order, so the avatar
+starts on the first sentence while later ones are still being generated.
+
+Pooled sessions are billed while they wait - keep AVATAR_POOL_SIZE small.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import AsyncIterable, Callable, Deque, Optional, Set, Tuple
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.services.metrics import metrics
+from backend.services.text_utils import SentenceSplitter
+
+logger = logging.getLogger(__name__)
+
+pool_acquires_total = metrics.counter(
+    "avatar_pool_acquires_total", "Avatar sessions handed out, by whether one was ready (hit) or created on demand (miss)"
+)
+pool_ready = metrics.gauge("avatar_pool_ready", "Pre-created avatar sessions waiting in the pool")
+pool_create_seconds = metrics.histogram(
+    "avatar_session_create_seconds", "Time to create an avatar streaming session"
+)
+
+# Longest wait between refill attempts while the provider keeps failing
+MAX_REFILL_BACKOFF = 60.0
+
+
+class AvatarPool:
+    def __init__(self, handler, provider: str, size: int, ttl: float, refill_backoff: float = 2.0):
+        self.handler = handler
+        self.provider = provider
+        self.size = max(0, size)
+        self.ttl = ttl
+        self.refill_backoff = refill_backoff
+        # (created_at, avatar session), oldest first
+        self._ready: Deque[Tuple[float, dict]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Fire-and-forget work (closing sessions, background speech) - keep references
+        self._background: Set[asyncio.Task] = set()
+
+    @property
+    def ready(self) -> int:
+        return len(self._ready)
+
+    async def start(self):
+        """Start filling the pool in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("🎭 %s avatar pool started (size %d)", self.provider, self.size)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # End every unused session so it stops being billed
+        waiting = [session for _, session in self._ready]
+        self._ready.clear()
+        pool_ready.set(0, provider=self.provider)
+        await asyncio.gather(*(self.handler.close_session(s) for s in waiting), return_exceptions=True)
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+        await self.handler.close()
+
+    async def acquire(self) -> Optional[dict]:
+        """Take a ready session, or create one on the spot if the pool is empty"""
+        self._expire()
+        if self._ready:
+            _, session = self._ready.popleft()
+            pool_ready.set(len(self._ready), provider=self.provider)
+            pool_acquires_total.inc(provider=self.provider, result="hit")
+            self._wakeup.set()
+            return session
+
+        pool_acquires_total.inc(provider=self.provider, result="miss")
+        self._wakeup.set()
+        return await self._create()
+
+    def release(self, avatar_session: Optional[dict]):
+        """The connection is done with its session - end it in the background"""
+        if avatar_session:
+            self._spawn(self.handler.close_session(avatar_session))
+
+    async def stream(self, avatar_session: dict, chunks: AsyncIterable[str]) -> int:
+        """
+        Send text to the avatar sentence by sentence as it is generated.
+        Sentences are posted one at a time in order; generation keeps running
+        while a sentence is in flight. Returns how many sentences were delivered.
+        """
+        session_id = avatar_session.get("session_id")
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def sender():
+            delivered = 0
+            while True:
+                sentence = await queue.get()
+                if sentence is None:
+                    return delivered
+                if await self.handler.send_text_to_avatar(session_id, sentence):
+                    delivered += 1
+
+        sending = asyncio.create_task(sender())
+        splitter = SentenceSplitter()
+        try:
+            async for chunk in chunks:
+                for sentence in splitter.feed(chunk):
+                    queue.put_nowait(sentence)
+            for sentence in splitter.flush():
+                queue.put_nowait(sentence)
+        finally:
+            queue.put_nowait(None)
+        return await sending
+
+    def say(self, avatar_session: Optional[dict], text: str):
+        """Speak a complete text on the avatar without waiting for it"""
+        if not avatar_session or not text:
+            return
+
+        async def chunks():
+            yield text
+
+        self._spawn(self.stream(avatar_session, chunks()))
+
+    def speak_stream(self, avatar_session: Optional[dict]) -> Optional[Callable[[Optional[str]], None]]:
+        """
+        Start speaking a reply that is still being generated, without waiting for it.
+        Returns feed(sentence) - safe to call from worker threads, feed(None) ends
+        the reply - or None without an avatar session.
+        """
+        if not avatar_session:
+            return None
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def chunks():
+            while True:
+                sentence = await queue.get()
+                if sentence is None:
+                    return
+                yield sentence + " "
+
+        self._spawn(self.stream(avatar_session, chunks()))
+        return lambda sentence: loop.call_soon_threadsafe(queue.put_nowait, sentence)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _create(self) -> Optional[dict]:
+        started = time.perf_counter()
+        session = await self.handler.create_streaming_session()
+        if session:
+            pool_create_seconds.observe(time.perf_counter() - started, provider=self.provider)
+        return session
+
+    def _expire(self):
+        """Drop sessions that sat in the pool too long - the provider may have timed them out"""
+        now = time.monotonic()
+        while self._ready and now - self._ready[0][0] > self.ttl:
+            _, session = self._ready.popleft()
+            logger.debug("Avatar session %s expired in the pool", session.get("session_id"))
+            self.release(session)
+        pool_ready.set(len(self._ready), provider=self.provider)
+
+    async def _run(self):
+        failures = 0
+        while True:
+            # Cleared before looking at the pool so an acquire() during refill is not missed
+            self._wakeup.clear()
+            self._expire()
+            missing = self.size - len(self._ready)
+            if missing > 0:
+                created = await asyncio.gather(*(self._create() for _ in range(missing)), return_exceptions=True)
+                now = time.monotonic()
+                fresh = [s for s in created if s and not isinstance(s, BaseException)]
+                self._ready.extend((now, s) for s in fresh)
+                pool_ready.set(len(self._ready), provider=self.provider)
+                if len(fresh) < missing:
+                    failures += 1
+                    backoff = min(MAX_REFILL_BACKOFF, self.refill_backoff * 2 ** (failures - 1))
+                    logger.warning(
+                        "Avatar pool refill got %d of %d sessions - retrying in %.0fs",
+                        len(fresh), missing, backoff,
+                    )
+                    await asyncio.sleep(backoff)
+                    continue
+                failures = 0
+
+            # Sleep until a session is taken or the oldest one is due to expire
+            timeout = self.ttl
+            if self._ready:
+                timeout = max(0.1, self._ready[0][0] + self.ttl - time.monotonic())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+def create_avatar_pool() -> Optional[AvatarPool]:
+    """Pool for the configured AVATAR_PROVIDER, or None for the free client-side avatar"""
+    provider = getattr(config, "AVATAR_PROVIDER", "none")
+    if provider == "did":
+        from backend.services.did_handler import DIDHandler
+        handler = DIDHandler()
+        if not (handler.api_key and handler.avatar_id):
+            logger.warning("AVATAR_PROVIDER=did but D-ID is not configured - using free avatar")
+            return None
+    elif provider == "heygen":
+        from backend.services.heygen_handler import HeyGenHandler
+        handler = HeyGenHandler()
+        if not handler.api_key:
+            logger.warning("AVATAR_PROVIDER=heygen but HeyGen is not configured - using free avatar")
+            return None
+    else:
+        return None
+    return AvatarPool(handler, provider, config.AVATAR_POOL_SIZE, config.AVATAR_SESSION_TTL)
+
+
+# Shared by every connection in this worker process (None when avatars are off)
+avatar_pool = create_avatar_pool()
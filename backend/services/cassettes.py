@@ -0,0 +1,389 @@
+"""
+Provider Cassettes
+Record Groq, OpenAI and ElevenLabs traffic to a file and replay it offline.
+
+- record: clients talk to the provider as usual, and every chat completion
+  (plain or streamed) and TTS call is appended to a JSONL cassette with its
+  timing - when the response arrived and the offset of every streamed chunk
+- replay: clients never touch the network (no keys needed) and serve the
+  recorded responses, paced like the original call or scaled by
+  config.PROVIDER_CASSETTE_SPEED (2 = twice as fast, 0 = no delays)
+
+Replay matches a call on the exact request first, then on the same text with
+a different model (routing may pick another model than the recording did),
+then on the next unused call of the same kind. Recorded provider errors are
+raised again with their HTTP status, so key rotation and fallbacks behave as
+they did. Hooked in where clients.py creates the shared SDK clients.
+"""
+import base64
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.logging_config import HOT, current_session
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+cassette_calls = metrics.counter("cassette_calls_total", "Provider calls recorded to or replayed from a cassette, by outcome")
+
+
+class CassetteMiss(LookupError):
+    """A replayed call has no recording left to serve"""
+
+
+class ReplayedError(Exception):
+    """A provider error as it was recorded - carries the original HTTP status"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _jsonable(value: Any) -> Any:
+    """json.dumps default for SDK objects (pydantic models, VoiceSettings)"""
+    for method in ("model_dump", "dict"):
+        if callable(getattr(value, method, None)):
+            return getattr(value, method)()
+    return getattr(value, "__dict__", None) or str(value)
+
+
+def _plain(value: Any) -> Any:
+    """SDK object -> plain JSON data"""
+    return None if value is None else json.loads(json.dumps(value, default=_jsonable))
+
+
+def _digest(*parts: Any) -> str:
+    text = json.dumps(parts, sort_keys=True, default=_jsonable, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+def _request_keys(provider: str, kind: str, request: Dict) -> Dict[str, str]:
+    """Exact key (whole request) and loose key (only the text the model was given)"""
+    text = request.get("messages") if "messages" in request else request.get("text")
+    return {"key": _digest(provider, kind, request), "loose": _digest(provider, kind, text)}
+
+
+def _error_entry(error: BaseException) -> Dict:
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    return {"status": status if isinstance(status, int) else None, "message": str(error)[:500]}
+
+
+class Cassette:
+    """One cassette file - appended to while recording, indexed in memory for replay"""
+
+    def __init__(self, path: str, speed: float = 1.0):
+        self.path = path
+        self.speed = speed
+        # Provider calls run in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._by_key: Dict[str, Deque[Dict]] = {}
+        self._by_loose: Dict[str, Deque[Dict]] = {}
+        self._by_kind: Dict[str, Deque[Dict]] = {}
+
+    # --- recording -------------------------------------------------------
+
+    def _write(self, entry: Dict):
+        line = json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=_jsonable)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        cassette_calls.inc(provider=entry["provider"], kind=entry["kind"], outcome="recorded")
+
+    def _entry(self, provider: str, kind: str, request: Dict) -> Dict:
+        return {
+            "provider": provider,
+            "kind": kind,
+            "session": current_session(),
+            "ts": time.time(),
+            **_request_keys(provider, kind, request),
+            "request": request,
+        }
+
+    def record_chat(self, provider: str, create: Callable, **request) -> Any:
+        """chat.completions.create against the provider, recorded"""
+        kind = "stream" if request.get("stream") else "chat"
+        entry = self._entry(provider, kind, _plain(request))
+        started = time.perf_counter()
+        try:
+            response = create(**request)
+        except Exception as e:
+            entry["error"] = _error_entry(e)
+            self._write(entry)
+            raise
+        entry["latency"] = time.perf_counter() - started
+        if kind == "stream":
+            return _RecordingStream(self, entry, response, started)
+        entry["content"] = response.choices[0].message.content
+        entry["usage"] = _plain(getattr(response, "usage", None))
+        self._write(entry)
+        return response
+
+    def record_tts(self, convert: Callable, **request) -> Iterator[bytes]:
+        """text_to_speech.convert against the provider, recorded (audio chunks as base64)"""
+        entry = self._entry("elevenlabs", "tts", _plain(request))
+        started = time.perf_counter()
+        try:
+            audio = convert(**request)
+        except Exception as e:
+            entry["error"] = _error_entry(e)
+            self._write(entry)
+            raise
+        entry["latency"] = time.perf_counter() - started
+
+        def chunks():
+            entry["chunks"] = []
+            try:
+                for chunk in audio:
+                    if chunk:
+                        entry["chunks"].append([time.perf_counter() - started, base64.b64encode(chunk).decode("ascii")])
+                    yield chunk
+            except Exception as e:
+                entry["error"] = _error_entry(e)
+                raise
+            finally:
+                self._write(entry)
+        return chunks()
+
+    # --- replay ----------------------------------------------------------
+
+    def load(self):
+        """Index the recorded calls, in recording order"""
+        with self._lock:
+            if self._loaded:
+                return
+            count = 0
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        entry["used"] = False
+                        self._by_key.setdefault(entry["key"], deque()).append(entry)
+                        self._by_loose.setdefault(entry["loose"], deque()).append(entry)
+                        self._by_kind.setdefault(f"{entry['provider']}:{entry['kind']}", deque()).append(entry)
+                        count += 1
+            except FileNotFoundError:
+                logger.error("Cassette %s not found - every replayed call will miss", self.path)
+            self._loaded = True
+            logger.info("📼 Loaded %d recorded provider call(s) from %s", count, self.path)
+
+    def rewind(self):
+        """Make every recorded call available again (repeat a replay in the same process)"""
+        with self._lock:
+            self._loaded = False
+            self._by_key.clear()
+            self._by_loose.clear()
+            self._by_kind.clear()
+        self.load()
+
+    @staticmethod
+    def _next_unused(queue: Optional[Deque[Dict]]) -> Optional[Dict]:
+        while queue:
+            entry = queue.popleft()
+            if not entry["used"]:
+                return entry
+        return None
+
+    def take(self, provider: str, kind: str, request: Dict) -> Dict:
+        """Recorded call for a request - exact match, then same text, then next of its kind"""
+        self.load()
+        keys = _request_keys(provider, kind, _plain(request))
+        with self._lock:
+            for outcome, queue in (
+                ("replayed", self._by_key.get(keys["key"])),
+                ("replayed_loose", self._by_loose.get(keys["loose"])),
+                ("replayed_in_order", self._by_kind.get(f"{provider}:{kind}")),
+            ):
+                entry = self._next_unused(queue)
+                if entry is not None:
+                    entry["used"] = True
+                    break
+            else:
+                cassette_calls.inc(provider=provider, kind=kind, outcome="miss")
+                raise CassetteMiss(f"No recorded {provider} {kind} call left in {self.path}")
+        cassette_calls.inc(provider=provider, kind=kind, outcome=outcome)
+        if outcome != "replayed":
+            logger.debug("📼 %s %s call replayed without an exact match (%s)", provider, kind, outcome, extra=HOT)
+        return entry
+
+    def _pace(self, started: float, offset: float):
+        """Sleep until offset (recorded seconds) after started, scaled by speed - blocking, like the SDKs"""
+        if self.speed <= 0:
+            return
+        delay = started + offset / self.speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _served(self, entry: Dict, started: float):
+        """Wait for the recorded response time and raise the recorded error, if any"""
+        error = entry.get("error")
+        if error and "latency" not in entry:
+            raise ReplayedError(error["message"], error["status"])
+        self._pace(started, entry.get("latency", 0.0))
+
+    def replay_chat(self, provider: str, **request) -> Any:
+        """chat.completions.create served from the cassette"""
+        kind = "stream" if request.get("stream") else "chat"
+        started = time.perf_counter()
+        entry = self.take(provider, kind, request)
+        self._served(entry, started)
+        if kind == "stream":
+            return _ReplayStream(self, entry, started)
+        message = SimpleNamespace(content=entry.get("content"))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=entry.get("usage"))
+
+    def replay_tts(self, **request) -> Iterator[bytes]:
+        """text_to_speech.convert served from the cassette"""
+        started = time.perf_counter()
+        entry = self.take("elevenlabs", "tts", request)
+        self._served(entry, started)
+
+        def chunks():
+            for offset, data in entry.get("chunks", ()):
+                self._pace(started, offset)
+                yield base64.b64decode(data)
+            error = entry.get("error")
+            if error:
+                raise ReplayedError(error["message"], error["status"])
+        return chunks()
+
+
+class _RecordingStream:
+    """Streamed completion passed through to the caller, chunks recorded with their offsets"""
+
+    def __init__(self, cassette: Cassette, entry: Dict, stream: Any, started: float):
+        self.cassette = cassette
+        self.entry = entry
+        self.stream = stream
+        self.started = started
+        self.entry["chunks"] = []
+        self._written = False
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                self.entry["chunks"].append([time.perf_counter() - self.started, content, _plain(usage)])
+                yield chunk
+        except Exception as e:
+            self.entry["error"] = _error_entry(e)
+            raise
+        finally:
+            self._finish()
+
+    def close(self):
+        # Closed early (QuestionStop) - the recording ends where the caller stopped reading
+        try:
+            self.stream.close()
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if not self._written:
+            self._written = True
+            self.cassette._write(self.entry)
+
+
+class _ReplayStream:
+    """Recorded chunks shaped like SDK stream chunks (choices[0].delta.content, usage)"""
+
+    def __init__(self, cassette: Cassette, entry: Dict, started: float):
+        self.cassette = cassette
+        self.entry = entry
+        self.started = started
+        self.closed = False
+
+    def __iter__(self):
+        for offset, content, usage in self.entry.get("chunks", ()):
+            if self.closed:
+                return
+            self.cassette._pace(self.started, offset)
+            choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+            yield SimpleNamespace(choices=choices, usage=usage)
+        error = self.entry.get("error")
+        if error:
+            raise ReplayedError(error["message"], error["status"])
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingClient:
+    """Real SDK client with the chat and TTS endpoints recorded - everything else passes through"""
+
+    def __init__(self, provider: str, client: Any, cassette: Cassette):
+        self._client = client
+        if provider == "elevenlabs":
+            convert = client.text_to_speech.convert
+            self.text_to_speech = SimpleNamespace(convert=lambda **request: cassette.record_tts(convert, **request))
+        else:
+            create = client.chat.completions.create
+            self.chat = SimpleNamespace(completions=SimpleNamespace(
+                create=lambda **request: cassette.record_chat(provider, create, **request)
+            ))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class ReplayClient:
+    """Stand-in for an SDK client that only serves recorded calls"""
+
+    def __init__(self, provider: str, cassette: Cassette):
+        if provider == "elevenlabs":
+            self.text_to_speech = SimpleNamespace(convert=cassette.replay_tts)
+        else:
+            self.chat = SimpleNamespace(completions=SimpleNamespace(
+                create=lambda **request: cassette.replay_chat(provider, **request)
+            ))
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Cassette:
+    """The process-wide cassette at config.PROVIDER_CASSETTE_PATH"""
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette(config.PROVIDER_CASSETTE_PATH, config.PROVIDER_CASSETTE_SPEED)
+    return _cassette
+
+
+def wrap_client(provider: str, factory: Callable[[], Any]) -> Any:
+    """SDK client from factory - recorded, replayed or as is, per config.PROVIDER_CASSETTE_MODE"""
+    mode = config.PROVIDER_CASSETTE_MODE
+    if mode == "replay":
+        # No SDK client at all - nothing can reach the network
+        return ReplayClient(provider, get_cassette())
+    client = factory()
+    if mode == "record":
+        logger.info("📼 Recording %s calls to %s", provider, config.PROVIDER_CASSETTE_PATH)
+        return RecordingClient(provider, client, get_cassette())
+    return client
+
+
+def recorded_sessions(path: str) -> Dict[str, List[Dict]]:
+    """Calls of a cassette grouped by session id, in recording order (for offline replays)"""
+    sessions: Dict[str, List[Dict]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                sessions.setdefault(entry.get("session") or "unknown", []).append(entry)
+    return sessions
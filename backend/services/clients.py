@@ -0,0 +1,54 @@
+"""
+Shared Provider Clients
+SDK clients hold their own HTTP connection pools, so one client per API key is
+shared by every session in the process instead of being created per connection.
+With PROVIDER_CASSETTE_MODE set they are recorded or replayed (cassettes).
+"""
+import logging
+from typing import Dict, Tuple, Any
+
+from backend.services.cassettes import wrap_client
+
+logger = logging.getLogger(__name__)
+
+# (provider, api_key) -> SDK client
+_clients: Dict[Tuple[str, str], Any] = {}
+
+
+def _get_or_create(provider: str, api_key: str, factory):
+    key = (provider, api_key)
+    client = _clients.get(key)
+    if client is None:
+        client = wrap_client(provider, factory)
+        _clients[key] = client
+    return client
+
+
+def get_elevenlabs_client(api_key: str):
+    """Shared ElevenLabs client for an API key"""
+    def factory():
+        from elevenlabs.client import ElevenLabs
+        return ElevenLabs(api_key=api_key)
+    return _get_or_create("elevenlabs", api_key, factory)
+
+
+def get_groq_client(api_key: str):
+    """Shared Groq client for an API key (raises ImportError if groq is not installed)"""
+    def factory():
+        from groq import Groq
+        return Groq(api_key=api_key)
+    return _get_or_create("groq", api_key, factory)
+
+
+def get_openai_client(api_key: str):
+    """Shared OpenAI client for an API key (raises ImportError if openai is not installed)"""
+    def factory():
+        import openai
+        return openai.OpenAI(api_key=api_key)
+    return _get_or_create("openai", api_key, factory)
+
+
+def get_client(provider: str, api_key: str):
+    """Shared client for a provider ("groq", "openai" or "elevenlabs") and API key"""
+    factories = {"groq": get_groq_client, "openai": get_openai_client, "elevenlabs": get_elevenlabs_client}
+    return factories[provider](api_key)
@@ -9,9 +9,11 @@ import base64
 import logging
 import sys
 import os
+from typing import Optional
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
+from backend.logging_config import HOT
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +21,12 @@ class DIDHandler:
     def __init__(self):
         self.api_key = getattr(config, 'DID_API_KEY', None)
         self.avatar_id = getattr(config, 'DID_AVATAR_ID', None)
-        self.base_url = "https://api.d-id.com"
+        self.base_url = getattr(config, 'DID_BASE_URL', "https://api.d-id.com").rstrip("/")
+        # Which D-ID API works for this account ("streams" or "agents") - learned from
+        # the first successful call so a failing endpoint is not retried on every request
+        self.mode: Optional[str] = None
+        # One HTTP session per handler keeps connections (and TLS) warm between calls
+        self._http: Optional[aiohttp.ClientSession] = None
         
         if not self.api_key:
             logger.debug("DID_API_KEY not set - D-ID integration disabled (this is fine)")
@@ -38,51 +45,67 @@ class DIDHandler:
             # Use as-is (might be already encoded or direct API key)
             return self.api_key
     
+    def _session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session for every call this handler makes (created on first use)"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                headers={
+                    "Authorization": f"Basic {self._get_auth_header()}",
+                    "Content-Type": "application/json"
+                },
+                timeout=aiohttp.ClientTimeout(total=config.AVATAR_HTTP_TIMEOUT),
+            )
+        return self._http
+    
+    async def close(self):
+        """Close the HTTP session - call on shutdown"""
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+    
     async def create_streaming_session(self) -> dict:
         """Create a new D-ID streaming session using the official streaming API"""
         if not self.api_key or not self.avatar_id:
             return None
         
         try:
-            auth_header = self._get_auth_header()
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Basic {auth_header}",
-                    "Content-Type": "application/json"
-                }
-                
-                # D-ID Streaming API - use /talks/streams endpoint (official method)
-                # Based on: https://github.com/de-id/live-streaming-demo
-                payload = {
-                    "source_url": self.avatar_id,  # Image URL or avatar ID
-                    "config": {
-                        "fluent": True,
-                        "pad_audio": 0.0,
-                        "stitch": True
-                    }
-                }
-                
-                # Try the official streaming endpoint first
-                async with session.post(
-                    f"{self.base_url}/talks/streams",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status in [200, 201]:
-                        data = await response.json()
-                        stream_id = data.get("id") or data.get("stream_id")
-                        logger.info(f"✅ D-ID streaming session created: {stream_id}")
-                        return {"stream_id": stream_id, "session_id": stream_id, "data": data}
-                    else:
-                        error_text = await response.text()
-                        logger.warning(f"D-ID streaming endpoint error: {response.status} - {error_text}")
-                        # Try Agents API as fallback
-                        return await self._try_agents_api(session, headers)
+            if self.mode == "agents":
+                return await self._try_agents_api()
+            
+            result = await self._create_stream()
+            if result is None and self.mode != "streams":
+                # Streams have not worked for this account - try the Agents API
+                result = await self._try_agents_api()
+            return result
         except Exception as e:
-            logger.error(f"Error creating D-ID session: {e}")
+            logger.error("Error creating D-ID session: %s", e)
             return None
     
-    async def _try_agents_api(self, session, headers):
+    async def _create_stream(self):
+        # D-ID Streaming API - use /talks/streams endpoint (official method)
+        # Based on: https://github.com/de-id/live-streaming-demo
+        payload = {
+            "source_url": self.avatar_id,  # Image URL or avatar ID
+            "config": {
+                "fluent": True,
+                "pad_audio": 0.0,
+                "stitch": True
+            }
+        }
+        
+        async with self._session().post(f"{self.base_url}/talks/streams", json=payload) as response:
+            if response.status in [200, 201]:
+                data = await response.json()
+                stream_id = data.get("id") or data.get("stream_id")
+                self.mode = "streams"
+                logger.info("✅ D-ID streaming session created: %s", stream_id)
+                return {"stream_id": stream_id, "session_id": stream_id, "kind": "stream", "data": data}
+            else:
+                error_text = await response.text()
+                logger.warning("D-ID streaming endpoint error: %s - %s", response.status, error_text)
+                return None
+    
+    async def _try_agents_api(self):
         """Try D-ID Agents API as fallback"""
         try:
             payload = {
@@ -93,22 +116,19 @@ class DIDHandler:
                 }
             }
             
-            async with session.post(
-                f"{self.base_url}/agents",
-                headers=headers,
-                json=payload
-            ) as response:
+            async with self._session().post(f"{self.base_url}/agents", json=payload) as response:
                 if response.status in [200, 201]:
                     data = await response.json()
                     agent_id = data.get("id") or data.get("agent_id")
-                    logger.info(f"D-ID agent created: {agent_id}")
-                    return {"agent_id": agent_id, "session_id": agent_id}
+                    self.mode = "agents"
+                    logger.info("D-ID agent created: %s", agent_id)
+                    return {"agent_id": agent_id, "session_id": agent_id, "kind": "agent"}
                 else:
                     error_text = await response.text()
-                    logger.error(f"D-ID Agents API error: {response.status} - {error_text}")
+                    logger.error("D-ID Agents API error: %s - %s", response.status, error_text)
                     return None
         except Exception as e:
-            logger.error(f"Error trying Agents API: {e}")
+            logger.error("Error trying Agents API: %s", e)
             return None
     
     async def send_text_to_avatar(self, session_id: str, text: str) -> bool:
@@ -116,62 +136,63 @@ class DIDHandler:
         if not self.api_key or not session_id:
             return False
         
+        if self.mode == "agents":
+            return await self._send_to_agent(session_id, text)
+        
         try:
-            auth_header = self._get_auth_header()
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "Authorization": f"Basic {auth_header}",
-                    "Content-Type": "application/json"
-                }
-                
-                # D-ID Streaming API - send text to stream
-                # Based on official demo: https://github.com/de-id/live-streaming-demo
-                payload = {
-                    "script": {
-                        "type": "text",
-                        "input": text,
-                        "subtitles": False
-                    }
+            # D-ID Streaming API - send text to stream
+            # Based on official demo: https://github.com/de-id/live-streaming-demo
+            payload = {
+                "script": {
+                    "type": "text",
+                    "input": text,
+                    "subtitles": False
                 }
-                
-                # Try streaming endpoint first (official method)
-                async with session.post(
-                    f"{self.base_url}/talks/streams/{session_id}",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status in [200, 201]:
-                        logger.info(f"✅ Text sent to D-ID stream: {text[:50]}...")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.warning(f"D-ID stream error: {response.status} - {error_text}")
-                        # Try Agents API as fallback
-                        return await self._send_to_agent(session, headers, session_id, text)
+            }
+            
+            async with self._session().post(f"{self.base_url}/talks/streams/{session_id}", json=payload) as response:
+                if response.status in [200, 201]:
+                    logger.debug("✅ Text sent to D-ID stream: %.50s...", text, extra=HOT)
+                    return True
+                else:
+                    error_text = await response.text()
+                    logger.warning("D-ID stream error: %s - %s", response.status, error_text)
+            
+            if self.mode is None:
+                # Not known which API this account uses yet - try the Agents API
+                return await self._send_to_agent(session_id, text)
+            return False
         except Exception as e:
-            logger.error(f"Error sending text to D-ID: {e}")
+            logger.error("Error sending text to D-ID: %s", e)
             return False
     
-    async def _send_to_agent(self, session, headers, agent_id: str, text: str) -> bool:
+    async def _send_to_agent(self, agent_id: str, text: str) -> bool:
         """Try sending to Agents API as fallback"""
         try:
             payload = {"text": text}
-            async with session.post(
-                f"{self.base_url}/agents/{agent_id}/chat",
-                headers=headers,
-                json=payload
-            ) as response:
+            async with self._session().post(f"{self.base_url}/agents/{agent_id}/chat", json=payload) as response:
                 if response.status in [200, 201]:
-                    logger.info(f"Text sent to D-ID agent: {text[:50]}...")
+                    logger.debug("Text sent to D-ID agent: %.50s...", text, extra=HOT)
                     return True
                 else:
                     error_text = await response.text()
-                    logger.error(f"D-ID agent error: {response.status} - {error_text}")
+                    logger.error("D-ID agent error: %s - %s", response.status, error_text)
                     return False
         except Exception as e:
-            logger.error(f"Error sending to D-ID agent: {e}")
+            logger.error("Error sending to D-ID agent: %s", e)
             return False
     
+    async def close_session(self, avatar_session: dict) -> bool:
+        """End a streaming session so it stops being billed (agents are kept)"""
+        if not avatar_session or avatar_session.get("kind") != "stream":
+            return False
+        try:
+            stream_id = avatar_session.get("stream_id")
+            async with self._session().delete(f"{self.base_url}/talks/streams/{stream_id}") as response:
+                return response.status in [200, 204]
+        except Exception as e:
+            logger.debug("Error closing D-ID stream: %s", e)
+            return False
     
     def get_embed_url(self, session_id: str) -> str:
         """Get the embed URL for the D-ID avatar"""
@@ -181,4 +202,3 @@ class DIDHandler:
             # Format: https://d-id.com/streams/{stream_id}
             return f"https://d-id.com/streams/{session_id}"
         return None
-
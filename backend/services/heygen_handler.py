@@ -5,13 +5,14 @@ This is completely optional - the system works perfectly without HeyGen.
 To enable: Add HEYGEN_API_KEY and HEYGEN_AVATAR_ID to your .env file
 """
 import aiohttp
-import base64
 import logging
 import sys
 import os
+from typing import Optional
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
+from backend.logging_config import HOT
 
 logger = logging.getLogger(__name__)
 
@@ -19,48 +20,58 @@ class HeyGenHandler:
     def __init__(self):
         self.api_key = getattr(config, 'HEYGEN_API_KEY', None)
         self.avatar_id = getattr(config, 'HEYGEN_AVATAR_ID', None)
-        self.base_url = "https://api.heygen.com/v1"
+        self.base_url = getattr(config, 'HEYGEN_BASE_URL', "https://api.heygen.com/v1").rstrip("/")
+        # One HTTP session per handler keeps connections (and TLS) warm between calls
+        self._http: Optional[aiohttp.ClientSession] = None
         
         if not self.api_key:
             logger.debug("HEYGEN_API_KEY not set - HeyGen integration disabled (this is fine)")
         if not self.avatar_id:
             logger.debug("HEYGEN_AVATAR_ID not set - HeyGen integration disabled (this is fine)")
     
+    def _session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session for every call this handler makes (created on first use)"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                headers={
+                    "X-Api-Key": self.api_key,
+                    "Content-Type": "application/json"
+                },
+                timeout=aiohttp.ClientTimeout(total=config.AVATAR_HTTP_TIMEOUT),
+            )
+        return self._http
+    
+    async def close(self):
+        """Close the HTTP session - call on shutdown"""
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+    
     async def create_streaming_session(self) -> dict:
         """Create a new HeyGen streaming session"""
         if not self.api_key:
             return None
         
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "X-Api-Key": self.api_key,
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "avatar_id": self.avatar_id,
-                    "voice": {
-                        "provider": "elevenlabs",
-                        "voice_id": config.ELEVENLABS_VOICE_ID
-                    }
+            payload = {
+                "avatar_id": self.avatar_id,
+                "voice": {
+                    "provider": "elevenlabs",
+                    "voice_id": config.ELEVENLABS_VOICE_ID
                 }
-                
-                async with session.post(
-                    f"{self.base_url}/streaming.create",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        logger.info(f"HeyGen streaming session created: {data.get('session_id')}")
-                        return data
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"HeyGen API error: {response.status} - {error_text}")
-                        return None
+            }
+            
+            async with self._session().post(f"{self.base_url}/streaming.create", json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    logger.info("HeyGen streaming session created: %s", data.get('session_id'))
+                    return data
+                else:
+                    error_text = await response.text()
+                    logger.error("HeyGen API error: %s - %s", response.status, error_text)
+                    return None
         except Exception as e:
-            logger.error(f"Error creating HeyGen session: {e}")
+            logger.error("Error creating HeyGen session: %s", e)
             return None
     
     async def send_text_to_avatar(self, session_id: str, text: str) -> bool:
@@ -69,31 +80,33 @@ class HeyGenHandler:
             return False
         
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    "X-Api-Key": self.api_key,
-                    "Content-Type": "application/json"
-                }
-                
-                payload = {
-                    "session_id": session_id,
-                    "text": text
-                }
-                
-                async with session.post(
-                    f"{self.base_url}/streaming.say",
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    if response.status == 200:
-                        logger.info(f"Text sent to HeyGen avatar: {text[:50]}...")
-                        return True
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"HeyGen say error: {response.status} - {error_text}")
-                        return False
+            payload = {
+                "session_id": session_id,
+                "text": text
+            }
+            
+            async with self._session().post(f"{self.base_url}/streaming.say", json=payload) as response:
+                if response.status == 200:
+                    logger.debug("Text sent to HeyGen avatar: %.50s...", text, extra=HOT)
+                    return True
+                else:
+                    error_text = await response.text()
+                    logger.error("HeyGen say error: %s - %s", response.status, error_text)
+                    return False
         except Exception as e:
-            logger.error(f"Error sending text to HeyGen: {e}")
+            logger.error("Error sending text to HeyGen: %s", e)
+            return False
+    
+    async def close_session(self, avatar_session: dict) -> bool:
+        """End a streaming session so it stops being billed"""
+        session_id = (avatar_session or {}).get("session_id")
+        if not self.api_key or not session_id:
+            return False
+        try:
+            async with self._session().post(f"{self.base_url}/streaming.stop", json={"session_id": session_id}) as response:
+                return response.status == 200
+        except Exception as e:
+            logger.debug("Error closing HeyGen session: %s", e)
             return False
     
     def get_embed_url(self, session_id: str) -> str:
@@ -101,4 +114,3 @@ class HeyGenHandler:
         if session_id:
             return f"https://app.heygen.com/streaming?session_id={session_id}"
         return None
-
@@ -0,0 +1,196 @@
+"""
+API Key Pools
+Several API keys per provider, so throughput scales with the number of keys.
+
+- every call leases one key: least loaded (fewest calls in flight, then most
+  rate limit headroom) or round robin, per config.API_KEY_STRATEGY
+- a key that gets a 429 rests for Retry-After (or API_KEY_RATE_LIMIT_COOLDOWN),
+  a key rejected with 401/403 rests for API_KEY_AUTH_COOLDOWN; other keys
+  carry the traffic meanwhile
+- each key keeps its own token bucket (rate_limiter) and shared SDK client (clients)
+
+Keys only appear in metrics and logs as fingerprints.
+"""
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.services.clients import get_client
+from backend.services.metrics import metrics
+from backend.services.rate_limiter import acquire_provider, get_provider_limiter, key_fingerprint
+
+logger = logging.getLogger(__name__)
+
+key_calls = metrics.counter("api_key_calls_total", "Provider calls by key fingerprint and outcome (ok, rate_limited, auth, error)")
+key_in_flight = metrics.gauge("api_key_in_flight", "Provider calls in flight by key fingerprint")
+key_cooldowns = metrics.counter("api_key_cooldowns_total", "Times a key was rested, by key fingerprint and reason")
+
+T = TypeVar("T")
+
+# Pick order for equally loaded keys - least recently picked first
+_pick_counter = itertools.count()
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of a provider error (Groq/OpenAI/ElevenLabs SDKs, aiohttp)"""
+    for attr in ("status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from the Retry-After header of a provider error, if it sent one"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_key_error(error: BaseException) -> bool:
+    """Rate limit or auth error - about the key, not the request, so another key may succeed"""
+    return _status_code(error) in (429, 401, 403)
+
+
+class ApiKey:
+    """One key of a pool and its load"""
+    __slots__ = ("provider", "value", "fingerprint", "in_flight", "cooldown_until", "last_pick")
+
+    def __init__(self, provider: str, value: str):
+        self.provider = provider
+        self.value = value
+        self.fingerprint = key_fingerprint(value)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.last_pick = -1
+
+    @property
+    def client(self) -> Any:
+        """Shared SDK client for this key"""
+        return get_client(self.provider, self.value)
+
+    def cooling(self, now: float) -> bool:
+        return self.cooldown_until > now
+
+
+class KeyPool:
+    def __init__(self, provider: str, keys: List[str], strategy: str = "least_loaded"):
+        self.provider = provider
+        # Duplicates would share a bucket anyway
+        self.keys = [ApiKey(provider, value) for value in dict.fromkeys(keys)]
+        self.strategy = strategy
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def ready(self) -> int:
+        """Keys not resting right now"""
+        now = time.monotonic()
+        return sum(not key.cooling(now) for key in self.keys)
+
+    def _rank(self, key: ApiKey):
+        if self.strategy == "round_robin":
+            return (key.last_pick,)
+        headroom = get_provider_limiter(self.provider, key.value).available()
+        return (key.in_flight, -headroom, key.last_pick)
+
+    def pick(self) -> ApiKey:
+        """Best key for the next call - a resting key only if every key is resting"""
+        if not self.keys:
+            raise RuntimeError(f"No {self.provider} API keys configured")
+        now = time.monotonic()
+        ready = [key for key in self.keys if not key.cooling(now)]
+        if ready:
+            key = min(ready, key=self._rank)
+        else:
+            key = min(self.keys, key=lambda key: key.cooldown_until)
+            logger.warning("All %d %s key(s) are cooling down, using %s", len(self.keys), self.provider, key.fingerprint)
+        key.last_pick = next(_pick_counter)
+        return key
+
+    def cool_down(self, key: ApiKey, seconds: float, reason: str):
+        key.cooldown_until = max(key.cooldown_until, time.monotonic() + seconds)
+        key_cooldowns.inc(provider=self.provider, key=key.fingerprint, reason=reason)
+        logger.warning("🔑 %s key %s rests for %.0fs (%s)", self.provider, key.fingerprint, seconds, reason)
+
+    def report(self, key: ApiKey, error: Optional[BaseException] = None):
+        """Record a call's outcome - rate limit and auth errors rest the key"""
+        status = _status_code(error) if error is not None else None
+        if error is None:
+            outcome = "ok"
+        elif status == 429:
+            outcome = "rate_limited"
+            seconds = _retry_after(error) or config.API_KEY_RATE_LIMIT_COOLDOWN
+            # Callers already waiting on this key's bucket slow down too
+            get_provider_limiter(self.provider, key.value).penalize(seconds)
+            self.cool_down(key, seconds, "rate_limited")
+        elif status in (401, 403):
+            outcome = "auth"
+            self.cool_down(key, config.API_KEY_AUTH_COOLDOWN, "auth")
+        else:
+            outcome = "error"
+        key_calls.inc(provider=self.provider, key=key.fingerprint, outcome=outcome)
+
+    @asynccontextmanager
+    async def lease(self):
+        """
+        Pick a key, wait for its rate limit slot and hold it for one call.
+        An exception raised inside the block is reported against the key.
+        """
+        key = self.pick()
+        key.in_flight += 1
+        key_in_flight.set(key.in_flight, provider=self.provider, key=key.fingerprint)
+        try:
+            await acquire_provider(self.provider, key.value)
+            yield key
+        except Exception as e:
+            self.report(key, e)
+            raise
+        else:
+            self.report(key)
+        finally:
+            key.in_flight -= 1
+            key_in_flight.set(key.in_flight, provider=self.provider, key=key.fingerprint)
+
+    async def run(self, call: Callable[[ApiKey], Awaitable[T]]) -> T:
+        """
+        call(key) on a leased key. A key that hits its rate limit or is rejected
+        gets rested, and the call is retried on the next ready key.
+        """
+        for attempt in range(len(self.keys)):
+            try:
+                async with self.lease() as key:
+                    return await call(key)
+            except Exception as e:
+                if not (is_key_error(e) and self.ready() and attempt < len(self.keys) - 1):
+                    raise
+                logger.info("🔑 %s call failed on a resting key, retrying on another key", self.provider)
+        raise RuntimeError(f"No {self.provider} API keys configured")
+
+    def snapshot(self) -> List[Dict]:
+        now = time.monotonic()
+        return [
+            {
+                "key": key.fingerprint,
+                "in_flight": key.in_flight,
+                "cooldown_seconds": round(max(0.0, key.cooldown_until - now), 1),
+                "bucket_tokens": round(get_provider_limiter(self.provider, key.value).available(), 2),
+            }
+            for key in self.keys
+        ]
+
+
+# Shared by every session in this worker process
+key_pools: Dict[str, KeyPool] = {
+    "groq": KeyPool("groq", config.GROQ_API_KEYS, config.API_KEY_STRATEGY),
+    "openai": KeyPool("openai", config.OPENAI_API_KEYS, config.API_KEY_STRATEGY),
+    "elevenlabs": KeyPool("elevenlabs", config.ELEVENLABS_API_KEYS, config.API_KEY_STRATEGY),
+}
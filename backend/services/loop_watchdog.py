@@ -0,0 +1,129 @@
+"""
+Event Loop Watchdog
+Measures event-loop lag continuously and catches blocking calls in the act.
+
+A heartbeat task sleeps for a fixed interval and records how late it woke up
+(lag histogram). A watchdog thread checks that the heartbeat keeps ticking;
+if the loop has been stuck longer than the threshold it captures the loop
+thread's stack right then, while the blocking call is still on it.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+loop_lag_seconds = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop heartbeat woke up", LAG_BUCKETS
+)
+loop_stalls_total = metrics.counter(
+    "event_loop_stalls_total", "Times the event loop was blocked longer than the stall threshold"
+)
+
+
+class LoopWatchdog:
+    def __init__(self, interval: float, threshold: float, max_stalls: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls: Deque[Dict] = deque(maxlen=max_stalls)
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._current_stall: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def start(self):
+        """Start the heartbeat task and watchdog thread (call from the event loop)"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("🐕 Event loop watchdog started (threshold %.0fms)", self.threshold * 1000)
+
+    async def close(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._last_beat = time.monotonic()
+            loop_lag_seconds.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            stall = self._current_stall
+            if stall is not None:
+                # Loop is running again - record how long it was blocked in total
+                stall["duration_ms"] = round(lag * 1000, 1)
+                self._current_stall = None
+                logger.warning(
+                    "🐢 Event loop was blocked for %.0fms",
+                    lag * 1000,
+                    extra={"stall_stack": stall["stack"][-8:]},
+                )
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            blocked_for = time.monotonic() - self._last_beat - self.interval
+            if blocked_for < self.threshold or self._current_stall is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stall = {
+                "detected_at": time.time(),
+                "blocked_ms_at_capture": round(blocked_for * 1000, 1),
+                "duration_ms": None,  # Filled in when the loop recovers
+                "stack": [line.rstrip() for line in traceback.format_stack(frame)],
+            }
+            self._current_stall = stall
+            self.stalls.append(stall)
+            loop_stalls_total.inc()
+
+    def snapshot(self) -> Dict:
+        """Lag histogram and recent stalls, for the admin endpoint"""
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "lag_histogram_seconds": loop_lag_seconds.snapshot(),
+            "stall_count": int(loop_stalls_total.get()),
+            "recent_stalls": list(self.stalls),
+        }
+
+
+# Shared by the whole worker process
+loop_watchdog = LoopWatchdog(
+    interval=config.LOOP_WATCHDOG_INTERVAL,
+    threshold=config.LOOP_STALL_THRESHOLD,
+)
@@ -0,0 +1,170 @@
+"""
+Groq Model Router
+Picks which Groq model answers each call from measured latency and errors.
+
+- every model has a quality tier (1 = small and fast ... 3 = large)
+- each purpose ("turn", "report") has a minimum tier in config - short VC
+  jabs can go to a small model, reports stay on the large ones
+- per model and purpose, latency and error rate are tracked as exponentially
+  weighted moving averages; the fastest healthy model that meets the tier
+  is tried first, unhealthy ones only as a last resort
+- a small share of calls (and any model not tried for a while) explores an
+  alternative, so a model that got faster or recovered is noticed
+"""
+import logging
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# model -> (quality tier, prior latency in seconds for an 80-token answer)
+# The prior only orders models until real measurements come in
+GROQ_MODELS: Dict[str, Tuple[int, float]] = {
+    "llama-3.1-8b-instant": (1, 0.3),
+    "mixtral-8x7b-32768": (2, 0.5),
+    "llama-3.3-70b-versatile": (3, 0.6),
+    "llama-3.1-70b-versatile": (3, 0.7),
+}
+# Models not in the table (e.g. a new GROQ_MODEL) are assumed large
+UNKNOWN_MODEL = (3, 1.0)
+
+# Error-rate EWMA above this marks a model unhealthy
+UNHEALTHY_ERROR_RATE = 0.5
+
+route_total = metrics.counter("llm_route_total", "Groq calls by routed model, purpose and whether it was exploration")
+latency_ewma = metrics.gauge("llm_model_latency_ewma_seconds", "Smoothed Groq call latency by model and purpose")
+error_ewma = metrics.gauge("llm_model_error_ewma", "Smoothed Groq error rate (0-1) by model and purpose")
+
+
+class ModelStats:
+    """Smoothed latency and error rate of one model for one purpose"""
+    __slots__ = ("latency", "error_rate", "samples", "last_sample", "disabled_until")
+
+    def __init__(self, prior_latency: float):
+        self.latency = prior_latency
+        self.error_rate = 0.0
+        self.samples = 0
+        # Trust the prior for a while before exploring
+        self.last_sample = time.monotonic()
+        self.disabled_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.error_rate < UNHEALTHY_ERROR_RATE
+
+
+class ModelRouter:
+    def __init__(self, models: Dict[str, Tuple[int, float]], alpha: float, explore_rate: float,
+                 stale_after: float, disable_for: float):
+        self.models = dict(models)
+        self.alpha = alpha
+        self.explore_rate = explore_rate
+        self.stale_after = stale_after
+        self.disable_for = disable_for
+        # (model, purpose) -> stats
+        self.stats: Dict[Tuple[str, str], ModelStats] = {}
+        # Report windows record from worker threads
+        self._lock = threading.Lock()
+
+    def _info(self, model: str) -> Tuple[int, float]:
+        return self.models.get(model, UNKNOWN_MODEL)
+
+    def _stats(self, model: str, purpose: str) -> ModelStats:
+        stats = self.stats.get((model, purpose))
+        if stats is None:
+            stats = self.stats[(model, purpose)] = ModelStats(self._info(model)[1])
+        return stats
+
+    def min_tier(self, purpose: str) -> int:
+        return config.GROQ_REPORT_MIN_TIER if purpose == "report" else config.GROQ_TURN_MIN_TIER
+
+    def candidates(self, purpose: str, preferred: Optional[str] = None) -> List[str]:
+        """Models to try for one call, best first"""
+        now = time.monotonic()
+        if preferred and preferred not in self.models:
+            self.models[preferred] = UNKNOWN_MODEL
+        tier = self.min_tier(purpose)
+
+        with self._lock:
+            eligible = [
+                model for model, (model_tier, _) in self.models.items()
+                if model_tier >= tier and self._stats(model, purpose).disabled_until <= now
+            ]
+            if not eligible:
+                # Nothing meets the tier (or everything is disabled) - any model beats no answer
+                eligible = [model for model in self.models if self._stats(model, purpose).disabled_until <= now]
+            if not eligible:
+                return [preferred] if preferred else []
+
+            # Ties go to the configured model
+            def rank(model: str):
+                stats = self._stats(model, purpose)
+                return (not stats.healthy, stats.latency, model != preferred)
+
+            ordered = sorted(eligible, key=rank)
+
+            explore = None
+            stale = [m for m in ordered[1:] if now - self._stats(m, purpose).last_sample > self.stale_after]
+            if stale:
+                explore = stale[0]
+            elif len(ordered) > 1 and random.random() < self.explore_rate:
+                explore = random.choice(ordered[1:])
+            if explore:
+                ordered.remove(explore)
+                ordered.insert(0, explore)
+                # Counts as fresh until it reports back - one exploring call per model at a time
+                self._stats(explore, purpose).last_sample = now
+
+        route_total.inc(model=ordered[0], purpose=purpose, explore=str(explore is not None).lower())
+        return ordered
+
+    def record(self, model: str, purpose: str, latency: Optional[float], ok: bool):
+        """Fold one call's outcome into the model's averages (latency only counts on success)"""
+        with self._lock:
+            stats = self._stats(model, purpose)
+            stats.error_rate += self.alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+            if ok and latency is not None:
+                # First real sample replaces the prior outright
+                stats.latency = latency if stats.samples == 0 else stats.latency + self.alpha * (latency - stats.latency)
+                stats.samples += 1
+            stats.last_sample = time.monotonic()
+        latency_ewma.set(stats.latency, model=model, purpose=purpose)
+        error_ewma.set(stats.error_rate, model=model, purpose=purpose)
+
+    def disable(self, model: str, reason: str = ""):
+        """Model is gone (decommissioned, not found) - skip it for every purpose for a while"""
+        until = time.monotonic() + self.disable_for
+        with self._lock:
+            for purpose in ("turn", "report"):
+                self._stats(model, purpose).disabled_until = until
+        logger.warning("Model %s not available, skipping it for %.0fs: %.100s", model, self.disable_for, reason)
+
+    def snapshot(self) -> Dict:
+        return {
+            f"{model}/{purpose}": {
+                "tier": self._info(model)[0],
+                "latency_ewma": round(stats.latency, 4),
+                "error_ewma": round(stats.error_rate, 4),
+                "samples": stats.samples,
+                "healthy": stats.healthy,
+                "disabled": stats.disabled_until > time.monotonic(),
+            }
+            for (model, purpose), stats in sorted(self.stats.items())
+        }
+
+
+model_router = ModelRouter(
+    GROQ_MODELS,
+    alpha=config.ROUTER_EWMA_ALPHA,
+    explore_rate=config.ROUTER_EXPLORE_RATE,
+    stale_after=config.ROUTER_STALE_AFTER,
+    disable_for=config.ROUTER_DISABLE_SECONDS,
+)
@@ -0,0 +1,185 @@
+"""
+Pitch Heuristics
+Instant local scoring of a pitch conversation, no LLM involved.
+
+Conversation features are computed with vectorized NumPy over all founder
+answers at once (milliseconds even for long sessions):
+
+- talk balance: founder words vs VC words
+- answer lengths: how many answers are neither one-liners nor monologues
+- topic coverage: market, revenue, team and moat keywords
+- specificity: numbers, amounts and percentages per 100 words
+- confidence: hedging phrases per 100 words
+
+A fixed linear map turns the features into the report schema. The result is
+marked provisional - it is shown while the LLM report is being generated and
+used in its place when the LLM fails.
+"""
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# (VC question the founder was answering, founder answer) - as in report_generator
+Exchange = Tuple[Optional[str], str]
+
+# Keywords per topic, matched against normalized text padded with spaces:
+# " word " matches the whole word, " prefix" any word starting with it
+TOPIC_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "market": (
+        " market", " customer", " tam ", " sam ", " segment", " demand ", " industry ",
+        " users ", " buyers ", " enterprises ", " smbs ", " billion ",
+    ),
+    "revenue": (
+        " revenue", " pricing ", " price ", " subscription", " margin", " arr ", " mrr ",
+        " paying ", " monetiz", " business model ", " per seat ", " contracts ",
+    ),
+    "team": (
+        " team ", " founder", " cofounder", " co founder", " engineers ", " hired ",
+        " hire ", " experience ", " background ", " advisors ", " cto ", " ceo ",
+    ),
+    "moat": (
+        " moat ", " patent", " proprietary ", " defensib", " network effect", " switching cost",
+        " exclusive ", " competitor", " competition ", " barrier", " data advantage ", " lock in ",
+    ),
+}
+TOPICS = tuple(TOPIC_KEYWORDS)
+
+HEDGES = (
+    " maybe ", " i think ", " i guess ", " hopefully ", " not sure ", " kind of ",
+    " sort of ", " probably ", " we hope ", " i don t know ",
+)
+
+# Numbers, amounts and percentages: "$2M", "40%", "1,200", "3x", "12 months"
+_NUMERIC = re.compile(r"[$€£]?\d[\d,.]*\s*(?:%|x\b|k\b|m\b|b\b|million|billion|thousand)?", re.IGNORECASE)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# Answers outside this many words read as evasive or rambling
+SHORT_ANSWER_WORDS = 8
+LONG_ANSWER_WORDS = 150
+# Mentions of a topic that count as fully covered
+TOPIC_SATURATION = 3.0
+# Numbers per 100 founder words that count as fully specific
+NUMERIC_SATURATION = 3.0
+# Hedges per 100 founder words that count as no confidence at all
+HEDGE_SATURATION = 4.0
+
+# Feature order of FEATURE_WEIGHTS columns
+FEATURES = ("substance", "market", "revenue", "team", "moat", "specificity", "length_fit", "confidence", "talk_balance")
+
+# score = bias + weights @ features, every feature in [0, 1]
+SCORE_BIAS = np.array([2.0, 2.0, 2.0, 2.0])  # idea, market, clarity, moat
+FEATURE_WEIGHTS = np.array([
+    # subst market revenue team  moat  spec  length conf  talk
+    [2.5,  1.0,   2.0,    1.0,  0.0,  1.5,  0.0,   0.0,  0.0],  # idea
+    [0.5,  4.0,   1.0,    0.0,  0.0,  2.5,  0.0,   0.0,  0.0],  # market
+    [1.0,  0.0,   0.0,    0.0,  0.0,  0.5,  2.5,   2.0,  2.0],  # clarity
+    [0.5,  0.0,   0.5,    1.5,  4.0,  1.5,  0.0,   0.0,  0.0],  # moat
+])
+
+# feature -> (strength when high, weakness when low)
+FEATURE_NOTES = {
+    "market": ("Spoke concretely about the market and customers", "Market size and target customers not addressed"),
+    "revenue": ("Explained how the business makes money", "Business model and pricing unclear"),
+    "team": ("Made the case for the team", "Little said about the team behind it"),
+    "moat": ("Addressed competition and defensibility", "Competitive positioning unclear"),
+    "specificity": ("Backed claims with concrete numbers", "Few concrete numbers - claims lack evidence"),
+    "length_fit": ("Answers were focused and to the point", "Answers were either too short or rambling"),
+    "confidence": ("Answered with conviction", "Frequent hedging undermined confidence"),
+    "talk_balance": ("Drove the conversation", "The VC did most of the talking"),
+}
+STRENGTH_THRESHOLD = 0.6
+WEAKNESS_THRESHOLD = 0.35
+
+prescore_seconds = metrics.histogram(
+    "report_prescore_seconds",
+    "Time to compute the heuristic pre-score of a conversation",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+def _normalize(texts: List[str]) -> np.ndarray:
+    """Lowercase, punctuation to single spaces, padded so every word has a space on both sides"""
+    words = (_NON_WORD.sub(" ", text.lower()).strip() for text in texts)
+    return np.array([f" {text} " if text else " " for text in words], dtype=np.str_)
+
+
+def _keyword_counts(texts: np.ndarray, keywords: Tuple[str, ...]) -> np.ndarray:
+    """Occurrences of any of the keywords, per text"""
+    return np.sum([np.char.count(texts, keyword) for keyword in keywords], axis=0)
+
+
+def conversation_features(exchanges: List[Exchange]) -> Dict[str, float]:
+    """Features of the founder's answers, each scaled to [0, 1] (plus the raw talk_ratio)"""
+    answers = [answer for _, answer in exchanges]
+    questions = [question for question, _ in exchanges if question]
+
+    # Normalized text keeps word boundaries only - one space per boundary
+    founder_text = _normalize(answers)
+    answer_words = np.char.count(founder_text, " ") - 1
+    vc_words = int((np.char.count(_normalize(questions), " ") - 1).sum()) if questions else 0
+    total_words = max(1, int(answer_words.sum()))
+    per_100 = 100.0 / total_words
+
+    # topic x answer mention counts, saturating per topic across the conversation
+    mentions = np.array([_keyword_counts(founder_text, TOPIC_KEYWORDS[topic]) for topic in TOPICS])
+    coverage = np.minimum(1.0, mentions.sum(axis=1) / TOPIC_SATURATION)
+
+    numbers = np.array([len(_NUMERIC.findall(answer)) for answer in answers])
+    hedges = _keyword_counts(founder_text, HEDGES)
+
+    talk_ratio = total_words / max(1, vc_words)
+    features = {
+        "substance": float(np.minimum(1.0, np.median(answer_words) / 40.0)),
+        **{topic: float(value) for topic, value in zip(TOPICS, coverage)},
+        "specificity": float(min(1.0, numbers.sum() * per_100 / NUMERIC_SATURATION)),
+        "length_fit": float(np.mean((answer_words >= SHORT_ANSWER_WORDS) & (answer_words <= LONG_ANSWER_WORDS))),
+        "confidence": float(max(0.0, 1.0 - hedges.sum() * per_100 / HEDGE_SATURATION)),
+        # Founder should talk at least twice as much as the VC
+        "talk_balance": float(min(1.0, talk_ratio / 2.0)),
+    }
+    features["talk_ratio"] = round(talk_ratio, 2)
+    return features
+
+
+def score_exchanges(exchanges: List[Exchange]) -> Optional[Dict]:
+    """Provisional report from conversation features - None without founder answers"""
+    if not exchanges:
+        return None
+    started = time.perf_counter()
+
+    features = conversation_features(exchanges)
+    vector = np.array([features[name] for name in FEATURES])
+    scores = np.clip(np.rint(SCORE_BIAS + FEATURE_WEIGHTS @ vector), 0, 10).astype(int)
+    # Mean score 5 -> 20%, like the default report; 10 -> 70%
+    probability = int(np.clip(round((scores.mean() - 3) * 10), 0, 100))
+
+    # Strongest and weakest features first, ties in FEATURE_NOTES order (content before delivery)
+    strengths = [
+        FEATURE_NOTES[name][0] for name in sorted(FEATURE_NOTES, key=lambda name: -features[name])
+        if features[name] >= STRENGTH_THRESHOLD
+    ][:3]
+    weaknesses = [
+        FEATURE_NOTES[name][1] for name in sorted(FEATURE_NOTES, key=lambda name: features[name])
+        if features[name] < WEAKNESS_THRESHOLD
+    ][:3]
+
+    report = {
+        "strengths": strengths or ["Engaged in conversation"],
+        "weaknesses": weaknesses or ["Needs deeper evaluation of the full pitch"],
+        "scores": dict(zip(("idea", "market", "clarity", "moat"), scores.tolist())),
+        "investment_probability": probability,
+        "provisional": True,
+        "features": {name: round(value, 3) for name, value in features.items()},
+    }
+    prescore_seconds.observe(time.perf_counter() - started)
+    return report
@@ -0,0 +1,166 @@
+"""
+On-demand Profiler
+Samples the event loop for a fixed window and returns collapsed stacks
+("frame;frame;frame count" lines) that flamegraph.pl, speedscope and
+inferno read directly. Nothing is installed until a profile is requested,
+so there is no overhead when profiling is off.
+
+Modes:
+- cpu:   a background thread samples the event loop thread's real stack,
+         showing where CPU goes (JSON encoding, base64, sync SDK calls, logging)
+- async: a task on the loop samples every task's await chain, showing where
+         turns spend wall time waiting (providers, rate limits, admission queue)
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Functions whose frames carry the session ID in a local called connection_id
+_SESSION_FRAMES = ("websocket_endpoint", "generate_report_endpoint")
+
+# Leaf frames that mean the loop is waiting for I/O rather than running code
+_IDLE_FRAMES = {"select", "poll", "epoll", "_run_once", "run_forever"}
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    # Spaces are fine - collapsed-stack readers split the count on the last one
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _matches_session(frames: Iterable, session_id: Optional[str]) -> bool:
+    if not session_id:
+        return True
+    for frame in frames:
+        if frame.f_code.co_name in _SESSION_FRAMES:
+            if str(frame.f_locals.get("connection_id")) == session_id:
+                return True
+    return False
+
+
+def _await_chain(coro) -> List:
+    """Frames of a suspended task, outermost coroutine first"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return frames
+
+
+class Profile:
+    """One profiling window"""
+
+    def __init__(self, mode: str, seconds: float, interval: float, session_id: Optional[str] = None):
+        if mode not in ("cpu", "async"):
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.mode = mode
+        self.seconds = seconds
+        self.interval = interval
+        self.session_id = session_id
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.idle_count = 0
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text, most frequent stacks first"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    # --- cpu mode -------------------------------------------------------
+
+    def _sample_thread(self, thread_id: int):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            return
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        self.sample_count += 1
+        if frames[0].f_code.co_name in _IDLE_FRAMES:
+            self.idle_count += 1
+            return
+        if not _matches_session(frames, self.session_id):
+            return
+        self.samples[";".join(_frame_label(f.f_code) for f in reversed(frames))] += 1
+
+    def _run_cpu(self, thread_id: int, stop: threading.Event):
+        while not stop.is_set():
+            self._sample_thread(thread_id)
+            stop.wait(self.interval)
+
+    # --- async mode -----------------------------------------------------
+
+    def _sample_tasks(self, loop: asyncio.AbstractEventLoop):
+        self.sample_count += 1
+        current = asyncio.current_task(loop)
+        for task in asyncio.all_tasks(loop):
+            if task is current:
+                continue
+            frames = _await_chain(task.get_coro())
+            if not frames or not _matches_session(frames, self.session_id):
+                continue
+            stack = [f"[task] {task.get_name()}"] + [_frame_label(f.f_code) for f in frames]
+            self.samples[";".join(stack)] += 1
+
+    async def _run_async(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.seconds
+        while loop.time() < deadline:
+            self._sample_tasks(loop)
+            await asyncio.sleep(self.interval)
+
+    # --- driver ---------------------------------------------------------
+
+    async def run(self) -> "Profile":
+        """Sample for the configured window (must be awaited on the event loop)"""
+        started = time.perf_counter()
+        if self.mode == "cpu":
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._run_cpu,
+                args=(threading.get_ident(), stop),
+                name="profiler-sampler",
+                daemon=True,
+            )
+            sampler.start()
+            try:
+                await asyncio.sleep(self.seconds)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+        else:
+            await self._run_async()
+
+        logger.info(
+            "🔬 %s profile done: %d samples (%d idle) in %.1fs, %d unique stacks",
+            self.mode, self.sample_count, self.idle_count,
+            time.perf_counter() - started, len(self.samples),
+        )
+        return self
+
+
+_profile_lock = asyncio.Lock()
+
+
+async def run_profile(mode: str, seconds: float, interval: float, session_id: Optional[str] = None) -> Profile:
+    """Run one profile at a time - raises RuntimeError if one is already running"""
+    if _profile_lock.locked():
+        raise RuntimeError("A profile is already running")
+    async with _profile_lock:
+        return await Profile(mode, seconds, interval, session_id).run()
@@ -0,0 +1,225 @@
+"""
+Admission Control and Rate Limiting
+Keeps provider traffic inside per-key quotas so load turns into a short,
+visible wait instead of 429s and canned fallback responses.
+
+- TokenBucket: per provider + API key request rate limiter
+- AdmissionController: global concurrency limit with a fair queue per session,
+  interactive turns are always admitted before report generation
+"""
+import asyncio
+import contextvars
+import hashlib
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+
+logger = logging.getLogger(__name__)
+
+# Lower value = higher priority
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REPORT = 1
+
+# Callback used to tell the client it is waiting, e.g. notify("queued", position=3)
+QueueNotifier = Callable[..., Awaitable[None]]
+
+_queue_notifier: contextvars.ContextVar[Optional[QueueNotifier]] = contextvars.ContextVar(
+    "queue_notifier", default=None
+)
+
+
+def set_queue_notifier(notifier: Optional[QueueNotifier]):
+    """Register the callback that reports queueing for the current task context"""
+    return _queue_notifier.set(notifier)
+
+
+async def _notify(status: str, **info):
+    notifier = _queue_notifier.get()
+    if not notifier:
+        return
+    try:
+        await notifier(status, **info)
+    except Exception as e:
+        logger.debug("Queue notifier failed: %s", e)
+
+
+class TokenBucket:
+    """Classic token bucket - `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available. Returns 0 on success, otherwise seconds to wait"""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until tokens are available. Returns the total time spent waiting"""
+        started = time.monotonic()
+        async with self._lock:
+            notified = False
+            while True:
+                wait = self.try_acquire(tokens)
+                if wait <= 0:
+                    break
+                if not notified:
+                    await _notify("queued", wait_seconds=round(wait, 1))
+                    notified = True
+                await asyncio.sleep(wait)
+        return time.monotonic() - started
+
+    def available(self) -> float:
+        """Tokens banked right now (negative while paying off a penalty)"""
+        self._refill()
+        return self.tokens
+
+    def penalize(self, seconds: float):
+        """Drain the bucket after the provider pushed back (e.g. a 429)"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+# (provider, key fingerprint) -> bucket
+_provider_limiters: Dict[Tuple[str, str], TokenBucket] = {}
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    if not api_key:
+        return "default"
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+def get_provider_limiter(provider: str, api_key: Optional[str] = None) -> TokenBucket:
+    """Get the shared token bucket for a provider + API key"""
+    key = (provider, key_fingerprint(api_key))
+    limiter = _provider_limiters.get(key)
+    if limiter is None:
+        rate, burst = config.PROVIDER_RATE_LIMITS.get(provider, (1.0, 1.0))
+        # Every worker process has its own buckets - split the quota between them
+        workers = max(1, config.WORKERS)
+        limiter = TokenBucket(rate / workers, burst / workers)
+        _provider_limiters[key] = limiter
+    return limiter
+
+
+async def acquire_provider(provider: str, api_key: Optional[str] = None) -> float:
+    """Wait for a request slot for this provider + API key"""
+    waited = await get_provider_limiter(provider, api_key).acquire()
+    if waited > 0.05:
+        logger.info("⏳ Waited %.2fs for %s rate limit", waited, provider)
+    return waited
+
+
+class AdmissionController:
+    """
+    Global concurrency limit for provider-bound work.
+    Waiters are grouped by priority, and within a priority each session gets
+    one slot in turn so a single busy tab cannot starve everyone else.
+    """
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max(1, max_concurrent)
+        self.active = 0
+        self._waiters: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            PRIORITY_INTERACTIVE: OrderedDict(),
+            PRIORITY_REPORT: OrderedDict(),
+        }
+
+    @property
+    def queued(self) -> int:
+        return sum(len(q) for sessions in self._waiters.values() for q in sessions.values())
+
+    def _position(self, priority: int) -> int:
+        """Approximate position of a new waiter at this priority"""
+        return sum(
+            len(q)
+            for p, sessions in self._waiters.items() if p <= priority
+            for q in sessions.values()
+        )
+
+    async def acquire(self, session_id: str, priority: int = PRIORITY_INTERACTIVE):
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        sessions = self._waiters.setdefault(priority, OrderedDict())
+        sessions.setdefault(session_id, deque()).append(future)
+
+        position = self._position(priority)
+        logger.info("⏳ Session %s queued (position %d, active %d)", session_id, position, self.active)
+        await _notify("queued", position=position)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot was handed to us just as we got cancelled - pass it on
+                self.release()
+            else:
+                self._discard(sessions, session_id, future)
+            raise
+
+        await _notify("admitted")
+
+    def _discard(self, sessions, session_id: str, future: asyncio.Future):
+        queue = sessions.get(session_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del sessions[session_id]
+
+    def release(self):
+        """Hand the slot to the next waiter, or free it"""
+        for priority in sorted(self._waiters):
+            sessions = self._waiters[priority]
+            while sessions:
+                session_id, queue = next(iter(sessions.items()))
+                future = queue.popleft()
+                if queue:
+                    # Round-robin: this session goes to the back of the line
+                    sessions.move_to_end(session_id)
+                else:
+                    del sessions[session_id]
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self.active = max(0, self.active - 1)
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, priority: int = PRIORITY_INTERACTIVE):
+        await self.acquire(session_id, priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+# Shared by every connection in this worker process
+admission_controller = AdmissionController(config.MAX_CONCURRENT_TURNS)
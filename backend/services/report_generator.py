@@ -1,18 +1,42 @@
 """
 Pitch Report Generator
 Analyzes conversation history and generates structured feedback report
+
+Long sessions are evaluated map-reduce style: the transcript is split into
+windows of paired VC question / founder answer turns, the windows are scored
+concurrently on a cheaper model, and the window reports are merged into the
+same report structure. Report latency stays bounded however long the pitch was.
+
+A provisional report from local conversation heuristics (pitch_heuristics) is
+available instantly, and replaces the static default when the LLM fails.
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from collections import Counter
+import asyncio
 import json
+import re
 import sys
 import os
+import time
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
 import logging
+from backend.services.key_pool import key_pools
+from backend.services.usage_tracker import usage_tracker
+from backend.services.model_router import model_router
+from backend.services.pitch_heuristics import score_exchanges
 
 logger = logging.getLogger(__name__)
 
+SCORE_KEYS = ("idea", "market", "clarity", "moat")
+
+# Cheaper models for scoring windows of a long session
+WINDOW_MODELS = {"groq": "llama-3.1-8b-instant", "openai": "gpt-4o-mini"}
+
+# (VC question the founder was answering, founder answer)
+Exchange = Tuple[Optional[str], str]
+
 class ReportGenerator:
     def __init__(self, llm_client, llm_model, is_groq: bool):
         self.llm_client = llm_client
@@ -29,7 +53,6 @@ class ReportGenerator:
                 "weaknesses": ["...", "..."],
                 "scores": {
                     "idea": 8,
-                    "team": 7,
                     "market": 9,
                     "clarity": 6,
                     "moat": 5
@@ -38,43 +61,71 @@ class ReportGenerator:
             }
         """
         
-        # Extract user messages (the pitch) and VC questions
-        user_messages = []
-        vc_questions = []
+        # Pair each founder answer with the VC question it responds to (system message is skipped)
+        exchanges = self._pair_turns(conversation_history)
         
-        for msg in conversation_history:
-            if msg.get("role") == "user":
-                user_messages.append(msg.get("content", ""))
-            elif msg.get("role") == "assistant":
-                vc_questions.append(msg.get("content", ""))
-        
-        # Skip system message
-        if not user_messages:
+        if not exchanges:
             logger.warning("No user messages in conversation history")
             return self._get_default_report()
         
+        if len(exchanges) > config.REPORT_CHUNK_THRESHOLD:
+            return await self._generate_chunked(exchanges)
+        
         # Create evaluation prompt
-        evaluation_prompt = self._create_evaluation_prompt(user_messages, vc_questions)
+        evaluation_prompt = self._create_evaluation_prompt(exchanges)
         
-        # Get LLM evaluation
-        report_json = await self._get_llm_evaluation(evaluation_prompt)
+        # Get LLM evaluation - on Groq, from the fastest healthy model of the report tier
+        model = self.llm_model
+        if self.is_groq:
+            model = (model_router.candidates("report", preferred=self.llm_model) or [model])[0]
+        report = await self._get_llm_evaluation(
+            evaluation_prompt, model, max_tokens=500, timeout=config.REPORT_TIMEOUT
+        )
         
-        return report_json
+        return report or self._fallback_report(exchanges)
+    
+    def pre_score(self, conversation_history: List[Dict[str, str]]) -> Dict:
+        """Provisional report from conversation heuristics - milliseconds, no LLM call"""
+        return self._fallback_report(self._pair_turns(conversation_history))
     
-    def _create_evaluation_prompt(self, user_messages: List[str], vc_questions: List[str]) -> str:
-        """Create prompt for LLM to evaluate the pitch"""
+    def _fallback_report(self, exchanges: List[Exchange]) -> Dict:
+        """Heuristic report when the LLM gives nothing, the static default without answers"""
+        return score_exchanges(exchanges) or self._get_default_report()
+    
+    @staticmethod
+    def _pair_turns(conversation_history: List[Dict[str, str]]) -> List[Exchange]:
+        """Founder answers in order, each with the VC message that came right before it"""
+        exchanges = []
+        question = None
+        for msg in conversation_history:
+            if msg.get("role") == "assistant":
+                question = msg.get("content", "")
+            elif msg.get("role") == "user":
+                exchanges.append((question, msg.get("content", "")))
+                question = None
+        return exchanges
+    
+    def _create_evaluation_prompt(self, exchanges: List[Exchange], part: Optional[Tuple[int, int]] = None) -> str:
+        """Create prompt for LLM to evaluate the pitch (or one window of it)"""
         
         # Build conversation text
         conversation_parts = []
-        for i, user_msg in enumerate(user_messages):
-            if i < len(vc_questions):
-                conversation_parts.append(f"VC: {vc_questions[i]}")
-            conversation_parts.append(f"Founder: {user_msg}")
+        for question, answer in exchanges:
+            if question:
+                conversation_parts.append(f"VC: {question}")
+            conversation_parts.append(f"Founder: {answer}")
         
         conversation_text = "\n".join(conversation_parts)
         
+        scope = ""
+        if part:
+            scope = (
+                f"\nThis is part {part[0]} of {part[1]} of a longer pitch conversation. "
+                "Evaluate only what the founder said in this part.\n"
+            )
+        
         prompt = f"""You are a VC investor evaluating a pitch conversation. Analyze the founder's responses and provide a structured evaluation.
-
+{scope}
 CONVERSATION:
 {conversation_text}
 
@@ -101,55 +152,147 @@ Be harsh but fair. Only return valid JSON, no other text."""
         
         return prompt
     
-    async def _get_llm_evaluation(self, prompt: str) -> Dict:
-        """Get evaluation from LLM"""
+    def _windows(self, exchanges: List[Exchange]) -> List[List[Exchange]]:
+        """Split into windows of whole exchanges, sampled evenly if there are too many"""
+        size = max(1, config.REPORT_WINDOW_EXCHANGES)
+        windows = [exchanges[i:i + size] for i in range(0, len(exchanges), size)]
+        limit = max(1, config.REPORT_MAX_WINDOWS)
+        if len(windows) > limit:
+            # Always keep the opening pitch and the final answers
+            step = (len(windows) - 1) / max(1, limit - 1)
+            windows = [windows[round(i * step)] for i in range(limit)]
+        return windows
+    
+    async def _generate_chunked(self, exchanges: List[Exchange]) -> Dict:
+        """Score windows concurrently and merge whatever finishes within REPORT_TIMEOUT"""
+        started = time.perf_counter()
+        windows = self._windows(exchanges)
+        model = config.REPORT_WINDOW_MODEL or WINDOW_MODELS["groq" if self.is_groq else "openai"]
+        semaphore = asyncio.Semaphore(max(1, config.REPORT_MAX_PARALLEL))
+        
+        async def evaluate(index: int, window: List[Exchange]) -> Optional[Dict]:
+            async with semaphore:
+                prompt = self._create_evaluation_prompt(window, part=(index + 1, len(windows)))
+                return await self._get_llm_evaluation(prompt, model, max_tokens=350)
+        
+        tasks = [asyncio.create_task(evaluate(i, window)) for i, window in enumerate(windows)]
+        done, pending = await asyncio.wait(tasks, timeout=config.REPORT_TIMEOUT)
+        for task in pending:
+            task.cancel()
+        
+        results = [
+            (window, task.result())
+            for window, task in zip(windows, tasks)
+            if task in done and not task.exception() and task.result()
+        ]
+        logger.info(
+            "📊 Scored %d/%d report windows (%d answers) with %s in %.1fs",
+            len(results), len(windows), len(exchanges), model, time.perf_counter() - started,
+        )
+        
+        if not results:
+            return self._fallback_report(exchanges)
+        return self._merge_reports(results)
+    
+    def _merge_reports(self, results: List[Tuple[List[Exchange], Dict]]) -> Dict:
+        """Combine window reports - scores weighted by how much the founder said in each window"""
+        weights = [max(1, sum(len(answer) for _, answer in window)) for window, _ in results]
+        total = sum(weights)
+        
+        def weighted(value_of) -> int:
+            return round(sum(weight * value_of(report) for weight, (_, report) in zip(weights, results)) / total)
+        
+        merged = {
+            "strengths": self._top_points([report["strengths"] for _, report in results]),
+            "weaknesses": self._top_points([report["weaknesses"] for _, report in results]),
+            "scores": {key: weighted(lambda report: report["scores"][key]) for key in SCORE_KEYS},
+            "investment_probability": weighted(lambda report: report["investment_probability"]),
+        }
+        return self._validate_report(merged)
+    
+    @staticmethod
+    def _top_points(point_lists: List[List[str]], limit: int = 3) -> List[str]:
+        """Points raised in the most windows first, duplicates folded together"""
+        counts: Counter = Counter()
+        first_seen: Dict[str, str] = {}
+        for points in point_lists:
+            for point in points:
+                key = re.sub(r"[^a-z0-9 ]", "", str(point).lower()).strip()
+                if not key:
+                    continue
+                counts[key] += 1
+                first_seen.setdefault(key, point)
+        # Counter.most_common keeps first-seen order for ties
+        return [first_seen[key] for key, _ in counts.most_common(limit)]
+    
+    async def _get_llm_evaluation(self, prompt: str, model: str, max_tokens: int = 500,
+                                  timeout: Optional[float] = None) -> Optional[Dict]:
+        """Get evaluation from LLM - None if it fails or times out"""
         result = None
         try:
             if not self.llm_client:
                 logger.warning("No LLM client available, using default report")
-                return self._get_default_report()
+                return None
             
             messages = [
                 {"role": "system", "content": "You are a VC investor evaluating startup pitches. Always respond with valid JSON only."},
                 {"role": "user", "content": prompt}
             ]
             
-            if self.is_groq:
-                response = self.llm_client.chat.completions.create(
-                    model=self.llm_model,
-                    messages=messages,
-                    temperature=0.7,
-                    max_tokens=500
-                )
-                result = response.choices[0].message.content.strip()
-            else:
-                response = self.llm_client.chat.completions.create(
-                    model=self.llm_model,
+            provider = "groq" if self.is_groq else "openai"
+            
+            async def evaluate(key):
+                # The Groq and OpenAI SDK clients are synchronous - run the call off the
+                # event loop so windows overlap and other sessions keep being served
+                call = asyncio.to_thread(
+                    key.client.chat.completions.create,
+                    model=model,
                     messages=messages,
                     temperature=0.7,
-                    max_tokens=500
+                    max_tokens=max_tokens
                 )
-                result = response.choices[0].message.content.strip()
+                started = time.perf_counter()
+                response = await (asyncio.wait_for(call, timeout) if timeout else call)
+                return response, time.perf_counter() - started
             
-            # Extract JSON from response (handle markdown code blocks)
-            if "```json" in result:
-                result = result.split("```json")[1].split("```")[0].strip()
-            elif "```" in result:
-                result = result.split("```")[1].split("```")[0].strip()
+            # Each window leases its own key, so concurrent windows spread over the pool
+            try:
+                response, latency = await key_pools[provider].run(evaluate)
+            except Exception:
+                if self.is_groq:
+                    model_router.record(model, "report", None, ok=False)
+                raise
+            if self.is_groq:
+                model_router.record(model, "report", latency, ok=True)
+            usage_tracker.record_llm(response, provider, model, "report")
+            result = response.choices[0].message.content.strip()
             
+            result = self._extract_json(result)
             report = json.loads(result)
             
             # Validate and normalize
             return self._validate_report(report)
             
+        except asyncio.TimeoutError:
+            logger.error("Report evaluation timed out after %.0fs", timeout)
+            return None
         except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {e}")
+            logger.error("Failed to parse LLM response as JSON: %s", e)
             if result:
-                logger.error(f"Response was: {result[:200]}")
-            return self._get_default_report()
+                logger.error("Response was: %.200s", result)
+            return None
         except Exception as e:
-            logger.error(f"Error generating report: {e}")
-            return self._get_default_report()
+            logger.error("Error generating report: %s", e)
+            return None
+    
+    @staticmethod
+    def _extract_json(result: str) -> str:
+        """Extract JSON from response (handle markdown code blocks)"""
+        if "```json" in result:
+            result = result.split("```json")[1].split("```")[0].strip()
+        elif "```" in result:
+            result = result.split("```")[1].split("```")[0].strip()
+        return result
     
     def _validate_report(self, report: Dict) -> Dict:
         """Validate and normalize report structure"""
@@ -0,0 +1,399 @@
+"""
+Report Store
+Every generated pitch report, kept as memory-mapped NumPy columns for analytics.
+
+- one fixed-width file per column (timestamp, the four scores, investment
+  probability, answers, source, cohort) plus a small meta.json with the row
+  count and the cohort names; files grow by doubling
+- each worker process appends to its own shard directory (held with a file
+  lock - a process that finds its shard taken, e.g. uvicorn workers in
+  WORKER_MODE=shared without a WORKER_ID, takes over a pid-named shard no
+  live process holds, or creates one named by its own pid); queries read
+  the other shards read-only
+- aggregates are maintained incrementally as rows arrive: a value histogram
+  per metric (scores are 0-10 and the probability 0-100, so means,
+  percentiles and distributions are exact from it) and a cross-product
+  matrix for correlations, overall and per cohort
+- queries without a time window only touch the aggregates; rows are appended
+  in time order, so a time window is a binary search on the timestamp
+  column plus one vectorized pass over the rows inside it
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import sys
+import os
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows - one process per store directory is up to the deployment
+    fcntl = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+
+logger = logging.getLogger(__name__)
+
+# Report fields stored per row, in column order of the values matrix
+METRICS = ("idea", "market", "clarity", "moat", "investment_probability")
+# Scores use bins 0-10, the probability 0-100
+VALUE_BINS = 101
+SOURCES = ("llm", "heuristic")
+PERCENTILES = (10, 25, 50, 75, 90)
+
+COLUMNS = {
+    "ts": np.float64,
+    **{metric: np.uint8 for metric in METRICS},
+    "answers": np.uint16,
+    "source": np.uint8,
+    "cohort": np.uint16,
+}
+
+DEFAULT_COHORT = "default"
+# Cohort codes are uint16; past this many names new cohorts are folded into "other"
+MAX_COHORTS = 1000
+
+
+class Aggregates:
+    """Sufficient statistics of a set of reports - merged incrementally, queried in O(1)"""
+    __slots__ = ("count", "hist", "cross", "sources")
+
+    def __init__(self):
+        self.count = 0
+        self.hist = np.zeros((len(METRICS), VALUE_BINS), dtype=np.int64)
+        self.cross = np.zeros((len(METRICS), len(METRICS)), dtype=np.float64)
+        self.sources = np.zeros(len(SOURCES), dtype=np.int64)
+
+    def add(self, values: np.ndarray, sources: np.ndarray):
+        """Fold in rows: values is (n, len(METRICS)) integers, sources (n,) codes"""
+        if not len(values):
+            return
+        self.count += len(values)
+        for i in range(len(METRICS)):
+            self.hist[i] += np.bincount(values[:, i], minlength=VALUE_BINS)[:VALUE_BINS]
+        as_float = values.astype(np.float64)
+        self.cross += as_float.T @ as_float
+        self.sources += np.bincount(sources, minlength=len(SOURCES))[:len(SOURCES)]
+
+    def summary(self) -> Dict:
+        if not self.count:
+            return {"reports": 0}
+        bins = np.arange(VALUE_BINS, dtype=np.float64)
+        mean = self.hist @ bins / self.count
+        variance = np.maximum(0.0, np.diag(self.cross) / self.count - mean ** 2)
+        std = np.sqrt(variance)
+
+        # Nearest-rank percentiles from the cumulative histogram
+        cumulative = np.cumsum(self.hist, axis=1)
+        ranks = np.maximum(1, np.ceil(np.array(PERCENTILES) / 100 * self.count))
+        percentiles = np.array([np.searchsorted(row, ranks) for row in cumulative])
+
+        covariance = self.cross / self.count - np.outer(mean, mean)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = covariance / np.outer(std, std)
+        correlation = np.nan_to_num(correlation)
+
+        metrics = {}
+        for i, metric in enumerate(METRICS):
+            if metric == "investment_probability":
+                # 10-point buckets, 100 in the last one
+                distribution = np.add.reduceat(self.hist[i], np.arange(0, VALUE_BINS - 1, 10))
+                distribution[-1] += self.hist[i][-1]
+            else:
+                distribution = self.hist[i][:11]
+            metrics[metric] = {
+                "mean": round(float(mean[i]), 2),
+                "std": round(float(std[i]), 2),
+                **{f"p{q}": int(value) for q, value in zip(PERCENTILES, percentiles[i])},
+                "distribution": distribution.tolist(),
+            }
+        return {
+            "reports": self.count,
+            "metrics": metrics,
+            "correlations": {
+                metric: {other: round(float(correlation[i, j]), 3) for j, other in enumerate(METRICS) if j != i}
+                for i, metric in enumerate(METRICS)
+            },
+            "sources": dict(zip(SOURCES, self.sources.tolist())),
+        }
+
+    def means(self) -> np.ndarray:
+        return self.hist @ np.arange(VALUE_BINS, dtype=np.float64) / max(1, self.count)
+
+
+class ReportShard:
+    """One worker's columns - writable for the owning process, read-only for the others"""
+
+    def __init__(self, directory: Path, writable: bool, initial_capacity: int = 4096):
+        self.directory = directory
+        self.writable = writable
+        self.initial_capacity = initial_capacity
+        self.count = 0
+        self.capacity = 0
+        self.cohorts: List[str] = []
+        self.columns: Dict[str, np.ndarray] = {}
+
+    @property
+    def meta_path(self) -> Path:
+        return self.directory / "meta.json"
+
+    def _column_path(self, name: str) -> Path:
+        return self.directory / f"{name}.bin"
+
+    def load(self) -> bool:
+        """(Re)read the row count and map the columns. True if there are new rows"""
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            meta = {"count": 0, "cohorts": []}
+        count = int(meta["count"])
+        changed = count != self.count or not self.columns
+        self.cohorts = list(meta["cohorts"])
+        if self.writable:
+            self.count = count
+            self._map(max(self.initial_capacity, count))
+        elif changed and count:
+            # Read-only maps cover exactly the committed rows
+            self.columns = {
+                name: np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(count,))
+                for name, dtype in COLUMNS.items()
+            }
+            self.count = count
+        return changed
+
+    def _map(self, capacity: int):
+        """Map every column with room for capacity rows, growing the files as needed"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for column in self.columns.values():
+            column.flush()
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            size = capacity * np.dtype(dtype).itemsize
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self.columns[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def cohort_code(self, name: str) -> int:
+        if name not in self.cohorts:
+            if len(self.cohorts) >= MAX_COHORTS:
+                name = "other"
+                if name in self.cohorts:
+                    return self.cohorts.index(name)
+            self.cohorts.append(name)
+        return self.cohorts.index(name)
+
+    def extend(self, rows: Dict[str, np.ndarray]):
+        """Append rows (one array per column, equal lengths) and commit the new count"""
+        n = len(rows["ts"])
+        if self.count + n > self.capacity:
+            capacity = max(self.initial_capacity, self.capacity)
+            while capacity < self.count + n:
+                capacity *= 2
+            self._map(capacity)
+        for name in COLUMNS:
+            self.columns[name][self.count:self.count + n] = rows[name]
+        self.count += n
+        # Rows become visible to other workers once the count is committed
+        tmp = self.meta_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"count": self.count, "cohorts": self.cohorts}, f)
+        os.replace(tmp, self.meta_path)
+
+    def rows(self, start: int = 0, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        end = self.count if end is None else end
+        if not self.columns:
+            return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        return {name: self.columns[name][start:end] for name in COLUMNS}
+
+    def flush(self):
+        for column in self.columns.values():
+            column.flush()
+
+
+def _values(rows: Dict[str, np.ndarray]) -> np.ndarray:
+    """(n, len(METRICS)) matrix of the metric columns"""
+    return np.stack([rows[metric] for metric in METRICS], axis=1).astype(np.int64)
+
+
+class ReportStore:
+    def __init__(self, directory: str, shard_name: Optional[str] = None, initial_capacity: int = 4096):
+        self.directory = Path(directory)
+        self.shard_name = shard_name
+        self.initial_capacity = initial_capacity
+        self.shards: Dict[str, ReportShard] = {}
+        # Aggregates over every shard, and the rows of each shard already folded in
+        self.total = Aggregates()
+        self.by_cohort: Dict[str, Aggregates] = {}
+        self._folded: Dict[str, int] = {}
+        # Appends run in worker threads (asyncio.to_thread), queries on the event loop
+        self._lock = threading.Lock()
+        self._lock_file = None
+
+    @property
+    def own(self) -> ReportShard:
+        return self.shards[self.shard_name]
+
+    def open(self):
+        """Map this worker's shard (creating it) and fold in every shard's rows"""
+        # Each worker writes its own shard - resolved here, once the launcher has set WORKER_ID
+        name = self.shard_name or f"worker-{config.WORKER_ID or 0}"
+        if not self._lock_shard(name):
+            # Another process writes that shard (uvicorn workers share WORKER_ID=None) - reuse
+            # the fallback shard of an exited process, so restarts do not pile up new ones
+            taken = sorted(self.directory.glob("pid-*")) if self.directory.exists() else []
+            name = next((path.name for path in taken if path.is_dir() and self._lock_shard(path.name)), None)
+            if name is None:
+                name = f"pid-{os.getpid()}"
+                self._lock_shard(name)
+        self.shard_name = name
+        self.shards[self.shard_name] = ReportShard(
+            self.directory / self.shard_name, writable=True, initial_capacity=self.initial_capacity
+        )
+        self.own.load()
+        self.refresh()
+        logger.info("📈 Report store: %d report(s) in %d shard(s) at %s", self.total.count, len(self.shards), self.directory)
+
+    def _lock_shard(self, name: str) -> bool:
+        """Take the shard's write lock for this process - False if another process holds it"""
+        if fcntl is None:
+            return True
+        directory = self.directory / name
+        directory.mkdir(parents=True, exist_ok=True)
+        lock_file = open(directory / ".lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def close(self):
+        with self._lock:
+            for shard in self.shards.values():
+                if shard.writable:
+                    shard.flush()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def refresh(self):
+        """Pick up shards and rows other workers wrote since the last query"""
+        if self.directory.exists():
+            for path in self.directory.iterdir():
+                if path.is_dir() and path.name not in self.shards:
+                    self.shards[path.name] = ReportShard(path, writable=False)
+        for name, shard in self.shards.items():
+            if not shard.writable:
+                shard.load()
+            self._fold(name)
+
+    def _fold(self, name: str):
+        """Add a shard's rows that are not in the aggregates yet"""
+        shard = self.shards[name]
+        start = self._folded.get(name, 0)
+        if shard.count <= start:
+            return
+        rows = shard.rows(start)
+        values = _values(rows)
+        sources = rows["source"].astype(np.int64)
+        self.total.add(values, sources)
+        codes = rows["cohort"]
+        for code in np.unique(codes):
+            mask = codes == code
+            cohort = self.by_cohort.setdefault(shard.cohorts[code], Aggregates())
+            cohort.add(values[mask], sources[mask])
+        self._folded[name] = shard.count
+
+    def append(self, report: Dict, answers: int, cohort: Optional[str] = None) -> bool:
+        """
+        Store one generated report - never raises, a lost row is only logged.
+        Writes the columns and meta.json - call it off the event loop.
+        """
+        if self.shard_name is None:
+            return False
+        try:
+            with self._lock:
+                return self._append(report, answers, cohort)
+        except Exception as e:
+            logger.error("Could not store report: %s", e)
+            return False
+
+    def _append(self, report: Dict, answers: int, cohort: Optional[str]) -> bool:
+        shard = self.own
+        scores = report.get("scores", {})
+        row = {
+            "ts": np.array([time.time()]),
+            **{
+                metric: np.array([max(0, min(10, int(scores.get(metric, 0))))])
+                for metric in METRICS[:-1]
+            },
+            "investment_probability": np.array([max(0, min(100, int(report.get("investment_probability", 0))))]),
+            "answers": np.array([min(answers, 65535)]),
+            "source": np.array([SOURCES.index("heuristic" if report.get("provisional") else "llm")]),
+            "cohort": np.array([shard.cohort_code(str(cohort or DEFAULT_COHORT)[:64])]),
+        }
+        shard.extend(row)
+        self._fold(self.shard_name)
+        return True
+
+    def analytics(self, cohort: Optional[str] = None, days: Optional[float] = None) -> Dict:
+        """Distributions, percentiles, correlations and cohort comparison"""
+        started = time.perf_counter()
+        with self._lock:
+            return self._analytics(cohort, days, started)
+
+    def _analytics(self, cohort: Optional[str], days: Optional[float], started: float) -> Dict:
+        self.refresh()
+
+        if days:
+            total, by_cohort = self._scan(time.time() - days * 86400)
+        else:
+            total, by_cohort = self.total, self.by_cohort
+
+        selected = by_cohort.get(cohort, Aggregates()) if cohort else total
+        result = selected.summary()
+        overall = total.means()
+        result["cohorts"] = {
+            name: {
+                "reports": aggregates.count,
+                "mean": dict(zip(METRICS, np.round(aggregates.means(), 2).tolist())),
+                "vs_overall": dict(zip(METRICS, np.round(aggregates.means() - overall, 2).tolist())),
+            }
+            for name, aggregates in sorted(by_cohort.items(), key=lambda item: -item[1].count)
+            if aggregates.count
+        }
+        result["filters"] = {"cohort": cohort, "days": days}
+        result["query_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def _scan(self, since: float):
+        """Aggregates of the rows newer than since - the tail of each shard"""
+        total = Aggregates()
+        by_cohort: Dict[str, Aggregates] = {}
+        for shard in self.shards.values():
+            start = int(np.searchsorted(shard.rows()["ts"], since))
+            if start >= shard.count:
+                continue
+            rows = shard.rows(start)
+            values = _values(rows)
+            sources = rows["source"].astype(np.int64)
+            codes = rows["cohort"]
+            total.add(values, sources)
+            for code in np.unique(codes):
+                in_cohort = codes == code
+                by_cohort.setdefault(shard.cohorts[code], Aggregates()).add(values[in_cohort], sources[in_cohort])
+        return total, by_cohort
+
+
+# Shared by every request in this worker process (opened in the app lifespan)
+report_store = ReportStore(config.REPORT_STORE_DIR, initial_capacity=config.REPORT_STORE_INITIAL_CAPACITY)
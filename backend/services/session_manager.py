@@ -0,0 +1,437 @@
+"""
+Session Manager
+Slim per-connection state plus heartbeat-based reaping, so sessions whose
+socket silently died (or that sit idle for too long) are released.
+
+Sessions outlive their socket for a short grace period: a client that
+reconnects with its resume token gets its history back, plus any turn
+response it never acknowledged.
+
+Frames go out through a bounded per-socket SendQueue drained by its own
+writer task, so a client on a slow link never stalls the turn loop. Audio
+still queued when the conversation is reset is dropped, and a client that
+falls further behind than SEND_QUEUE_MAX_BYTES is disconnected (it can
+resume, and gets its unacknowledged replies again).
+"""
+import asyncio
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.services.spectators import spectator_hub
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code sent when a session is reaped for inactivity.
+# The frontend waits for the user instead of reconnecting straight away.
+CLOSE_IDLE = 4408
+# Close code for a socket replaced by a newer connection resuming the same session
+CLOSE_SUPERSEDED = 4409
+# Close code for a client that stopped reading - it reconnects and resumes
+CLOSE_SLOW_CONSUMER = 4410
+
+# Frames superseded by a reset when still queued
+STALE_TYPES = {"audio"}
+
+frames_dropped = metrics.counter("ws_frames_dropped_total", "Outbound frames dropped before sending, by reason")
+slow_consumers = metrics.counter("ws_slow_consumer_disconnects_total", "Sockets closed for falling too far behind")
+backpressure_wait = metrics.histogram(
+    "ws_backpressure_wait_seconds", "Time a turn waited for the client to catch up before starting"
+)
+
+
+class SendQueue:
+    """
+    Outbound frames of one socket, drained by its own writer task.
+    Frames are encoded once when queued; the backlog (queued plus the frame
+    being sent) is counted in bytes, because one audio reply outweighs
+    hundreds of status frames.
+    """
+    __slots__ = ("websocket", "max_bytes", "frames", "bytes", "closed", "task", "_wakeup", "_progress")
+
+    def __init__(self, websocket, max_bytes: int):
+        self.websocket = websocket
+        self.max_bytes = max_bytes
+        # (encoded frame, frame type, reset epoch it belongs to)
+        self.frames: Deque[Tuple[str, Optional[str], int]] = deque()
+        self.bytes = 0
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._progress = asyncio.Event()
+
+    def put(self, payload: dict, epoch: int = 0) -> bool:
+        """Queue a frame without waiting. False if the socket is gone or too far behind"""
+        if self.closed:
+            return False
+        text = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        if self.frames and self.bytes + len(text) > self.max_bytes:
+            logger.warning("🐢 Client fell %d KB behind - disconnecting slow consumer", self.bytes // 1024)
+            slow_consumers.inc()
+            self.close()
+            asyncio.create_task(self._close_socket())
+            return False
+        self.frames.append((text, payload.get("type"), epoch))
+        self.bytes += len(text)
+        self._wakeup.set()
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return True
+
+    def drop_stale(self, epoch: int) -> int:
+        """Drop queued audio from before the given reset epoch"""
+        kept = deque()
+        dropped = 0
+        for frame in self.frames:
+            text, frame_type, frame_epoch = frame
+            if frame_type in STALE_TYPES and frame_epoch < epoch:
+                self.bytes -= len(text)
+                dropped += 1
+            else:
+                kept.append(frame)
+        self.frames = kept
+        if dropped:
+            frames_dropped.inc(dropped, reason="stale")
+            self._progress.set()
+        return dropped
+
+    async def wait_writable(self, high_water: int, timeout: float) -> bool:
+        """Wait until no more than high_water bytes are queued. False on timeout or close"""
+        deadline = time.monotonic() + timeout
+        while self.bytes > high_water and not self.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._progress.clear()
+            try:
+                await asyncio.wait_for(self._progress.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return not self.closed
+
+    async def run(self):
+        """Writer task - sends frames in order until closed or the socket fails"""
+        try:
+            while True:
+                while not self.frames:
+                    if self.closed:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                text, _, _ = self.frames.popleft()
+                # Still counted in the backlog until the socket has taken it
+                await self.websocket.send_text(text)
+                if not self.closed:
+                    self.bytes -= len(text)
+                self._progress.set()
+        except Exception as e:
+            logger.debug("Send failed, stopping writer: %s", e)
+            self.close()
+
+    def close(self):
+        """Stop accepting frames - the writer exits once it finds the queue closed"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.frames:
+            frames_dropped.inc(len(self.frames), reason="closed")
+        self.frames.clear()
+        self.bytes = 0
+        self._wakeup.set()
+        self._progress.set()
+
+    async def _close_socket(self):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=CLOSE_SLOW_CONSUMER, reason="slow consumer"), timeout=5)
+        except Exception as e:
+            logger.debug("Close of slow consumer failed: %s", e)
+        if self.task is not None:
+            self.task.cancel()
+
+
+class Session:
+    """Everything one pitch connection holds on to"""
+    __slots__ = (
+        "session_id", "resume_token", "watch_token", "vc_agent", "audio_handler", "websocket",
+        "avatar_handler", "avatar_session", "avatar_type",
+        "created_at", "last_seen", "last_activity", "detached_at",
+        "turn_index", "last_seq", "outbox", "turn_started_at", "epoch", "_outbound",
+    )
+
+    def __init__(self, session_id: str, vc_agent, audio_handler, websocket=None, resume_token: Optional[str] = None,
+                 watch_token: Optional[str] = None):
+        now = time.monotonic()
+        self.session_id = session_id
+        self.resume_token = resume_token
+        # Shared with spectators - unlike the session id it grants nothing but a read-only view
+        self.watch_token = watch_token
+        self.vc_agent = vc_agent
+        self.audio_handler = audio_handler
+        self.websocket = websocket
+        self.avatar_handler = None
+        self.avatar_session = None
+        self.avatar_type = None
+        self.created_at = now
+        self.last_seen = now  # Any frame from the client, including pongs
+        self.last_activity = now  # Pitch turns and resets only
+        self.detached_at: Optional[float] = None  # Set while waiting for a reconnect
+        self.turn_index = 0
+        # Reliable frames carry a sequence number and stay here until acked
+        self.last_seq = 0
+        self.outbox: Deque[dict] = deque(maxlen=config.SESSION_OUTBOX_SIZE)
+        # turn -> perf_counter when its transcript arrived, until the client reports playback
+        self.turn_started_at: Dict[int, float] = {}
+        # Bumped on every reset - audio queued under an older epoch is stale
+        self.epoch = 0
+        self._outbound: Optional[SendQueue] = None
+
+    @property
+    def outbound(self) -> Optional[SendQueue]:
+        """Send queue of the attached socket (created on first use, needs a running loop)"""
+        if self.websocket is None:
+            return None
+        if self._outbound is None or self._outbound.websocket is not self.websocket:
+            if self._outbound is not None:
+                self._outbound.close()
+            self._outbound = SendQueue(self.websocket, config.SEND_QUEUE_MAX_BYTES)
+        return self._outbound
+
+    def touch(self, activity: bool = False):
+        now = time.monotonic()
+        self.last_seen = now
+        if activity:
+            self.last_activity = now
+
+    async def send(self, payload: dict, reliable: bool = False) -> bool:
+        """
+        Queue a frame for whichever socket the session is attached to.
+        Reliable frames are kept for redelivery until the client acks them,
+        so they survive a dropped connection. Returns False if it could not be
+        queued (no socket, or the client is too far behind).
+        """
+        if reliable:
+            self.last_seq += 1
+            payload = dict(payload, seq=self.last_seq)
+            self.outbox.append(payload)
+
+        # Viewers get the frame even while the founder is reconnecting
+        spectator_hub.publish(self.session_id, payload)
+
+        outbound = self.outbound
+        if outbound is None:
+            return False
+        return outbound.put(payload, self.epoch)
+
+    async def wait_writable(self) -> bool:
+        """
+        Backpressure for the turn loop: wait (up to SEND_QUEUE_WAIT_TIMEOUT) while
+        the client still has more than SEND_QUEUE_HIGH_WATER bytes to receive,
+        rather than generating a reply it cannot take yet.
+        """
+        outbound = self.outbound
+        if outbound is None or outbound.bytes <= config.SEND_QUEUE_HIGH_WATER:
+            return True
+        started = time.perf_counter()
+        writable = await outbound.wait_writable(config.SEND_QUEUE_HIGH_WATER, config.SEND_QUEUE_WAIT_TIMEOUT)
+        waited = time.perf_counter() - started
+        backpressure_wait.observe(waited)
+        logger.info("🐢 Session %s waited %.2fs for the client to catch up", self.session_id, waited)
+        return writable
+
+    def supersede(self) -> int:
+        """Conversation was reset - replies from before it are neither sent nor redelivered"""
+        self.epoch += 1
+        self.outbox.clear()
+        return self._outbound.drop_stale(self.epoch) if self._outbound is not None else 0
+
+    def ack(self, seq: int):
+        """Client has handled every reliable frame up to and including seq"""
+        while self.outbox and self.outbox[0]["seq"] <= seq:
+            self.outbox.popleft()
+
+    async def redeliver(self) -> int:
+        """Resend every unacknowledged reliable frame after a reconnect"""
+        outbound = self.outbound
+        sent = 0
+        for payload in list(self.outbox):
+            if outbound is None or not outbound.put(dict(payload, redelivered=True), self.epoch):
+                break
+            sent += 1
+        return sent
+
+    def release_socket(self):
+        """Stop the writer of the socket the session was attached to"""
+        if self._outbound is not None:
+            self._outbound.close()
+            self._outbound = None
+
+
+class SessionManager:
+    def __init__(self, heartbeat_interval: float, heartbeat_timeout: float, idle_timeout: float, resume_grace: float):
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.idle_timeout = idle_timeout
+        self.resume_grace = resume_grace
+        self.sessions: Dict[str, Session] = {}
+        self._by_token: Dict[str, str] = {}
+        self._by_watch_token: Dict[str, str] = {}
+        self.reaped = 0
+        # Called with each session as it is released (e.g. to end its avatar stream)
+        self.on_remove: Optional[Callable[[Session], None]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def create(self, vc_agent, audio_handler, websocket) -> Session:
+        """Register a brand-new session with fresh id, resume token and watch token"""
+        # With several workers, the worker ID prefix lets the launcher route
+        # a reconnect back to the process that holds this session
+        prefix = f"{config.WORKER_ID}." if config.WORKER_ID else ""
+        session = Session(
+            prefix + secrets.token_hex(8),
+            vc_agent,
+            audio_handler,
+            websocket,
+            resume_token=prefix + secrets.token_urlsafe(24),
+            watch_token=prefix + secrets.token_urlsafe(16),
+        )
+        self.add(session)
+        return session
+
+    def add(self, session: Session):
+        self.sessions[session.session_id] = session
+        if session.resume_token:
+            self._by_token[session.resume_token] = session.session_id
+        if session.watch_token:
+            self._by_watch_token[session.watch_token] = session.session_id
+
+    def get(self, session_id: str) -> Optional[Session]:
+        return self.sessions.get(session_id)
+
+    def find_by_token(self, resume_token: Optional[str]) -> Optional[Session]:
+        if not resume_token:
+            return None
+        session_id = self._by_token.get(resume_token)
+        return self.sessions.get(session_id) if session_id else None
+
+    def find_by_watch_token(self, watch_token: Optional[str]) -> Optional[Session]:
+        if not watch_token:
+            return None
+        session_id = self._by_watch_token.get(watch_token)
+        return self.sessions.get(session_id) if session_id else None
+
+    def attach(self, session: Session, websocket):
+        """Move a session onto a new socket (a reconnect). Returns the socket it replaced"""
+        previous = session.websocket
+        if previous is not websocket:
+            session.release_socket()
+        session.websocket = websocket
+        session.detached_at = None
+        session.touch()
+        return previous if previous is not websocket else None
+
+    def detach(self, session: Session, websocket):
+        """Socket went away - keep the session for the resume grace period"""
+        if session.websocket is not websocket:
+            # Already re-attached to a newer socket
+            return
+        session.release_socket()
+        session.websocket = None
+        session.detached_at = time.monotonic()
+        if not self.resume_grace:
+            self.remove(session.session_id)
+
+    def remove(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        if session.resume_token:
+            self._by_token.pop(session.resume_token, None)
+        if session.watch_token:
+            self._by_watch_token.pop(session.watch_token, None)
+        session.release_socket()
+        if self.on_remove is not None:
+            try:
+                self.on_remove(session)
+            except Exception as e:
+                logger.error("Session release hook failed: %s", e)
+
+    async def start(self):
+        """Start the background heartbeat/reaper task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error("Session sweep failed: %s", e, exc_info=True)
+
+    async def sweep(self):
+        """Ping quiet sessions and reap dead or idle ones"""
+        now = time.monotonic()
+        pings = []
+        reaps = []
+
+        for session in list(self.sessions.values()):
+            if session.detached_at is not None:
+                if now - session.detached_at > self.resume_grace:
+                    logger.info("🧹 Releasing session %s (not resumed)", session.session_id)
+                    self.remove(session.session_id)
+                    self.reaped += 1
+                continue
+            if now - session.last_seen > self.heartbeat_timeout:
+                # Socket is dead - drop it but let the client resume within the grace period
+                reaps.append(self._reap(session, 1001, "heartbeat timeout", keep_for_resume=True))
+            elif self.idle_timeout and now - session.last_activity > self.idle_timeout:
+                reaps.append(self._reap(session, CLOSE_IDLE, "idle timeout"))
+            elif now - session.last_seen >= self.heartbeat_interval and session.websocket is not None:
+                pings.append(self._ping(session))
+
+        if pings or reaps:
+            await asyncio.gather(*pings, *reaps)
+
+    async def _ping(self, session: Session):
+        # Queued behind any pending frames - a client that cannot drain them will not pong either
+        await session.send({"type": "ping"})
+
+    async def _reap(self, session: Session, code: int, reason: str, keep_for_resume: bool = False):
+        websocket = session.websocket
+        if keep_for_resume:
+            logger.info("🧹 Dropping socket of session %s (%s)", session.session_id, reason)
+            self.detach(session, websocket)
+        else:
+            logger.info("🧹 Releasing session %s (%s)", session.session_id, reason)
+            self.remove(session.session_id)
+            self.reaped += 1
+        if websocket is not None:
+            try:
+                await asyncio.wait_for(websocket.close(code=code, reason=reason), timeout=5)
+            except Exception as e:
+                logger.debug("Close of session %s failed: %s", session.session_id, e)
+
+
+# Shared by every connection in this worker process
+session_manager = SessionManager(
+    heartbeat_interval=config.SESSION_HEARTBEAT_INTERVAL,
+    heartbeat_timeout=config.SESSION_HEARTBEAT_TIMEOUT,
+    idle_timeout=config.SESSION_IDLE_TIMEOUT,
+    resume_grace=config.SESSION_RESUME_GRACE,
+)
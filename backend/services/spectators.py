@@ -0,0 +1,119 @@
+"""
+Spectator Broadcast
+Read-only viewers of a live pitch session (e.g. a demo-day audience).
+
+Spectators never cause LLM or TTS calls: the founder's frames are encoded
+once and the same string is queued for every viewer. Each viewer has a small
+bounded queue drained by its own writer task, so a slow viewer loses its
+oldest frames instead of holding up the pitch or the other viewers.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Founder frames worth showing to an audience (no acks, pings or queue status)
+BROADCAST_TYPES = {"user_message", "audio", "text_error", "reset"}
+
+spectators_gauge = metrics.gauge("spectators", "Connected spectators across all sessions")
+frames_broadcast = metrics.counter("spectator_frames_total", "Frames queued for spectators")
+frames_dropped = metrics.counter("spectator_frames_dropped_total", "Frames dropped because a spectator fell behind")
+
+
+class Spectator:
+    """One viewer socket and its outgoing queue"""
+    __slots__ = ("websocket", "queue", "dropped", "task")
+
+    def __init__(self, websocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, text: Optional[str]):
+        """Queue a frame without waiting - drops the oldest frame if the viewer is behind"""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+                frames_dropped.inc()
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(text)
+
+    async def run(self):
+        """Writer task - sends queued frames until closed (None) or the socket fails"""
+        try:
+            while True:
+                text = await self.queue.get()
+                if text is None:
+                    break
+                await self.websocket.send_text(text)
+        except Exception as e:
+            logger.debug("Spectator send failed: %s", e)
+
+
+class SpectatorHub:
+    def __init__(self, queue_size: int, max_per_session: int):
+        self.queue_size = queue_size
+        self.max_per_session = max_per_session
+        # session id -> viewers
+        self.rooms: Dict[str, Set[Spectator]] = {}
+
+    def count(self, session_id: str) -> int:
+        return len(self.rooms.get(session_id, ()))
+
+    def join(self, session_id: str, websocket) -> Optional[Spectator]:
+        """Add a viewer and start its writer, or None if the session is full"""
+        room = self.rooms.setdefault(session_id, set())
+        if len(room) >= self.max_per_session:
+            return None
+        spectator = Spectator(websocket, self.queue_size)
+        spectator.task = asyncio.create_task(spectator.run())
+        room.add(spectator)
+        spectators_gauge.inc()
+        return spectator
+
+    def leave(self, session_id: str, spectator: Spectator):
+        room = self.rooms.get(session_id)
+        if room is None or spectator not in room:
+            return
+        room.discard(spectator)
+        if not room:
+            del self.rooms[session_id]
+        spectators_gauge.inc(-1)
+        spectator.offer(None)
+        if spectator.dropped:
+            logger.info("Spectator of %s left after dropping %d frame(s)", session_id, spectator.dropped)
+
+    def publish(self, session_id: str, payload: dict):
+        """Fan a founder frame out to the session's viewers (never blocks)"""
+        room = self.rooms.get(session_id)
+        if not room or payload.get("type") not in BROADCAST_TYPES:
+            return
+        # Spectators do not ack - strip the reliable-delivery fields, then encode once
+        frame = {k: v for k, v in payload.items() if k not in ("seq", "redelivered")}
+        text = json.dumps(frame, separators=(",", ":"), ensure_ascii=False)
+        for spectator in room:
+            spectator.offer(text)
+        frames_broadcast.inc(len(room))
+
+    def close_room(self, session_id: str):
+        """Session is gone - tell every viewer and let their writers finish"""
+        room = self.rooms.get(session_id)
+        if not room:
+            return
+        self.publish(session_id, {"type": "reset", "ended": True})
+        for spectator in list(room):
+            self.leave(session_id, spectator)
+
+
+spectator_hub = SpectatorHub(config.SPECTATOR_QUEUE_SIZE, config.SPECTATOR_MAX_PER_SESSION)
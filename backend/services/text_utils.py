@@ -0,0 +1,156 @@
+"""
+Text Utilities
+Incremental sentence splitting, so speech and avatar output can start on the
+first sentence while the rest of the response is still being generated, and
+the stop policy that ends a VC reply at its closing question.
+"""
+import re
+from typing import List
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace
+_SENTENCE_END = re.compile(r"""[.!?…]+["'”’)\]]*\s+""")
+
+# Abbreviations that end in a period but do not end a sentence
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "vs", "etc", "e.g", "i.e", "inc", "approx", "st"}
+
+# Fragments shorter than this are merged into the next sentence ("Okay." "Sure.")
+MIN_SENTENCE_CHARS = 12
+# Shortest sentence QuestionStop counts on its own - "Really?" is merged into the next one
+MIN_QUESTION_CHARS = 8
+
+
+class SentenceSplitter:
+    """
+    Feed text as it arrives, get back complete sentences.
+    Anything after the last sentence boundary stays buffered until more text
+    arrives or flush() is called.
+    """
+
+    def __init__(self, min_chars: int = MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            last_word = candidate.rstrip(".").rsplit(" ", 1)[-1].lower()
+            if candidate.endswith(".") and last_word in _ABBREVIATIONS:
+                continue
+            if len(candidate) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    @property
+    def pending(self) -> str:
+        """Text after the last sentence boundary (not yet returned)"""
+        return self._buffer
+
+    def flush(self) -> List[str]:
+        """Whatever is left once the text is complete"""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS) -> List[str]:
+    """Split a complete text into sentences"""
+    splitter = SentenceSplitter(min_chars)
+    return splitter.feed(text) + splitter.flush()
+
+
+class QuestionStop:
+    """
+    Decides when a streamed VC reply is complete.
+    The reply is done once it has used its max_sentences and the last one
+    ends in a question mark - an earlier question ("Huge market?") is often
+    rhetorical and the real one follows. A reply that reaches max_sentences
+    without ending on a question gets one more sentence to get to it; if that
+    is not a question either, the reply is cut back to its last question
+    within the budget (or to max_sentences if it asked none). Anything
+    generated after that is dropped, so it is neither paid for as tokens (the
+    stream is closed) nor synthesized as speech.
+
+    released() hands out sentences that can no longer be cut (to the avatar)
+    while the rest of the reply is still streaming - sentences after a
+    question are held back until the reply is finished.
+    """
+
+    def __init__(self, max_sentences: int, min_chars: int = MIN_QUESTION_CHARS):
+        self.max_sentences = max(1, max_sentences)
+        self.min_chars = min_chars
+        self.sentences: List[str] = []
+        self.done = False
+        self._splitter = SentenceSplitter(min_chars)
+        self._released = 0
+        self._finished = False
+
+    def _accept(self, sentence: str) -> bool:
+        self.sentences.append(sentence)
+        count = len(self.sentences)
+        if count > self.max_sentences or (count == self.max_sentences and sentence.endswith("?")):
+            self.done = True
+        return self.done
+
+    def feed(self, text: str) -> bool:
+        """Add streamed text - returns True once the reply is complete"""
+        if self.done:
+            return True
+        for sentence in self._splitter.feed(text):
+            if self._accept(sentence):
+                return True
+        # A question mark that ends the text so far needs no following token to count -
+        # only when it would close the reply, otherwise the next sentence decides
+        pending = self._splitter.pending.strip()
+        if (pending.endswith("?") and len(pending) >= self.min_chars
+                and len(self.sentences) + 1 >= self.max_sentences):
+            self._splitter.flush()
+            return self._accept(pending)
+        return False
+
+    @property
+    def text(self) -> str:
+        """The reply as it should be spoken, trailing text trimmed"""
+        if not self.done:
+            for sentence in self._splitter.flush():
+                if self._accept(sentence):
+                    break
+        self._finished = True
+        return " ".join(self._kept())
+
+    def _last_question(self) -> int:
+        """Number of sentences up to and including the last question within the budget (0 if none)"""
+        for i in range(min(len(self.sentences), self.max_sentences), 0, -1):
+            if self.sentences[i - 1].endswith("?"):
+                return i
+        return 0
+
+    def _kept(self) -> List[str]:
+        """Sentences certain to make up the reply"""
+        sentences = self.sentences
+        finished = self.done or self._finished
+        if finished and (not sentences or sentences[-1].endswith("?") or len(sentences) <= self.max_sentences):
+            return sentences
+        # Over budget without a closing question - or still streaming, when it may yet end up so
+        question = self._last_question()
+        if question:
+            return sentences[:question]
+        return sentences[:self.max_sentences]
+
+    def released(self) -> List[str]:
+        """Sentences certain to stay in the reply that were not returned before"""
+        kept = self._kept()
+        new = kept[self._released:]
+        self._released = max(self._released, len(kept))
+        return new
+
+
+def trim_reply(text: str, max_sentences: int) -> str:
+    """Apply the QuestionStop policy to an already complete reply"""
+    policy = QuestionStop(max_sentences)
+    policy.feed(text)
+    return policy.text or text.strip()
@@ -0,0 +1,159 @@
+"""
+Transcript Journal
+Append-only JSONL record of every pitch turn (text, timings, provider and model).
+Turns are queued in memory and written in batches by a background task,
+so the conversation never waits on disk.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptJournal:
+    def __init__(
+        self,
+        directory: str,
+        max_buffer: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.dropped = 0
+        self.written = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._segment_path: Optional[Path] = None
+        self._segment_size = 0
+        self._segment_count = 0
+
+    @property
+    def running(self) -> bool:
+        return self._writer_task is not None and not self._writer_task.done()
+
+    async def start(self):
+        """Start the background writer"""
+        if self.running:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._writer_task = asyncio.create_task(self._writer())
+        logger.info("📝 Transcript journal writing to %s", self.directory)
+
+    def record(self, event: str, session_id: str, **fields) -> bool:
+        """
+        Queue a journal entry without waiting. Returns False if the entry was
+        dropped because the journal is not running or the buffer is full.
+        """
+        if self._queue is None:
+            return False
+        entry = {"ts": time.time(), "event": event, "session_id": session_id}
+        entry.update(fields)
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning("Transcript journal buffer full - %d entries dropped", self.dropped)
+            return False
+
+    async def close(self):
+        """Flush everything still buffered and stop the writer"""
+        if not self.running:
+            return
+        await self._queue.put(None)  # Shutdown marker
+        try:
+            await self._writer_task
+        except Exception as e:
+            logger.error("Transcript journal writer failed during shutdown: %s", e)
+        self._writer_task = None
+        logger.info("📝 Transcript journal closed (%d entries written, %d dropped)", self.written, self.dropped)
+
+    async def _writer(self):
+        stopping = False
+        while not stopping:
+            entry = await self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+
+            # Collect more entries until the batch is full or the flush interval passes
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+
+            lines = [json.dumps(e, ensure_ascii=False, default=str) for e in batch]
+            try:
+                await asyncio.to_thread(self._write_lines, lines)
+                self.written += len(lines)
+            except Exception as e:
+                logger.error("Failed to write %d transcript entries: %s", len(lines), e)
+
+    def _new_segment(self) -> Path:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self._segment_count += 1
+        # pid keeps segments separate when several workers share the directory
+        return self.directory / f"transcript-{stamp}-{os.getpid()}-{self._segment_count:04d}.jsonl"
+
+    def _write_lines(self, lines: List[str]):
+        """Append lines to the current segment (runs in a worker thread)"""
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        if self._segment_path is None or self._segment_size + len(data) > self.segment_max_bytes:
+            self._segment_path = self._new_segment()
+            self._segment_size = 0
+        with open(self._segment_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._segment_size += len(data)
+
+
+def read_transcripts(directory: str) -> List[Dict]:
+    """Load every journal entry from a directory, oldest segment first"""
+    entries = []
+    for path in sorted(Path(directory).glob("transcript-*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A crash can leave a partial last line - skip it
+                    continue
+    return entries
+
+
+# Shared by every connection in this worker process
+transcript_journal = TranscriptJournal(
+    config.TRANSCRIPT_DIR,
+    max_buffer=config.TRANSCRIPT_MAX_BUFFER,
+    batch_size=config.TRANSCRIPT_BATCH_SIZE,
+    flush_interval=config.TRANSCRIPT_FLUSH_INTERVAL,
+)
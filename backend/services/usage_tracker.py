@@ -0,0 +1,210 @@
+"""
+Usage Tracker
+Token and character accounting for every provider call, with estimated cost.
+
+- LLM calls: prompt, completion and cached prompt tokens from response.usage
+- TTS calls: characters synthesized
+
+Totals are kept per model and endpoint (the metrics below) and per session
+(in memory until the session is released, then logged). The session comes
+from the task's bound log session (logging_config.bind_session), so call
+sites only say which model and endpoint they used.
+"""
+import logging
+import threading
+from typing import Any, Dict, Optional
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import config
+from backend.logging_config import current_session
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+llm_tokens = metrics.counter(
+    "llm_tokens_total",
+    "LLM tokens by provider, model, endpoint and kind (prompt, completion, cached)",
+)
+llm_calls = metrics.counter("llm_calls_total", "LLM calls that returned usage, by provider, model and endpoint")
+llm_prompt_tokens = metrics.histogram(
+    "llm_prompt_tokens",
+    "Prompt size per LLM call - a growing tail means histories are not being trimmed",
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+tts_characters = metrics.counter("tts_characters_total", "Characters sent to text-to-speech, by model and endpoint")
+usage_cost = metrics.counter("usage_cost_usd_total", "Estimated provider cost in USD, by provider, model and endpoint")
+
+# Sessions that never get released (should not happen) cannot grow this without bound -
+# past this many the oldest tracked session is dropped
+MAX_TRACKED_SESSIONS = 10000
+
+
+def _field(obj: Any, name: str) -> Any:
+    """Read a usage field from an SDK object or a plain dict"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _count(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def llm_cost(model: Optional[str], prompt: int, completion: int, cached: int) -> float:
+    """Estimated USD for one call - 0 for models without a configured price"""
+    prices = config.LLM_PRICES.get(model or "")
+    if not prices:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    return ((prompt - cached) * input_price + cached * cached_price + completion * output_price) / 1e6
+
+
+def tts_cost(model: Optional[str], characters: int) -> float:
+    return characters * config.TTS_PRICES.get(model or "", 0.0) / 1000
+
+
+class SessionUsage:
+    """Running totals for one session"""
+    __slots__ = ("llm_calls", "prompt_tokens", "completion_tokens", "cached_tokens",
+                 "max_prompt_tokens", "tts_calls", "tts_characters", "cost_usd", "by_endpoint")
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.max_prompt_tokens = 0
+        self.tts_calls = 0
+        self.tts_characters = 0
+        self.cost_usd = 0.0
+        # endpoint -> {"tokens": .., "characters": .., "cost_usd": ..}
+        self.by_endpoint: Dict[str, Dict[str, float]] = {}
+
+    def _endpoint(self, endpoint: str) -> Dict[str, float]:
+        totals = self.by_endpoint.get(endpoint)
+        if totals is None:
+            totals = self.by_endpoint[endpoint] = {"tokens": 0, "characters": 0, "cost_usd": 0.0}
+        return totals
+
+    def summary(self) -> Dict:
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "max_prompt_tokens": self.max_prompt_tokens,
+            "tts_calls": self.tts_calls,
+            "tts_characters": self.tts_characters,
+            "estimated_cost_usd": round(self.cost_usd, 6),
+            "by_endpoint": {
+                endpoint: dict(totals, cost_usd=round(totals["cost_usd"], 6))
+                for endpoint, totals in self.by_endpoint.items()
+            },
+        }
+
+
+class UsageTracker:
+    def __init__(self):
+        self.sessions: Dict[str, SessionUsage] = {}
+        # LLM calls run in worker threads (asyncio.to_thread)
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: Optional[str]) -> Optional[SessionUsage]:
+        session_id = session_id or current_session()
+        if not session_id:
+            return None
+        usage = self.sessions.get(session_id)
+        if usage is None:
+            if len(self.sessions) >= MAX_TRACKED_SESSIONS:
+                # Dicts keep insertion order - the first entry is the oldest session
+                oldest = next(iter(self.sessions))
+                del self.sessions[oldest]
+                logger.warning("Usage of session %s dropped - over %d tracked sessions", oldest, MAX_TRACKED_SESSIONS)
+            usage = self.sessions[session_id] = SessionUsage()
+        return usage
+
+    def record_llm(self, response: Any, provider: str, model: Optional[str], endpoint: str,
+                   session_id: Optional[str] = None):
+        """Record the usage block of a chat completion (SDK response or parsed JSON)"""
+        try:
+            usage = _field(response, "usage")
+            if usage is None:
+                return
+            prompt = _count(_field(usage, "prompt_tokens"))
+            completion = _count(_field(usage, "completion_tokens"))
+            cached = _count(_field(_field(usage, "prompt_tokens_details"), "cached_tokens"))
+            cost = llm_cost(model, prompt, completion, cached)
+
+            labels = {"provider": provider, "model": model or "unknown", "endpoint": endpoint}
+            llm_calls.inc(**labels)
+            llm_tokens.inc(prompt, kind="prompt", **labels)
+            llm_tokens.inc(completion, kind="completion", **labels)
+            if cached:
+                llm_tokens.inc(cached, kind="cached", **labels)
+            llm_prompt_tokens.observe(prompt, **labels)
+            if cost:
+                usage_cost.inc(cost, **labels)
+
+            with self._lock:
+                totals = self._session(session_id)
+                if totals is not None:
+                    totals.llm_calls += 1
+                    totals.prompt_tokens += prompt
+                    totals.completion_tokens += completion
+                    totals.cached_tokens += cached
+                    totals.max_prompt_tokens = max(totals.max_prompt_tokens, prompt)
+                    totals.cost_usd += cost
+                    endpoint_totals = totals._endpoint(endpoint)
+                    endpoint_totals["tokens"] += prompt + completion
+                    endpoint_totals["cost_usd"] += cost
+        except Exception as e:
+            # Accounting must never break a turn
+            logger.debug("Could not record LLM usage: %s", e)
+
+    def record_tts(self, text: str, model: Optional[str], endpoint: str, session_id: Optional[str] = None):
+        """Record one text-to-speech call (billed per character)"""
+        try:
+            characters = len(text)
+            cost = tts_cost(model, characters)
+            labels = {"provider": "elevenlabs", "model": model or "unknown", "endpoint": endpoint}
+            tts_characters.inc(characters, model=labels["model"], endpoint=endpoint)
+            if cost:
+                usage_cost.inc(cost, **labels)
+
+            with self._lock:
+                totals = self._session(session_id)
+                if totals is not None:
+                    totals.tts_calls += 1
+                    totals.tts_characters += characters
+                    totals.cost_usd += cost
+                    endpoint_totals = totals._endpoint(endpoint)
+                    endpoint_totals["characters"] += characters
+                    endpoint_totals["cost_usd"] += cost
+        except Exception as e:
+            logger.debug("Could not record TTS usage: %s", e)
+
+    def summary(self, session_id: Optional[str]) -> Optional[Dict]:
+        """Totals so far for a session, or None if it has made no provider calls"""
+        usage = self.sessions.get(session_id) if session_id else None
+        return usage.summary() if usage else None
+
+    def release(self, session_id: str):
+        """Session is gone - log its totals and stop tracking it"""
+        with self._lock:
+            usage = self.sessions.pop(session_id, None)
+        if usage is not None:
+            logger.info(
+                "💰 Session %s used %d prompt + %d completion tokens (max prompt %d), %d TTS chars, ~$%.4f",
+                session_id, usage.prompt_tokens, usage.completion_tokens,
+                usage.max_prompt_tokens, usage.tts_characters, usage.cost_usd,
+            )
+
+
+usage_tracker = UsageTracker()
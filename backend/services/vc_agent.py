@@ -1,79 +1,104 @@
-from elevenlabs.client import ElevenLabs
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import sys
 import os
+import asyncio
 import json
+import time
 import aiohttp
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 import config
 import logging
+from backend.logging_config import HOT
+from backend.services.key_pool import is_key_error, key_pools
+from backend.services.usage_tracker import usage_tracker
+from backend.services.model_router import model_router
+from backend.services.metrics import metrics
+from backend.services.text_utils import QuestionStop, split_sentences, trim_reply
 
 logger = logging.getLogger(__name__)
 
+# VC replies are one paragraph - a line break means the model is starting something else
+REPLY_STOP_SEQUENCES = ["\n"]
+
+# Called with each sentence of the reply as soon as it is certain to be kept (may run in a worker thread)
+SentenceCallback = Callable[[str], None]
+
+early_stops = metrics.counter(
+    "llm_early_stop_total", "Turn replies whose stream was closed at the closing question, by provider"
+)
+
 class VCAgent:
+    # One agent per connection - slots keep idle sessions small
+    __slots__ = (
+        "turns", "elevenlabs_llm_model",
+        "llm_client", "llm_model",
+        "last_provider", "last_model", "use_groq", "is_groq",
+    )
+    
     def __init__(self):
         if not config.ELEVENLABS_API_KEY:
             raise ValueError("ELEVENLABS_API_KEY not set in environment variables")
         
-        self.client = ElevenLabs(api_key=config.ELEVENLABS_API_KEY)
-        self.api_key = config.ELEVENLABS_API_KEY
-        self.conversation_history: List[Dict[str, str]] = [
-            {"role": "system", "content": config.VC_SYSTEM_PROMPT}
-        ]
+        # Compact (role, content) turns - the system prompt is shared, not stored per session
+        self.turns: List[Tuple[str, str]] = []
         # Use ElevenLabs' built-in LLM (GLM-4.5-Air is a good default) - for fallback only
         self.elevenlabs_llm_model = getattr(config, 'ELEVENLABS_LLM_MODEL', 'glm-4.5-air')
         
-        # Initialize LLM client (OpenAI or Groq)
+        # Initialize LLM client (OpenAI or Groq) - clients are shared across sessions, and
+        # each call leases a key from the provider's pool and uses that key's client
         self.llm_client = None
         self.llm_model = None
+        # Which provider/model produced the most recent response (for the transcript journal)
+        self.last_provider = None
+        self.last_model = None
         # Check for both GROQ and GROK (for backwards compatibility with .env file)
         self.use_groq = getattr(config, 'USE_GROQ', False) or getattr(config, 'USE_GROK', False)
         self.is_groq = False  # Track if using Groq SDK vs OpenAI SDK
         
-        # Get API key (try GROQ first, then GROK for backwards compatibility)
-        groq_api_key = getattr(config, 'GROQ_API_KEY', None) or getattr(config, 'GROK_API_KEY', None)
-        
-        if self.use_groq and groq_api_key:
+        # GROQ_API_KEY(S) - GROK_API_KEY is folded in by config for backwards compatibility
+        if self.use_groq and key_pools["groq"]:
             try:
-                from groq import Groq
-                self.llm_client = Groq(api_key=groq_api_key)
+                self.llm_client = key_pools["groq"].keys[0].client
                 self.llm_model = getattr(config, 'GROQ_MODEL', "llama-3.3-70b-versatile")
                 self.is_groq = True
-                logger.info(f"✅ Groq client initialized with model: {self.llm_model}")
+                logger.debug("Groq client ready with model: %s", self.llm_model)
             except ImportError:
                 logger.warning("Groq package not available. Install with: pip install groq")
             except Exception as e:
-                logger.error(f"Failed to initialize Groq client: {e}")
+                logger.error("Failed to initialize Groq client: %s", e)
         
         # Only use OpenAI if Groq is not enabled
-        if not self.use_groq and config.OPENAI_API_KEY and not self.llm_client:
+        if not self.use_groq and key_pools["openai"] and not self.llm_client:
             try:
-                import openai
-                self.llm_client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+                self.llm_client = key_pools["openai"].keys[0].client
                 self.llm_model = "gpt-4o-mini"
-                logger.info("OpenAI client initialized")
+                logger.debug("OpenAI client ready")
             except ImportError:
                 logger.warning("OpenAI package not available, skipping LLM")
             except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
+                logger.error("Failed to initialize OpenAI client: %s", e)
+    
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Full history in chat-message form, including the system prompt"""
+        return self._build_messages()
+    
+    def _build_messages(self) -> List[Dict[str, str]]:
+        """Format the conversation for the chat completions API"""
+        messages = [{"role": "system", "content": config.VC_SYSTEM_PROMPT}]
+        messages.extend({"role": role, "content": content} for role, content in self.turns)
+        return messages
     
     def reset_conversation(self):
         """Reset the conversation history"""
-        self.conversation_history = [
-            {"role": "system", "content": config.VC_SYSTEM_PROMPT}
-        ]
+        self.turns = []
     
     async def _try_elevenlabs_llm(self, messages: List[Dict]) -> Optional[str]:
         """Try to use ElevenLabs LLM via HTTP API"""
         try:
             async with aiohttp.ClientSession() as session:
-                headers = {
-                    "xi-api-key": self.api_key,
-                    "Content-Type": "application/json"
-                }
-                
                 # Try the LLM endpoint (this may vary based on ElevenLabs API structure)
                 payload = {
                     "model": self.elevenlabs_llm_model,
@@ -91,7 +116,12 @@ class VCAgent:
                 
                 for endpoint in endpoints:
                     try:
-                        async with session.post(endpoint, headers=headers, json=payload) as response:
+                        async with key_pools["elevenlabs"].lease() as key, session.post(
+                            endpoint, headers={"xi-api-key": key.value, "Content-Type": "application/json"}, json=payload
+                        ) as response:
+                            # Rate limit and auth errors count against the key (and rest it)
+                            if response.status in (429, 401, 403):
+                                response.raise_for_status()
                             if response.status == 200:
                                 data = await response.json()
                                 # Try different response structures
@@ -105,72 +135,135 @@ class VCAgent:
                                     content = str(data).strip()
                                 
                                 if content:
-                                    return content
+                                    usage_tracker.record_llm(data, "elevenlabs", self.elevenlabs_llm_model, "turn")
+                                    return trim_reply(content, config.VC_MAX_SENTENCES)
                     except Exception as e:
-                        logger.debug(f"Tried {endpoint}, error: {e}")
+                        logger.debug("Tried %s, error: %s", endpoint, e)
                         continue
         except Exception as e:
-            logger.debug(f"ElevenLabs LLM API attempt failed: {e}")
+            logger.debug("ElevenLabs LLM API attempt failed: %s", e)
         
         return None
     
-    async def _try_llm_api(self, messages: List[Dict]) -> Optional[str]:
+    def _stream_reply(self, client, provider: str, model: str, messages: List[Dict],
+                      on_sentence: Optional[SentenceCallback] = None) -> str:
+        """
+        Stream one reply and stop reading at the VC's closing question (QuestionStop).
+        Closing the stream early stops generation, so the tokens after it are never
+        produced. Sentences go to on_sentence while the rest is still generating;
+        if the stream fails after some were handed out, those sentences are the
+        reply - they cannot be taken back from the avatar, and another attempt
+        would be spoken on top of them.
+        Blocking - run it in a thread.
+        """
+        options = {"stream_options": {"include_usage": True}} if provider == "openai" else {}
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.9,
+            max_tokens=80,
+            stop=REPLY_STOP_SEQUENCES,
+            stream=True,
+            **options
+        )
+        policy = QuestionStop(config.VC_MAX_SENTENCES)
+        usage = None
+        content_chunks = 0
+        spoken: List[str] = []
+        
+        def release():
+            for sentence in policy.released():
+                spoken.append(sentence)
+                on_sentence(sentence)
+        
+        try:
+            for chunk in stream:
+                # OpenAI sends usage in a final chunk, Groq under x_groq on the last one
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    content_chunks += 1
+                    done = policy.feed(delta)
+                    if on_sentence is not None:
+                        release()
+                    if done:
+                        early_stops.inc(provider=provider)
+                        break
+        except Exception as e:
+            if not spoken:
+                raise
+            logger.warning("%s stream failed after %d spoken sentence(s), keeping them as the reply: %s",
+                           provider, len(spoken), e)
+            text = " ".join(spoken)
+        else:
+            text = policy.text
+            if on_sentence is not None:
+                # The last sentence only completes once the stream has ended
+                release()
+        finally:
+            stream.close()
+        
+        if usage is None:
+            # Stopped before the usage chunk - one chunk is about one token, four characters a token
+            prompt_chars = sum(len(message["content"]) for message in messages)
+            usage = {"prompt_tokens": prompt_chars // 4, "completion_tokens": content_chunks}
+        usage_tracker.record_llm({"usage": usage}, provider, model, "turn")
+        return text
+    
+    async def _timed_reply(self, client, provider: str, model: str, messages: List[Dict],
+                           on_sentence: Optional[SentenceCallback] = None) -> Tuple[str, float]:
+        """_stream_reply off the event loop, with its latency (not counting the rate limit wait)"""
+        started = time.perf_counter()
+        result = await asyncio.to_thread(self._stream_reply, client, provider, model, messages, on_sentence)
+        return result, time.perf_counter() - started
+    
+    async def _try_llm_api(self, messages: List[Dict], on_sentence: Optional[SentenceCallback] = None) -> Optional[str]:
         """Primary LLM - OpenAI or Groq"""
         if not self.llm_client:
             provider = "Groq" if self.use_groq else "OpenAI"
-            logger.warning(f"{provider} client not initialized - check API key in .env")
+            logger.warning("%s client not initialized - check API key in .env", provider)
             return None
         
         try:
             if self.is_groq:
-                # Use Groq SDK - try multiple models if one fails
-                models_to_try = [
-                    self.llm_model,  # Try configured model first
-                    "llama-3.3-70b-versatile",  # Latest 70B model
-                    "llama-3.1-8b-instant",  # Fast 8B model
-                    "mixtral-8x7b-32768",  # Alternative model
-                    "llama-3.1-70b-versatile"  # Old model (might still work)
-                ]
-                
-                # Remove duplicates while preserving order
-                models_to_try = list(dict.fromkeys(models_to_try))
-                
-                for model in models_to_try:
+                # Routed per call - fastest healthy model that meets the turn quality tier
+                for model in model_router.candidates("turn", preferred=self.llm_model):
                     try:
-                        logger.info(f"Calling Groq API with model: {model}")
-                        response = self.llm_client.chat.completions.create(
-                            model=model,
-                            messages=messages,
-                            temperature=0.9,
-                            max_tokens=80
+                        logger.debug("Calling Groq API with model: %s", model, extra=HOT)
+                        result, latency = await key_pools["groq"].run(
+                            lambda key: self._timed_reply(key.client, "groq", model, messages, on_sentence)
                         )
-                        result = response.choices[0].message.content.strip()
-                        logger.info(f"✅ Groq response generated (model: {model}): {result[:50]}...")
-                        # Update self.llm_model to the working model for future calls
-                        self.llm_model = model
+                        model_router.record(model, "turn", latency, ok=True)
+                        logger.debug("✅ Groq response generated (model: %s): %.50s...", model, result, extra=HOT)
+                        self.last_model = model
                         return result
                     except Exception as model_error:
                         error_msg = str(model_error)
-                        # Check if it's a model-specific error (decommissioned, not found, etc.)
-                        if "decommissioned" in error_msg.lower() or "not found" in error_msg.lower() or "invalid" in error_msg.lower():
-                            logger.warning(f"Model {model} not available: {error_msg[:100]}")
+                        # Check if it's a model-specific error (decommissioned, not found, etc.) -
+                        # "Invalid API Key" is about the keys, not the model
+                        if not is_key_error(model_error) and ("decommissioned" in error_msg.lower() or "not found" in error_msg.lower() or "invalid" in error_msg.lower()):
+                            model_router.disable(model, error_msg)
                             continue  # Try next model
-                        else:
-                            # Other error (rate limit, auth, etc.) - don't try other models
+                        model_router.record(model, "turn", None, ok=False)
+                        if is_key_error(model_error):
+                            # Rate limit or auth on every key - the other models use the same keys
                             raise model_error
+                        # Timeout, 5xx... - the pick may have been an exploration or a stale (unhealthy)
+                        # model, so the preferred healthy one still gets its turn
+                        logger.warning("Groq model %s failed, trying the next one: %s", model, error_msg)
+                        continue
                 
                 # If all models failed, raise an error
                 raise Exception("All Groq models failed")
             else:
                 # Use OpenAI SDK
-                response = self.llm_client.chat.completions.create(
-                    model=self.llm_model,
-                    messages=messages,
-                    temperature=0.9,
-                    max_tokens=80
+                result = await key_pools["openai"].run(
+                    lambda key: asyncio.to_thread(self._stream_reply, key.client, "openai", self.llm_model, messages, on_sentence)
                 )
-                result = response.choices[0].message.content.strip()
-                logger.info(f"✅ OpenAI response generated: {result[:50]}...")
+                self.last_model = self.llm_model
+                logger.debug("✅ OpenAI response generated: %.50s...", result, extra=HOT)
                 return result
             
         except Exception as e:
@@ -186,7 +279,7 @@ class VCAgent:
                 except:
                     error_details = f"{error_details} - Body: {str(e.body)}"
             
-            logger.error(f"❌ {provider} API failed: {error_details}")
+            logger.error("❌ %s API failed: %s", provider, error_details)
             
             # No fallback - stick to Groq only if USE_GROQ is true
             if self.use_groq:
@@ -194,44 +287,52 @@ class VCAgent:
             
             return None
     
-    async def get_response(self, user_input: str) -> str:
-        """Get VC's response to user input"""
+    async def get_response(self, user_input: str, on_sentence: Optional[SentenceCallback] = None) -> str:
+        """
+        Get VC's response to user input. on_sentence gets the reply sentence by
+        sentence - as it streams from the primary LLM, all at once from the fallbacks.
+        """
         # Add user message to history
-        self.conversation_history.append({
-            "role": "user",
-            "content": user_input
-        })
+        self.turns.append(("user", user_input))
         
         # Format messages for API
-        messages = []
-        for msg in self.conversation_history:
-            messages.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
+        messages = self._build_messages()
+        
+        # Sentences handed out while streaming - a fallback reply is handed out whole below
+        streamed: List[str] = []
+        
+        def deliver(sentence: str):
+            streamed.append(sentence)
+            on_sentence(sentence)
         
         # Try primary LLM first (OpenAI or Groq)
-        vc_response = await self._try_llm_api(messages)
+        vc_response = await self._try_llm_api(messages, deliver if on_sentence is not None else None)
+        self.last_provider = "groq" if self.is_groq else "openai"
         
         # Fallback to ElevenLabs LLM if primary LLM doesn't work
         if not vc_response:
             logger.info("Primary LLM not available, trying ElevenLabs LLM")
             vc_response = await self._try_elevenlabs_llm(messages)
+            self.last_provider = "elevenlabs"
+            self.last_model = self.elevenlabs_llm_model
         
         # Final fallback: improved human-like responses
         if not vc_response:
             logger.warning("Both LLM options failed, using fallback responses")
             vc_response = self._get_fallback_response(user_input)
+            self.last_provider = "fallback"
+            self.last_model = None
+        
+        if on_sentence is not None and not streamed:
+            for sentence in split_sentences(vc_response):
+                on_sentence(sentence)
         
         # Note: Emotion tags like [sarcastic] are not supported by eleven_multilingual_v2
         # The voice settings (stability, style) already provide natural expressiveness
         # So we just use the response as-is
         
         # Add assistant response to history
-        self.conversation_history.append({
-            "role": "assistant",
-            "content": vc_response
-        })
+        self.turns.append(("assistant", vc_response))
         
         return vc_response
     
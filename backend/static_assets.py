@@ -0,0 +1,236 @@
+"""
+Static Frontend Assets
+Build step plus serving layer for the files in frontend/.
+
+Build (python -m backend.static_assets, also run at server startup):
+- every asset is copied to frontend/dist under a content-hashed name
+  (app.js -> app.3f9c2a1b7e.js) and precompressed with gzip, and with
+  brotli when the brotli package is installed
+- index.html is rewritten to point at the hashed names
+- hashed files from earlier builds are pruned
+
+Serving:
+- hashed assets are immutable and cached for a year
+- index.html (and the unhashed names, for old pages) must be revalidated on
+  every load, so a deploy is picked up immediately - the ETag makes that a 304
+- the smallest encoding the browser accepts is picked from Accept-Encoding
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_DIR = Path(__file__).parent.parent / "frontend"
+DIST_DIR = FRONTEND_DIR / "dist"
+STATIC_PREFIX = "/static/"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first when the browser accepts several
+ENCODINGS = ("br", "gzip")
+ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+# Compressing tiny files (or already-compressed formats) does not pay off
+MIN_COMPRESS_BYTES = 256
+COMPRESSIBLE = {".js", ".css", ".html", ".svg", ".json", ".txt", ".map"}
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def _compress(data: bytes) -> Dict[str, bytes]:
+    encoded = {}
+    # mtime=0 keeps the output byte-identical between builds
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gz) < len(data) * 0.95:
+        encoded["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(data, quality=11)
+        if len(br) < len(data) * 0.95:
+            encoded["br"] = br
+    return encoded
+
+
+def _write(path: Path, data: bytes):
+    # Several workers may build at once - write aside and rename so nobody reads half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def build_assets(source: Path = FRONTEND_DIR, dist: Path = DIST_DIR) -> Dict[str, str]:
+    """Fingerprint and precompress the frontend. Returns {original name: hashed name}"""
+    manifest: Dict[str, str] = {}
+    files = sorted(
+        p for p in source.rglob("*")
+        if p.is_file() and dist not in p.parents and p.name != "index.html" and not p.name.startswith(".")
+    )
+
+    def emit(name: str, data: bytes):
+        _write(dist / name, data)
+        if Path(name).suffix in COMPRESSIBLE and len(data) >= MIN_COMPRESS_BYTES:
+            for encoding, encoded in _compress(data).items():
+                _write(dist / (name + ENCODING_SUFFIX[encoding]), encoded)
+
+    for path in files:
+        name = path.relative_to(source).as_posix()
+        data = path.read_bytes()
+        hashed = _hashed_name(name, _digest(data))
+        manifest[name] = hashed
+        if not (dist / hashed).exists():
+            emit(hashed, data)
+
+    # Point index.html at the hashed names
+    index = (source / "index.html").read_text(encoding="utf-8")
+    for name, hashed in manifest.items():
+        index = re.sub(
+            rf'(["\']){re.escape(STATIC_PREFIX + name)}(["\'])',
+            rf"\g<1>{STATIC_PREFIX}{hashed}\g<2>",
+            index,
+        )
+    emit("index.html", index.encode("utf-8"))
+    _write(dist / "manifest.json", json.dumps(manifest, indent=2, sort_keys=True).encode())
+    pruned = _prune(dist, manifest)
+
+    logger.info("📦 Built %d frontend asset(s) into %s (brotli %s, %d stale file(s) pruned)",
+                len(manifest), dist, "on" if brotli else "off", pruned)
+    return manifest
+
+
+def _prune(dist: Path, manifest: Dict[str, str]) -> int:
+    """Delete files of earlier builds - running servers hold their assets in memory"""
+    keep = {"manifest.json"}
+    for name in [*manifest.values(), "index.html"]:
+        keep.add(name)
+        keep.update(name + suffix for suffix in ENCODING_SUFFIX.values())
+    pruned = 0
+    for path in dist.rglob("*"):
+        # Dotfiles are another worker's writes in progress
+        if path.is_file() and not path.name.startswith(".") and path.relative_to(dist).as_posix() not in keep:
+            path.unlink(missing_ok=True)
+            pruned += 1
+    return pruned
+
+
+class Asset:
+    """One file held in memory with its precompressed variants"""
+    __slots__ = ("media_type", "etag", "cache_control", "bodies")
+
+    def __init__(self, path: Path, cache_control: str):
+        data = path.read_bytes()
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type in ("application/javascript", "text/javascript"):
+            self.media_type += "; charset=utf-8"
+        self.etag = f'"{_digest(data)}"'
+        self.cache_control = cache_control
+        # encoding -> body, "identity" always present
+        self.bodies: Dict[str, bytes] = {"identity": data}
+        for encoding in ENCODINGS:
+            variant = path.with_name(path.name + ENCODING_SUFFIX[encoding])
+            if variant.exists():
+                self.bodies[encoding] = variant.read_bytes()
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Accept-Encoding header -> {coding: q}"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip()] = q
+    return accepted
+
+
+class StaticAssets:
+    """Serves index.html and the built assets from memory"""
+
+    def __init__(self, dist: Path = DIST_DIR):
+        self.assets: Dict[str, Asset] = {}
+        manifest = json.loads((dist / "manifest.json").read_text())
+        for name, hashed in manifest.items():
+            asset = Asset(dist / hashed, IMMUTABLE)
+            self.assets[hashed] = asset
+            # Unhashed name still works (e.g. a page cached before a deploy), but revalidates
+            plain = Asset(dist / hashed, REVALIDATE)
+            self.assets[name] = plain
+        self.index = Asset(dist / "index.html", REVALIDATE)
+
+    def _pick_encoding(self, asset: Asset, request: Request) -> str:
+        accepted = _accepted(request.headers.get("accept-encoding", ""))
+        for encoding in ENCODINGS:
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if q > 0 and encoding in asset.bodies:
+                return encoding
+        return "identity"
+
+    def _respond(self, asset: Asset, request: Request) -> Response:
+        encoding = self._pick_encoding(asset, request)
+        # One ETag per encoding - caches must not mix up gzip and brotli bodies
+        etag = asset.etag if encoding == "identity" else f'{asset.etag[:-1]}-{encoding}"'
+        headers = {
+            "Cache-Control": asset.cache_control,
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+        }
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], headers=headers, media_type=asset.media_type)
+
+    def serve(self, path: str, request: Request) -> Optional[Response]:
+        """Response for /static/<path>, or None if there is no such asset"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        return self._respond(asset, request)
+
+    def serve_index(self, request: Request) -> Response:
+        return self._respond(self.index, request)
+
+
+def load_static_assets(build: bool = True) -> StaticAssets:
+    """Build (if asked, or if there is no build yet) and load the frontend assets"""
+    if build or not (DIST_DIR / "manifest.json").exists():
+        build_assets()
+    return StaticAssets()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for original, hashed in build_assets().items():
+        print(f"{original} -> {hashed}")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Avatar session pool and sentence pipelining against the stub avatar server
+
+Runs the old way of driving D-ID next to the new one, both against
+benchmarks.stub_avatar_server:
+
+- old: create a session when the connection opens, a fresh aiohttp session
+  per call, the whole response sent once it is complete, and the serial
+  Agents API fallback tried on every call
+- new: session taken from the pre-warmed AvatarPool, one persistent HTTP
+  session, sentences sent while the response is still being generated
+
+Reports time until the avatar is ready on connect, time until the avatar
+receives the first sentence of a response, and TCP connections opened.
+
+Then checks what a turn actually makes the avatar say (exits 1 if wrong):
+a reply streamed from the LLM reaches the stub sentence by sentence before
+it completes, and a stream that fails midway leaves the avatar having said
+exactly the reply the turn returns - nothing from another attempt on top.
+
+    python -m benchmarks.bench_avatar_pool --connections 10 --create-ms 800 --say-ms 120
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from benchmarks.stub_avatar_server import start_stub
+
+RESPONSE = (
+    "Freight brokers hate new software. "
+    "Why would they switch from spreadsheets and phone calls? "
+    "And who on your team has actually sold into logistics?"
+)
+
+
+async def generate(text: str, token_ms: float):
+    """Stand-in for a streaming LLM - yields the response word by word"""
+    for word in text.split(" "):
+        await asyncio.sleep(token_ms / 1000)
+        yield word + " "
+
+
+# --- old behaviour (pre-pool DIDHandler) ---------------------------------
+
+async def legacy_create(base_url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/talks/streams", json={"source_url": "stub"}) as response:
+            if response.status in [200, 201]:
+                return (await response.json())["id"]
+        async with session.post(f"{base_url}/agents", json={"source_url": "stub"}) as response:
+            return (await response.json())["id"]
+
+
+async def legacy_say(base_url: str, session_id: str, text: str) -> bool:
+    async with aiohttp.ClientSession() as session:
+        async with session.post(f"{base_url}/talks/streams/{session_id}", json={"script": {"input": text}}) as response:
+            if response.status in [200, 201]:
+                return True
+        async with session.post(f"{base_url}/agents/{session_id}/chat", json={"text": text}) as response:
+            return response.status in [200, 201]
+
+
+async def run_old(base_url: str, connections: int, token_ms: float):
+    connect, first_audio = [], []
+    for _ in range(connections):
+        started = time.perf_counter()
+        session_id = await legacy_create(base_url)
+        connect.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        text = "".join([chunk async for chunk in generate(RESPONSE, token_ms)]).strip()
+        await legacy_say(base_url, session_id, text)
+        first_audio.append(time.perf_counter() - started)
+    return connect, first_audio
+
+
+# --- turn check (VCAgent streaming into AvatarPool.speak_stream) ---------
+
+class StubStream:
+    """Stand-in for a streaming chat completion - yields word chunks, optionally failing after some"""
+
+    def __init__(self, text: str, token_ms: float, fail_after: int = None):
+        self.words = text.split(" ")
+        self.token_ms = token_ms
+        self.fail_after = fail_after
+        self.sent_at = []
+
+    def __iter__(self):
+        for i, word in enumerate(self.words):
+            if i == self.fail_after:
+                raise ConnectionError("stream dropped")
+            time.sleep(self.token_ms / 1000)
+            self.sent_at.append(time.perf_counter())
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "))])
+
+    def close(self):
+        pass
+
+
+class StubClient:
+    def __init__(self, stream: StubStream):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=lambda **options: stream))
+
+
+async def spoken_turn(pool, avatar_session, spoken: list, stream: StubStream):
+    """One turn the way main.py runs it - returns (reply or error, what the avatar was sent, first feed time)"""
+    from backend.services.vc_agent import VCAgent
+
+    before = len(spoken)
+    speak = pool.speak_stream(avatar_session)
+    fed_at = []
+
+    def feed(sentence):
+        fed_at.append(time.perf_counter())
+        speak(sentence)
+
+    agent = VCAgent()
+    try:
+        reply = await asyncio.to_thread(
+            agent._stream_reply, StubClient(stream), "openai", "stub-model", agent.conversation_history, feed
+        )
+    except ConnectionError as e:
+        reply = e
+    finally:
+        speak(None)
+    # Let the sender post what it was given
+    await asyncio.sleep(0.5)
+    return reply, spoken[before:], fed_at[0] if fed_at else None
+
+
+async def check(args):
+    runner, base_url = await start_stub(create_ms=args.create_ms, say_ms=args.say_ms)
+    config.DID_BASE_URL = base_url
+    config.ELEVENLABS_API_KEY = config.ELEVENLABS_API_KEY or "bench"
+    spoken = runner.app["stats"]["spoken"]
+
+    from backend.services.avatar_pool import AvatarPool
+    from backend.services.did_handler import DIDHandler
+
+    pool = AvatarPool(DIDHandler(), "did", 1, ttl=300)
+    await pool.start()
+    avatar_session = await pool.acquire()
+    failures = []
+    try:
+        # Whole reply: every sentence reaches the avatar, the first before the reply is finished
+        stream = StubStream(RESPONSE, args.token_ms)
+        reply, said, first_fed = await spoken_turn(pool, avatar_session, spoken, stream)
+        if " ".join(said) != reply:
+            failures.append(f"avatar said {said!r} for the reply {reply!r}")
+        if first_fed is None or first_fed >= stream.sent_at[-1]:
+            failures.append("the first sentence only reached the avatar once the reply was complete")
+
+        # Dropped after the first sentence: that sentence is the reply, nothing else is said
+        stream = StubStream(RESPONSE, args.token_ms, fail_after=8)
+        reply, said, _ = await spoken_turn(pool, avatar_session, spoken, stream)
+        if isinstance(reply, Exception) or " ".join(said) != reply or not reply.startswith("Freight"):
+            failures.append(f"after a dropped stream the avatar said {said!r}, the turn returned {reply!r}")
+
+        # Dropped before any sentence: the attempt fails and the avatar says nothing
+        stream = StubStream(RESPONSE, args.token_ms, fail_after=2)
+        reply, said, _ = await spoken_turn(pool, avatar_session, spoken, stream)
+        if not isinstance(reply, Exception) or said:
+            failures.append(f"a stream dropped before its first sentence returned {reply!r}, avatar said {said!r}")
+    finally:
+        pool.release(avatar_session)
+        await pool.close()
+        await runner.cleanup()
+
+    if failures:
+        raise AssertionError("Avatar turn check failed:\n  " + "\n  ".join(failures))
+    print("\n✅ Avatar turn check passed (streamed reply, stream dropped midway, stream dropped early)")
+
+
+# --- new behaviour (AvatarPool + persistent DIDHandler) ------------------
+
+async def run_new(connections: int, token_ms: float, pool_size: int, create_ms: float):
+    from backend.services.avatar_pool import AvatarPool
+    from backend.services.did_handler import DIDHandler
+
+    pool = AvatarPool(DIDHandler(), "did", pool_size, ttl=300)
+    await pool.start()
+    # Let the pool warm up, as it would between server start and the first visitor
+    await asyncio.sleep(create_ms / 1000 * 1.5)
+
+    connect, first_audio = [], []
+    handler = pool.handler
+    original_send = handler.send_text_to_avatar
+    for _ in range(connections):
+        started = time.perf_counter()
+        avatar_session = await pool.acquire()
+        connect.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        first = []
+
+        async def timed_send(session_id, text):
+            ok = await original_send(session_id, text)
+            if not first:
+                first.append(time.perf_counter() - started)
+            return ok
+
+        handler.send_text_to_avatar = timed_send
+        await pool.stream(avatar_session, generate(RESPONSE, token_ms))
+        handler.send_text_to_avatar = original_send
+        first_audio.append(first[0])
+        pool.release(avatar_session)
+        # Visitors arrive a little apart - gives the pool time to refill
+        await asyncio.sleep(create_ms / 1000 / pool_size)
+
+    await pool.close()
+    return connect, first_audio
+
+
+async def stats(base_url: str):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/stats") as response:
+            return await response.json()
+
+
+async def bench(args, streams_fail: bool):
+    options = dict(create_ms=args.create_ms, say_ms=args.say_ms, streams_fail=streams_fail)
+
+    runner, base_url = await start_stub(**options)
+    old_connect, old_first = await run_old(base_url, args.connections, args.token_ms)
+    old_stats = await stats(base_url)
+    await runner.cleanup()
+
+    runner, base_url = await start_stub(**options)
+    config.DID_API_KEY = "bench"
+    config.DID_AVATAR_ID = "bench"
+    config.DID_BASE_URL = base_url
+    new_connect, new_first = await run_new(args.connections, args.token_ms, args.pool_size, args.create_ms)
+    new_stats = await stats(base_url)
+    await runner.cleanup()
+
+    ms = lambda values: statistics.median(values) * 1000
+    label = "streams API unavailable (Agents fallback)" if streams_fail else "streams API"
+    print(f"\n{label}, {args.connections} connections")
+    print(f"  avatar ready on connect   old {ms(old_connect):7.1f} ms   new {ms(new_connect):7.1f} ms  (median)")
+    print(f"  first sentence delivered  old {ms(old_first):7.1f} ms   new {ms(new_first):7.1f} ms  (median)")
+    print(f"  TCP connections opened    old {old_stats['connections']:7d}      new {new_stats['connections']:7d}")
+    print(f"  avatar API requests       old {sum(old_stats['requests'].values()):7d}      new {sum(new_stats['requests'].values()):7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--create-ms", type=float, default=800)
+    parser.add_argument("--say-ms", type=float, default=120)
+    parser.add_argument("--token-ms", type=float, default=25, help="Simulated LLM time per word")
+    args = parser.parse_args()
+
+    config.AVATAR_HTTP_TIMEOUT = 30
+    asyncio.run(bench(args, streams_fail=False))
+    asyncio.run(bench(args, streams_fail=True))
+    asyncio.run(check(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Logging CPU cost per turn
+
+Replays the log calls one pitch turn makes (received frames, user text, LLM
+call, TTS, response) under the old setup - logging.basicConfig writing to the
+stream synchronously with eager f-strings - and under backend.logging_config
+(queue-backed JSON, lazy %-formatting, sampled hot-path events).
+
+Reports CPU time spent on the calling thread, which is the event loop thread
+in production. Output goes to os.devnull for both.
+
+    python -m benchmarks.bench_logging --turns 20000
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from backend import logging_config
+from backend.logging_config import HOT, bind_session, bind_turn
+
+TRANSCRIPT = "We're building an AI copilot for freight brokers that automates load matching and cuts empty miles by 30 percent."
+VC_REPLY = "Freight brokers hate software. Why would they switch from spreadsheets and phone calls?"
+
+
+def make_frames():
+    text = json.dumps({"type": "text", "text": TRANSCRIPT})
+    return [
+        {"type": "websocket.receive", "text": text},
+        {"type": "websocket.receive", "text": json.dumps({"type": "ack", "seq": 3})},
+        {"type": "websocket.receive", "text": json.dumps({"type": "pong"})},
+    ]
+
+
+def old_turn(logger, frames):
+    for data in frames:
+        logger.info(f"📨 Received WebSocket data - type: {type(data)}, keys: {list(data.keys()) if isinstance(data, dict) else 'not a dict'}, content: {str(data)[:200]}")
+        message = json.loads(data["text"])
+        logger.info(f"Parsed message: {message}")
+    logger.info(f"User said: {TRANSCRIPT}")
+    logger.info("Getting VC response...")
+    logger.info(f"Calling Groq API with model: {config.GROQ_MODEL}")
+    logger.info(f"✅ Groq response generated (model: {config.GROQ_MODEL}): {VC_REPLY[:50]}...")
+    logger.info(f"VC response: {VC_REPLY}")
+    logger.info("Converting to speech...")
+    logger.info("Speech conversion complete")
+    logger.info("Response sent to client")
+
+
+def new_turn(logger, frames, turn):
+    bind_turn(turn)
+    for data in frames:
+        logger.debug("📨 Received WebSocket frame: %.200s", data, extra=HOT)
+        message = json.loads(data["text"])
+        logger.debug("Parsed message: %.200s", message, extra=HOT)
+    logger.info("User said: %s", TRANSCRIPT)
+    logger.debug("Getting VC response...", extra=HOT)
+    logger.debug("Calling Groq API with model: %s", config.GROQ_MODEL, extra=HOT)
+    logger.debug("✅ Groq response generated (model: %s): %.50s...", config.GROQ_MODEL, VC_REPLY, extra=HOT)
+    logger.info("VC response: %s", VC_REPLY)
+    logger.debug("Converting to speech...", extra=HOT)
+    logger.debug("Speech conversion complete", extra=HOT)
+    logger.debug("Response sent to client", extra=HOT)
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+
+def run_old(turns, devnull):
+    reset_root()
+    logging.basicConfig(level=logging.INFO, stream=devnull, force=True)
+    logger = logging.getLogger("bench.old")
+    frames = make_frames()
+    start = time.thread_time()
+    for _ in range(turns):
+        old_turn(logger, frames)
+    elapsed = time.thread_time() - start
+    reset_root()
+    return elapsed
+
+
+def run_new(turns, devnull, level):
+    reset_root()
+    config.LOG_LEVEL = level
+    logging_config.setup_logging(stream=devnull)
+    logger = logging.getLogger("bench.new")
+    frames = make_frames()
+    bind_session("bench-session")
+    start = time.thread_time()
+    for turn in range(turns):
+        new_turn(logger, frames, turn)
+    elapsed = time.thread_time() - start
+    logging_config.shutdown_logging()
+    reset_root()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w") as devnull:
+        old = run_old(args.turns, devnull)
+        new_info = run_new(args.turns, devnull, "INFO")
+        new_debug = run_new(args.turns, devnull, "DEBUG")
+
+    per_turn = lambda seconds: seconds / args.turns * 1e6
+    print(f"old (basicConfig, eager f-strings, INFO):  {per_turn(old):8.1f} µs CPU/turn")
+    print(f"new (queue + JSON, lazy, INFO):            {per_turn(new_info):8.1f} µs CPU/turn  "
+          f"({per_turn(old - new_info):.1f} µs saved)")
+    print(f"new (queue + JSON, lazy, DEBUG sampled {config.LOG_SAMPLE_RATE:.0%}): {per_turn(new_debug):8.1f} µs CPU/turn")
+
+
+if __name__ == "__main__":
+    main()
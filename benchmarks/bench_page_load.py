@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+First-pitch page load with plain vs optimized frontend assets
+
+Serves frontend/ the old way (FileResponse for index.html plus a StaticFiles
+mount) and the new way (backend.static_assets: hashed names, precompressed,
+immutable caching), and loads the page through each like a browser would:
+
+- cold: first visit, empty cache
+- warm: second visit - cached assets are reused as each response's
+  Cache-Control allows; anything else is revalidated with If-None-Match /
+  If-Modified-Since
+
+Reports requests and bytes on the wire, and a modelled time until the
+founder can start pitching (index.html, then the assets in parallel, then
+the WebSocket opening) for a few network profiles.
+
+    python -m benchmarks.bench_page_load
+"""
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.static_assets import FRONTEND_DIR, build_assets, StaticAssets
+
+# name -> (round trip seconds, downlink bytes per second)
+NETWORKS = {
+    "fast 3G": (0.300, 1.6e6 / 8),
+    "4G": (0.070, 9e6 / 8),
+    "broadband": (0.020, 50e6 / 8),
+}
+# Browsers send this for same-origin scripts and styles (brotli only over https)
+ACCEPT_ENCODING = "gzip, deflate, br"
+# Status line and headers are on the wire too
+HEADER_BYTES = 250
+
+
+def legacy_app() -> FastAPI:
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR)), name="static")
+
+    @app.get("/")
+    async def read_root():
+        return FileResponse(str(FRONTEND_DIR / "index.html"))
+    return app
+
+
+def optimized_app() -> FastAPI:
+    build_assets()
+    assets = StaticAssets()
+    app = FastAPI()
+
+    @app.get("/")
+    async def read_root(request: Request):
+        return assets.serve_index(request)
+
+    @app.get("/static/{path:path}")
+    async def static_file(path: str, request: Request):
+        return assets.serve(path, request)
+    return app
+
+
+class Browser:
+    """Just enough of an HTTP cache to tell a fresh hit from a revalidation"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.cache = {}  # url -> (immutable, headers, body)
+
+    async def fetch(self, url: str):
+        """Returns (body, wire bytes, made a request)"""
+        cached = self.cache.get(url)
+        if cached and cached[0]:
+            return cached[2], 0, False
+
+        headers = {"accept-encoding": ACCEPT_ENCODING}
+        if cached:
+            if "etag" in cached[1]:
+                headers["if-none-match"] = cached[1]["etag"]
+            if "last-modified" in cached[1]:
+                headers["if-modified-since"] = cached[1]["last-modified"]
+
+        response = await self.client.get(url, headers=headers)
+        wire = HEADER_BYTES + int(response.headers.get("content-length", 0))
+        if response.status_code == 304:
+            return cached[2], wire, True
+
+        cache_control = response.headers.get("cache-control", "")
+        self.cache[url] = ("immutable" in cache_control, response.headers, response.text)
+        return response.text, wire, True
+
+    async def load(self):
+        """[(requests, bytes)] per round: index.html first, then its assets in parallel"""
+        html, wire, requested = await self.fetch("/")
+        rounds = [(int(requested), wire)]
+        urls = re.findall(r'(?:href|src)="(/static/[^"]+)"', html)
+        results = await asyncio.gather(*(self.fetch(url) for url in urls))
+        rounds.append((sum(r[2] for r in results), sum(r[1] for r in results)))
+        return rounds
+
+
+def model_seconds(rounds, rtt: float, bandwidth: float) -> float:
+    """Round trips for each round that makes a request, plus transfer time, plus the WebSocket opening"""
+    seconds = 0.0
+    for requests, wire in rounds:
+        if requests:
+            seconds += rtt + wire / bandwidth
+    return seconds + rtt
+
+
+async def measure(app: FastAPI):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        browser = Browser(client)
+        cold = await browser.load()
+        warm = await browser.load()
+    return cold, warm
+
+
+def main():
+    old = asyncio.run(measure(legacy_app()))
+    new = asyncio.run(measure(optimized_app()))
+
+    for label, index in (("cold (first visit)", 0), ("warm (repeat visit)", 1)):
+        old_rounds, new_rounds = old[index], new[index]
+        print(f"\n{label}")
+        print(f"  requests          old {sum(r for r, _ in old_rounds):7d}      new {sum(r for r, _ in new_rounds):7d}")
+        print(f"  bytes on the wire old {sum(b for _, b in old_rounds):7d}      new {sum(b for _, b in new_rounds):7d}")
+        for network, (rtt, bandwidth) in NETWORKS.items():
+            old_ms = model_seconds(old_rounds, rtt, bandwidth) * 1000
+            new_ms = model_seconds(new_rounds, rtt, bandwidth) * 1000
+            print(f"  ready to pitch, {network:10s} old {old_ms:7.0f} ms   new {new_ms:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
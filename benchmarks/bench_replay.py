@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Offline replay of recorded pitch sessions
+
+Record real sessions once (server running with PROVIDER_CASSETTE_MODE=record),
+then replay them here as a repeatable benchmark - no network and no API keys.
+Every session in the cassette is driven through VCAgent, AudioHandler and
+ReportGenerator with the founder's recorded lines; provider calls are served
+from the cassette with their original timing (or scaled with --speed).
+
+    python -m benchmarks.bench_replay data/cassettes/providers.jsonl
+    python -m benchmarks.bench_replay cassette.jsonl --speed 0 --runs 5   # no provider delays
+    python -m benchmarks.bench_replay cassette.jsonl --session 7f3a... --no-report
+
+Provider rate limits are lifted unless --rate-limits is given, so the numbers
+show the code path and the recorded provider time, not the token buckets.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def founder_lines(calls: List[Dict]) -> List[str]:
+    """The founder's input of every turn - the last user message of each streamed reply"""
+    lines = []
+    for call in calls:
+        if call["kind"] != "stream":
+            continue
+        text = next((m["content"] for m in reversed(call["request"]["messages"]) if m["role"] == "user"), None)
+        # A retry on another key or model repeats the same turn
+        if text and not (lines and lines[-1][0] == call["loose"]):
+            lines.append((call["loose"], text))
+    return [text for _, text in lines]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+async def replay_session(lines: List[str], report: bool, timings: Dict[str, List[float]]):
+    from backend.services.audio_handler import AudioHandler
+    from backend.services.report_generator import ReportGenerator
+    from backend.services.vc_agent import VCAgent
+
+    agent = VCAgent()
+    audio = AudioHandler()
+    for text in lines:
+        started = time.perf_counter()
+        reply = await agent.get_response(text)
+        replied = time.perf_counter()
+        try:
+            await audio.text_to_speech(reply)
+        except Exception as e:
+            print(f"  TTS failed: {e}")
+        done = time.perf_counter()
+        timings["llm"].append(replied - started)
+        timings["tts"].append(done - replied)
+        timings["turn"].append(done - started)
+
+    if report:
+        started = time.perf_counter()
+        await ReportGenerator(agent.llm_client, agent.llm_model, agent.is_groq).generate_report(agent.conversation_history)
+        timings["report"].append(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cassette", help="Cassette recorded with PROVIDER_CASSETTE_MODE=record")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = recorded timing, 2 = twice as fast, 0 = no delays")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--session", help="Only replay this session id")
+    parser.add_argument("--no-report", action="store_true", help="Skip report generation")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the configured provider rate limits")
+    args = parser.parse_args()
+
+    # Before config is imported - every client is a replay client from here on
+    os.environ["PROVIDER_CASSETTE_MODE"] = "replay"
+    os.environ["PROVIDER_CASSETTE_PATH"] = args.cassette
+    os.environ["PROVIDER_CASSETTE_SPEED"] = str(args.speed)
+    if not args.rate_limits:
+        for provider in ("GROQ", "OPENAI", "ELEVENLABS"):
+            os.environ[f"{provider}_RATE_LIMIT_RPS"] = "1000000"
+            os.environ[f"{provider}_RATE_LIMIT_BURST"] = "1000000"
+
+    import config
+    from backend.services.cassettes import cassette_calls, get_cassette, recorded_sessions
+
+    sessions = recorded_sessions(args.cassette)
+    if args.session:
+        sessions = {args.session: sessions.get(args.session, [])}
+    # Replay with the provider the sessions were recorded with
+    providers = {call["provider"] for calls in sessions.values() for call in calls}
+    config.USE_GROQ = "groq" in providers
+
+    scripts = {session_id: founder_lines(calls) for session_id, calls in sessions.items()}
+    scripts = {session_id: lines for session_id, lines in scripts.items() if lines}
+    if not scripts:
+        print(f"No recorded turns in {args.cassette}")
+        sys.exit(1)
+    print(f"{len(scripts)} session(s), {sum(map(len, scripts.values()))} turns, speed {args.speed:g}")
+
+    cassette = get_cassette()
+    for run in range(1, args.runs + 1):
+        cassette.rewind()
+        timings: Dict[str, List[float]] = {"llm": [], "tts": [], "turn": [], "report": []}
+        started = time.perf_counter()
+        for lines in scripts.values():
+            asyncio.run(replay_session(lines, not args.no_report, timings))
+        elapsed = time.perf_counter() - started
+
+        print(f"run {run}: {elapsed:.2f}s")
+        for stage, values in timings.items():
+            if values:
+                print(
+                    f"  {stage:<7} n={len(values):<4} p50 {statistics.median(values) * 1000:8.1f} ms"
+                    f"   p95 {percentile(values, 0.95) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms"
+                )
+
+    misses = sum(value for labels, value in cassette_calls.values.items() if ("outcome", "miss") in labels)
+    if misses:
+        print(f"{misses:g} call(s) had no recording - the code under test asked for something the sessions never did")
+
+
+if __name__ == "__main__":
+    main()
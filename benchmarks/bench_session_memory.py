@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Resident memory per idle session
+
+Creates N idle sessions the way websocket_endpoint does (VCAgent + AudioHandler
++ Session) and reports the RSS and Python heap growth per session.
+
+    python -m benchmarks.bench_session_memory              # 1k and 10k sessions
+    python -m benchmarks.bench_session_memory --counts 1000 --turns 6
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Sessions are never connected to a provider - a placeholder key is enough
+os.environ.setdefault("ELEVENLABS_API_KEY", "benchmark-placeholder")
+
+from backend.services.vc_agent import VCAgent
+from backend.services.audio_handler import AudioHandler
+from backend.services.session_manager import Session
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc, falls back to peak RSS elsewhere)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def build_sessions(count: int, turns: int):
+    sessions = []
+    for i in range(count):
+        agent = VCAgent()
+        for t in range(turns):
+            agent.turns.append(("user", f"We sell compliance software to mid-size banks, turn {t}."))
+            agent.turns.append(("assistant", "Banks buy from incumbents. Why would they trust you?"))
+        sessions.append(Session(str(i), agent, AudioHandler()))
+    return sessions
+
+
+def measure(count: int, turns: int):
+    # Warm up shared clients and imports so they are not attributed to sessions
+    build_sessions(1, turns)
+    gc.collect()
+
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    heap_before = tracemalloc.get_traced_memory()[0]
+
+    sessions = build_sessions(count, turns)
+    gc.collect()
+
+    heap_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    rss_after = rss_bytes()
+
+    per_session_heap = (heap_after - heap_before) / count
+    per_session_rss = (rss_after - rss_before) / count
+    print(
+        f"{count:>7} sessions, {turns} turns each: "
+        f"{per_session_heap / 1024:8.2f} KiB heap/session, "
+        f"{per_session_rss / 1024:8.2f} KiB RSS/session "
+        f"(total RSS +{(rss_after - rss_before) / 1024 / 1024:.1f} MiB)"
+    )
+    del sessions
+    gc.collect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--turns", type=int, default=0, help="Conversation turns per session (0 = idle)")
+    args = parser.parse_args()
+
+    for count in args.counts:
+        measure(count, args.turns)
+
+
+if __name__ == "__main__":
+    main()
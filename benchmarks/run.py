@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the pure-Python hot paths, with regression gating
+
+Each benchmark times one call of a function the server runs per turn or per
+report, taking the median of several repeats - a single lucky or unlucky
+repeat moves neither the result nor the baseline. Results are compared
+against benchmarks/baselines.json. The allowed slowdown is the threshold (per
+benchmark where one is registered), widened to NOISE_FACTOR times the spread
+(interquartile range) of the repeats when the benchmark is that noisy. A
+benchmark over it is measured again, and flagged only if the fastest of the
+re-runs is still over - then the command exits 1.
+
+    python -m benchmarks.run                  # compare against baselines
+    python -m benchmarks.run --save           # record new baselines
+    python -m benchmarks.run -k report        # only benchmarks matching "report"
+    python -m benchmarks.run --threshold 0.5  # allow 50% before flagging (default 30%)
+
+Baselines are machine-specific - record them on the machine that compares.
+"""
+import argparse
+import contextlib
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from backend.services.audio_handler import encode_audio
+from backend.services.report_generator import ReportGenerator
+from backend.services.report_store import ReportStore
+from backend.services.text_utils import QuestionStop, trim_reply
+from backend.services.vc_agent import VCAgent
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+DEFAULT_THRESHOLD = 0.30
+# Allowed slowdown is at least this many relative IQRs of the baseline or current repeats
+NOISE_FACTOR = 3
+
+# name -> factory returning the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+# name -> regression threshold, for benchmarks noisier than DEFAULT_THRESHOLD allows
+# (a few microseconds per call, or dominated by large allocations)
+THRESHOLDS: Dict[str, float] = {}
+# Fixture cleanup (temp directories), closed after each benchmark
+fixtures = contextlib.ExitStack()
+
+
+def benchmark(name: str, threshold: Optional[float] = None):
+    def register(factory):
+        BENCHMARKS[name] = factory
+        if threshold is not None:
+            THRESHOLDS[name] = threshold
+        return factory
+    return register
+
+
+# --- fixtures ------------------------------------------------------------
+
+FOUNDER_LINES = [
+    "We're building an AI copilot for freight brokers that automates load matching.",
+    "Our market is the 17,000 freight brokerages in the US, about 20 billion in fees.",
+    "We have 14 paying customers and 38k MRR, growing 20 percent month over month.",
+    "My co-founder ran ops at a top 10 brokerage and I built routing at a logistics startup.",
+    "Competitors sell TMS software; we sit on top of email and phone where brokers work.",
+]
+VC_LINES = [
+    "Freight brokers hate software. Why would they switch?",
+    "Twenty billion in fees is not your market. What do you actually capture?",
+    "Is that MRR from pilots or real contracts?",
+    "Why are you two the ones to win this?",
+    "What stops a TMS vendor from shipping this next quarter?",
+]
+
+
+def make_turns(exchanges: int):
+    turns = []
+    for i in range(exchanges):
+        turns.append(("user", FOUNDER_LINES[i % len(FOUNDER_LINES)]))
+        turns.append(("assistant", VC_LINES[i % len(VC_LINES)]))
+    return turns
+
+
+def make_agent(exchanges: int) -> VCAgent:
+    # Skip __init__ - no API keys or SDK clients needed to build messages
+    agent = VCAgent.__new__(VCAgent)
+    agent.turns = make_turns(exchanges)
+    return agent
+
+
+LLM_REPORT = {
+    "strengths": ["Clear wedge into broker workflow", "Real revenue", "Founder-market fit"],
+    "weaknesses": ["Thin moat against TMS vendors", "Market sizing is top-down", "Pilot-heavy revenue"],
+    "scores": {"idea": 7, "market": "6", "clarity": 8, "moat": 4},
+    "investment_probability": 31,
+}
+FENCED_REPORT = "Here is my evaluation:\n```json\n" + json.dumps(LLM_REPORT, indent=4) + "\n```\nGood luck."
+
+# ~6s of 128kbps MP3 arriving in the SDK's 4 KiB chunks
+_AUDIO = random.Random(0).randbytes(24 * 4096)
+AUDIO_CHUNKS = [_AUDIO[i:i + 4096] for i in range(0, len(_AUDIO), 4096)]
+
+
+# --- benchmarks ----------------------------------------------------------
+
+def make_history(exchanges: int):
+    return [{"role": "system", "content": config.VC_SYSTEM_PROMPT}] + [
+        {"role": role, "content": content} for role, content in make_turns(exchanges)
+    ]
+
+
+@benchmark("report.create_evaluation_prompt", threshold=0.5)
+def bench_evaluation_prompt():
+    generator = ReportGenerator(None, None, False)
+    exchanges = generator._pair_turns(make_history(20))
+    return lambda: generator._create_evaluation_prompt(exchanges)
+
+
+@benchmark("report.window_and_merge_60_answers")
+def bench_window_merge():
+    generator = ReportGenerator(None, None, False)
+    history = make_history(60)
+
+    def run():
+        windows = generator._windows(generator._pair_turns(history))
+        return generator._merge_reports([(window, generator._validate_report(LLM_REPORT)) for window in windows])
+    return run
+
+
+@benchmark("report.pre_score_60_answers")
+def bench_pre_score():
+    generator = ReportGenerator(None, None, False)
+    history = make_history(60)
+    return lambda: generator.pre_score(history)
+
+
+def make_report_store(reports: int) -> ReportStore:
+    """Store in a temp directory with reports spread over 30 days and three cohorts"""
+    rng = np.random.default_rng(0)
+    directory = fixtures.enter_context(tempfile.TemporaryDirectory(prefix="bench-reports-"))
+    store = ReportStore(directory, shard_name="worker-0")
+    store.open()
+    # Unmapped before the directory goes
+    fixtures.callback(store.close)
+    store.own.cohorts = ["default", "batch-a", "batch-b"]
+    store.own.extend({
+        # Appended in time order, like the server does
+        "ts": np.sort(time.time() - rng.uniform(0, 30 * 86400, reports)),
+        **{metric: rng.integers(0, 11, reports) for metric in ("idea", "market", "clarity", "moat")},
+        "investment_probability": rng.integers(0, 101, reports),
+        "answers": rng.integers(1, 30, reports),
+        "source": rng.integers(0, 2, reports),
+        "cohort": rng.integers(0, 3, reports),
+    })
+    store.refresh()
+    return store
+
+
+@benchmark("report_store.analytics_100k")
+def bench_store_analytics():
+    store = make_report_store(100_000)
+    return lambda: store.analytics()
+
+
+@benchmark("report_store.analytics_100k_7_days", threshold=0.5)
+def bench_store_analytics_window():
+    store = make_report_store(100_000)
+    return lambda: store.analytics(days=7)
+
+
+@benchmark("report.validate_report", threshold=0.5)
+def bench_validate_report():
+    generator = ReportGenerator(None, None, False)
+    return lambda: generator._validate_report(LLM_REPORT)
+
+
+@benchmark("report.extract_json_fenced", threshold=0.5)
+def bench_extract_json():
+    return lambda: json.loads(ReportGenerator._extract_json(FENCED_REPORT))
+
+
+@benchmark("vc_agent.build_messages_60_turns", threshold=0.5)
+def bench_build_messages():
+    agent = make_agent(30)
+    return agent._build_messages
+
+
+@benchmark("vc_agent.fallback_response", threshold=0.5)
+def bench_fallback_response():
+    agent = make_agent(0)
+    random.seed(0)
+    inputs = FOUNDER_LINES + ["So yeah, that's basically it."]
+    state = {"i": 0}
+
+    def run():
+        state["i"] += 1
+        return agent._get_fallback_response(inputs[state["i"] % len(inputs)])
+    return run
+
+
+@benchmark("reply.question_stop_streamed", threshold=0.5)
+def bench_question_stop():
+    # A reply arriving token by token, with a rambling sentence after the question
+    tokens = (VC_LINES[1] + " " + VC_LINES[3] + " And another thing.").split(" ")
+    # The policy being timed must not end on a rhetorical opener (the agent's own fallback line)
+    opener = "Huge market? Everyone says that. What's your actual TAM?"
+    if trim_reply(opener, 2) != opener:
+        raise AssertionError(f"QuestionStop cut a reply short: {trim_reply(opener, 2)!r}")
+    # ...and must not keep rambling past the question once over budget
+    rambling = "What is your TAM? Also I think you are late. And another thing here."
+    if trim_reply(rambling, 2) != "What is your TAM?":
+        raise AssertionError(f"QuestionStop kept the ramble: {trim_reply(rambling, 2)!r}")
+
+    def run():
+        policy = QuestionStop(2)
+        for token in tokens:
+            if policy.feed(token + " "):
+                break
+        return policy.text
+    return run
+
+
+@benchmark("audio.encode_6s_clip")
+def bench_encode_audio():
+    return lambda: encode_audio(iter(AUDIO_CHUNKS))
+
+
+@benchmark("ws.serialize_audio_frame", threshold=0.5)
+def bench_serialize_frame():
+    frame = {
+        "type": "audio",
+        "data": encode_audio(AUDIO_CHUNKS),
+        "text": VC_LINES[0],
+        "avatar_image_url": config.FREE_AVATAR_IMAGE_URL,
+        "seq": 12,
+    }
+    # Same encoding Starlette's WebSocket.send_json uses
+    return lambda: json.dumps(frame, separators=(",", ":"), ensure_ascii=False)
+
+
+# --- harness -------------------------------------------------------------
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Tuple[float, float]:
+    """Median per-call time in seconds over `repeat` runs of at least `min_time` each, and its spread"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - started) / number)
+    return summarize(times)
+
+
+def summarize(times: List[float]) -> Tuple[float, float]:
+    """Median and relative interquartile range - how noisy the repeats were"""
+    if len(times) < 2:
+        return times[0], 0.0
+    q1, median, q3 = statistics.quantiles(times, n=4)
+    return median, (q3 - q1) / median
+
+
+def format_time(seconds: float) -> str:
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:8.1f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:8.2f} µs"
+    return f"{seconds * 1e3:8.2f} ms"
+
+
+def load_baselines() -> Dict:
+    if not BASELINES_PATH.exists():
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="pattern", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baselines")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Flag results slower than baseline by more than this fraction, however noisy "
+                             f"(default {DEFAULT_THRESHOLD:.0%} or the benchmark's own, widened for noise)")
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument("--min-time", type=float, default=0.1, help="Seconds per repeat")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="Re-runs of a benchmark over its threshold before it counts as a regression")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    previous = baselines.get("results", {})
+    previous_spreads = baselines.get("spreads", {})
+    if previous and baselines.get("python") != platform.python_version():
+        print(f"⚠️  Baselines were recorded on Python {baselines.get('python')}, "
+              f"running {platform.python_version()}")
+
+    results = {}
+    spreads = {}
+    regressions = []
+    for name, factory in BENCHMARKS.items():
+        if args.pattern not in name:
+            continue
+        baseline = None if args.save else previous.get(name)
+
+        def allowed(spread: float) -> float:
+            if args.threshold is not None:
+                return args.threshold
+            noise = NOISE_FACTOR * max(spread, previous_spreads.get(name, 0.0))
+            return max(THRESHOLDS.get(name, DEFAULT_THRESHOLD), noise)
+
+        with fixtures:
+            fn = factory()
+            seconds, spread = measure(fn, args.repeat, args.min_time)
+            # A burst of machine noise rarely outlasts a re-run - a real regression does
+            for _ in range(args.confirm):
+                if not baseline or seconds / baseline - 1 <= allowed(spread):
+                    break
+                seconds, spread = min((seconds, spread), measure(fn, args.repeat, args.min_time))
+        results[name] = seconds
+        spreads[name] = spread
+        threshold = allowed(spread)
+
+        line = f"{name:40s} {format_time(seconds)}"
+        if baseline:
+            change = seconds / baseline - 1
+            line += f"   {change:+7.1%} vs {format_time(baseline).strip()} (limit {threshold:+.0%})"
+            if change > threshold:
+                line += "   REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        merged = dict(previous, **results)
+        with open(BASELINES_PATH, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": merged,
+                "spreads": dict(previous_spreads, **spreads),
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved {len(results)} baseline(s) to {BASELINES_PATH}")
+        return
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) regressed past their threshold: " + ", ".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Local stub of the D-ID and HeyGen streaming APIs
+
+Answers the endpoints DIDHandler and HeyGenHandler call, with configurable
+latency, and counts requests and TCP connections so connection reuse can be
+checked. Point the handlers at it with DID_BASE_URL / HEYGEN_BASE_URL:
+
+    python -m benchmarks.stub_avatar_server --port 8765 --create-ms 800 --say-ms 120
+    DID_BASE_URL=http://127.0.0.1:8765 HEYGEN_BASE_URL=http://127.0.0.1:8765/v1 \\
+        AVATAR_PROVIDER=did DID_API_KEY=test DID_AVATAR_ID=test python run.py
+
+GET /stats returns the counters.
+"""
+import argparse
+import asyncio
+import itertools
+from collections import Counter
+
+from aiohttp import web
+
+
+def make_app(create_ms: float = 800, say_ms: float = 120, streams_fail: bool = False) -> web.Application:
+    """
+    create_ms:    latency of session creation (the slow, billed call)
+    say_ms:       latency of each text submission
+    streams_fail: answer /talks/streams with 404, like accounts without the Streams API
+    """
+    ids = itertools.count(1)
+    stats = {"requests": Counter(), "connections": set(), "spoken": []}
+
+    @web.middleware
+    async def count(request, handler):
+        if request.path != "/stats":
+            stats["requests"][f"{request.method} {request.match_info.route.resource.canonical}"] += 1
+            stats["connections"].add(request.transport.get_extra_info("peername"))
+        return await handler(request)
+
+    async def delay(ms):
+        await asyncio.sleep(ms / 1000)
+
+    async def did_create_stream(request):
+        await delay(create_ms)
+        if streams_fail:
+            return web.json_response({"kind": "NotFoundError"}, status=404)
+        return web.json_response({"id": f"strm_{next(ids)}", "session_id": "stub"}, status=201)
+
+    async def did_say_stream(request):
+        await delay(say_ms)
+        if streams_fail:
+            return web.json_response({"kind": "NotFoundError"}, status=404)
+        body = await request.json()
+        stats["spoken"].append(body["script"]["input"])
+        return web.json_response({"status": "started"})
+
+    async def did_delete_stream(request):
+        return web.json_response({"status": "deleted"})
+
+    async def did_create_agent(request):
+        await delay(create_ms)
+        return web.json_response({"id": f"agt_{next(ids)}"}, status=201)
+
+    async def did_agent_chat(request):
+        await delay(say_ms)
+        body = await request.json()
+        stats["spoken"].append(body["text"])
+        return web.json_response({"status": "ok"})
+
+    async def heygen_create(request):
+        await delay(create_ms)
+        return web.json_response({"session_id": f"hg_{next(ids)}"})
+
+    async def heygen_say(request):
+        await delay(say_ms)
+        body = await request.json()
+        stats["spoken"].append(body["text"])
+        return web.json_response({"status": "ok"})
+
+    async def heygen_stop(request):
+        return web.json_response({"status": "stopped"})
+
+    async def get_stats(request):
+        return web.json_response({
+            "requests": dict(stats["requests"]),
+            "connections": len(stats["connections"]),
+            "spoken": len(stats["spoken"]),
+        })
+
+    app = web.Application(middlewares=[count])
+    app["stats"] = stats
+    app.router.add_post("/talks/streams", did_create_stream)
+    app.router.add_post("/talks/streams/{id}", did_say_stream)
+    app.router.add_delete("/talks/streams/{id}", did_delete_stream)
+    app.router.add_post("/agents", did_create_agent)
+    app.router.add_post("/agents/{id}/chat", did_agent_chat)
+    app.router.add_post("/v1/streaming.create", heygen_create)
+    app.router.add_post("/v1/streaming.say", heygen_say)
+    app.router.add_post("/v1/streaming.stop", heygen_stop)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+async def start_stub(port: int = 0, **options):
+    """Run the stub in the current event loop. Returns (runner, base_url)"""
+    runner = web.AppRunner(make_app(**options))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--create-ms", type=float, default=800)
+    parser.add_argument("--say-ms", type=float, default=120)
+    parser.add_argument("--streams-fail", action="store_true")
+    args = parser.parse_args()
+    web.run_app(
+        make_app(args.create_ms, args.say_ms, args.streams_fail),
+        host="127.0.0.1",
+        port=args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,27 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY") or os.getenv("GROK_API_KEY", None)
 USE_GROQ = os.getenv("USE_GROQ", "false").lower() == "true" or os.getenv("USE_GROK", "false").lower() == "true"  # Set to "true" to use Groq instead of OpenAI
 GROQ_MODEL = os.getenv("GROQ_MODEL") or os.getenv("GROK_MODEL", "llama-3.3-70b-versatile")  # Groq models: llama-3.3-70b-versatile, llama-3.1-8b-instant, mixtral-8x7b-32768, etc.
 
+# VC replies stop at the question that closes the sentence budget - at most this many sentences are spoken
+# (one more is allowed if that is what it takes to reach the question)
+VC_MAX_SENTENCES = int(os.getenv("VC_MAX_SENTENCES", 2))
+
+# Groq model routing (see backend/services/model_router.py) - each call goes to the
+# fastest healthy model at or above the purpose's quality tier (1 = 8B ... 3 = 70B)
+GROQ_TURN_MIN_TIER = int(os.getenv("GROQ_TURN_MIN_TIER", 1))  # Short VC replies - small models are fine
+GROQ_REPORT_MIN_TIER = int(os.getenv("GROQ_REPORT_MIN_TIER", 3))  # Full pitch reports stay on large models
+ROUTER_EWMA_ALPHA = float(os.getenv("ROUTER_EWMA_ALPHA", 0.2))  # Weight of the newest latency/error sample
+ROUTER_EXPLORE_RATE = float(os.getenv("ROUTER_EXPLORE_RATE", 0.05))  # Share of calls sent to a non-best model
+ROUTER_STALE_AFTER = float(os.getenv("ROUTER_STALE_AFTER", 300))  # Seconds before an unused model is re-measured
+ROUTER_DISABLE_SECONDS = float(os.getenv("ROUTER_DISABLE_SECONDS", 3600))  # Skip decommissioned/unknown models this long
+
+# Text-to-speech model policy (see choose_tts_model in backend/services/audio_handler.py)
+TTS_QUALITY_MODEL = os.getenv("TTS_QUALITY_MODEL", "eleven_multilingual_v2")  # Most natural - pre-warmed lines and long replies
+TTS_FAST_MODEL = os.getenv("TTS_FAST_MODEL", "eleven_flash_v2_5")  # Lowest latency
+TTS_FAST_MAX_CHARS = int(os.getenv("TTS_FAST_MAX_CHARS", 80))  # Lines this short always use the fast model
+TTS_LATENCY_BUDGET = float(os.getenv("TTS_LATENCY_BUDGET", 1.5))  # Seconds - use the fast model when the quality model is measured slower
+TTS_EXPLORE_RATE = float(os.getenv("TTS_EXPLORE_RATE", 0.05))  # Share of over-budget lines still sent to the quality model, to re-measure it
+TTS_STALE_AFTER = float(os.getenv("TTS_STALE_AFTER", 300))  # Seconds before an over-budget quality model gets one line to re-measure
+
 # Avatar Configuration (OPTIONAL - system works perfectly without this)
 # Choose one: HeyGen or D-ID
 
@@ -26,6 +47,7 @@ GROQ_MODEL = os.getenv("GROQ_MODEL") or os.getenv("GROK_MODEL", "llama-3.3-70b-v
 # Get avatar ID from: https://app.heygen.com/avatar
 HEYGEN_API_KEY = os.getenv("HEYGEN_API_KEY", None)
 HEYGEN_AVATAR_ID = os.getenv("HEYGEN_AVATAR_ID", None)
+HEYGEN_BASE_URL = os.getenv("HEYGEN_BASE_URL", "https://api.heygen.com/v1")  # Point at a stub server for local testing
 
 # D-ID Configuration (FREE TIER AVAILABLE - 20 credits/month)
 # Get API key from: https://studio.d-id.com/api-keys
@@ -36,6 +58,14 @@ HEYGEN_AVATAR_ID = os.getenv("HEYGEN_AVATAR_ID", None)
 # - A preset avatar name
 DID_API_KEY = os.getenv("DID_API_KEY", None)
 DID_AVATAR_ID = os.getenv("DID_AVATAR_ID", None)  # Can be image URL or avatar ID
+DID_BASE_URL = os.getenv("DID_BASE_URL", "https://api.d-id.com")  # Point at a stub server for local testing
+
+# Streaming avatar sessions (D-ID/HeyGen) are created ahead of time and pooled.
+# Pooled sessions are billed while they wait, so keep the pool small.
+AVATAR_PROVIDER = os.getenv("AVATAR_PROVIDER", "none").lower()  # "did", "heygen" or "none" (free avatar below)
+AVATAR_POOL_SIZE = int(os.getenv("AVATAR_POOL_SIZE", 2))  # Sessions kept ready per worker
+AVATAR_SESSION_TTL = float(os.getenv("AVATAR_SESSION_TTL", 240))  # Discard unused pooled sessions after this many seconds
+AVATAR_HTTP_TIMEOUT = float(os.getenv("AVATAR_HTTP_TIMEOUT", 15))  # Per-request timeout for avatar API calls
 
 # Animated Avatar Configuration (NO API NEEDED - Just an image URL)
 # This creates a simple animated avatar that moves when speaking
@@ -47,6 +77,125 @@ FREE_AVATAR_IMAGE_URL = os.getenv("FREE_AVATAR_IMAGE_URL", "https://i.imgur.com/
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", 8000))
 
+# Multiple worker processes (run.py) - see backend/launcher.py
+# sticky:    the launcher proxies each connection to a worker, and reconnecting clients
+#            go back to the worker that holds their session (default)
+# shared:    uvicorn workers accept from one shared socket (no session affinity)
+# reuseport: each worker binds PORT with SO_REUSEPORT, Linux only (no session affinity)
+WORKERS = int(os.getenv("WORKERS", 1))  # Not WEB_CONCURRENCY - hosts set that on their own, multi-worker mode is opt-in
+WORKER_MODE = os.getenv("WORKER_MODE", "sticky").lower()
+WORKER_PORT_BASE = int(os.getenv("WORKER_PORT_BASE", 9100))  # First loopback port for sticky-mode workers
+WORKER_ID = os.getenv("WORKER_ID", None)  # Set by the launcher - embedded in session IDs and resume tokens
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", 30))  # Seconds a stopping worker gets to finish open connections
+
+# Frontend assets - see backend/static_assets.py
+# Optimized: content-hashed names, precompressed gzip/brotli, immutable caching.
+# Set STATIC_ASSETS_OPTIMIZED=false to serve frontend/ as plain files (for comparison).
+STATIC_ASSETS_OPTIMIZED = os.getenv("STATIC_ASSETS_OPTIMIZED", "true").lower() == "true"
+ASSET_BUILD_ON_START = os.getenv("ASSET_BUILD_ON_START", "true").lower() == "true"  # false: serve the existing frontend/dist build
+
+# Admin endpoints (/admin/*) are disabled unless ADMIN_TOKEN is set.
+# Send it in the X-Admin-Token header.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", None)
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))  # Longest allowed profiling window
+
+# Event Loop Watchdog - flags sync work that blocks every WebSocket on the worker
+LOOP_WATCHDOG_ENABLED = os.getenv("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", 0.1))  # Heartbeat period in seconds
+LOOP_STALL_THRESHOLD = float(os.getenv("LOOP_STALL_THRESHOLD", 0.25))  # Capture a stack when blocked this long
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.05))  # Fraction of sessions whose hot-path debug events are kept
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # Records buffered for the writer thread before dropping
+
+# Admission Control / Rate Limiting
+# Max provider-bound jobs (pitch turns + reports) running at once per worker.
+# Extra work waits in a fair per-session queue and the client sees a "queued" status.
+MAX_CONCURRENT_TURNS = int(os.getenv("MAX_CONCURRENT_TURNS", 16))
+# Token-bucket limits per provider and API key: (requests per second, burst size).
+# These are totals - with several workers each one gets an equal share.
+PROVIDER_RATE_LIMITS = {
+    "groq": (float(os.getenv("GROQ_RATE_LIMIT_RPS", 0.5)), float(os.getenv("GROQ_RATE_LIMIT_BURST", 5))),  # Free tier is 30 RPM
+    "openai": (float(os.getenv("OPENAI_RATE_LIMIT_RPS", 3)), float(os.getenv("OPENAI_RATE_LIMIT_BURST", 10))),
+    "elevenlabs": (float(os.getenv("ELEVENLABS_RATE_LIMIT_RPS", 2)), float(os.getenv("ELEVENLABS_RATE_LIMIT_BURST", 4))),
+}
+
+# API Key Pools - comma-separated lists (GROQ_API_KEYS, OPENAI_API_KEYS, ELEVENLABS_API_KEYS)
+# spread traffic over several keys per provider; each key gets its own rate limit bucket above.
+# The single-key variables still work and are used when no list is set.
+GROQ_API_KEYS = [key.strip() for key in os.getenv("GROQ_API_KEYS", GROQ_API_KEY or "").split(",") if key.strip()]
+OPENAI_API_KEYS = [key.strip() for key in os.getenv("OPENAI_API_KEYS", OPENAI_API_KEY or "").split(",") if key.strip()]
+ELEVENLABS_API_KEYS = [key.strip() for key in os.getenv("ELEVENLABS_API_KEYS", ELEVENLABS_API_KEY or "").split(",") if key.strip()]
+if os.getenv("PROVIDER_CASSETTE_MODE", "off") == "replay":
+    # Replayed calls never reach a provider - a placeholder key keeps every pool and handler enabled
+    GROQ_API_KEYS, OPENAI_API_KEYS, ELEVENLABS_API_KEYS = (keys or ["replay"] for keys in (GROQ_API_KEYS, OPENAI_API_KEYS, ELEVENLABS_API_KEYS))
+GROQ_API_KEY = GROQ_API_KEY or next(iter(GROQ_API_KEYS), None)
+OPENAI_API_KEY = OPENAI_API_KEY or next(iter(OPENAI_API_KEYS), None)
+ELEVENLABS_API_KEY = ELEVENLABS_API_KEY or next(iter(ELEVENLABS_API_KEYS), None)
+API_KEY_STRATEGY = os.getenv("API_KEY_STRATEGY", "least_loaded")  # "least_loaded" (fewest calls in flight, most bucket headroom) or "round_robin"
+API_KEY_RATE_LIMIT_COOLDOWN = float(os.getenv("API_KEY_RATE_LIMIT_COOLDOWN", 30))  # Seconds a key rests after a 429 (unless Retry-After says otherwise)
+API_KEY_AUTH_COOLDOWN = float(os.getenv("API_KEY_AUTH_COOLDOWN", 600))  # Seconds a key rests after a 401/403 (revoked or out of credits)
+
+# Usage cost estimates (USD) - used for the usage_cost_usd_total metric and report summaries
+# LLM: model -> (input, cached input, output) per 1M tokens
+LLM_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "llama-3.3-70b-versatile": (0.59, 0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.05, 0.08),
+    "llama-3.1-70b-versatile": (0.59, 0.59, 0.79),
+    "mixtral-8x7b-32768": (0.24, 0.24, 0.24),
+}
+# TTS: model -> per 1K characters
+TTS_PRICES = {
+    "eleven_multilingual_v2": float(os.getenv("ELEVENLABS_PRICE_PER_1K_CHARS", 0.18)),
+    "eleven_flash_v2_5": float(os.getenv("ELEVENLABS_FLASH_PRICE_PER_1K_CHARS", 0.09)),  # Half the credits
+}
+
+# Transcript Journal (append-only JSONL segments, written in the background)
+TRANSCRIPT_ENABLED = os.getenv("TRANSCRIPT_ENABLED", "true").lower() == "true"
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", "data/transcripts")
+TRANSCRIPT_MAX_BUFFER = int(os.getenv("TRANSCRIPT_MAX_BUFFER", 10000))  # Entries held in memory before dropping
+TRANSCRIPT_BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", 200))
+TRANSCRIPT_FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", 1.0))  # Seconds
+
+# Pitch Reports - long sessions are scored in windows of paired turns (concurrently,
+# on a cheaper model) and the window scores are merged into one report
+REPORT_WINDOW_EXCHANGES = int(os.getenv("REPORT_WINDOW_EXCHANGES", 6))  # Founder answers per window
+REPORT_CHUNK_THRESHOLD = int(os.getenv("REPORT_CHUNK_THRESHOLD", 10))  # Use windows above this many answers
+REPORT_MAX_WINDOWS = int(os.getenv("REPORT_MAX_WINDOWS", 8))  # Longer sessions are sampled down to this many windows
+REPORT_MAX_PARALLEL = int(os.getenv("REPORT_MAX_PARALLEL", 4))  # Window evaluations in flight at once
+REPORT_WINDOW_MODEL = os.getenv("REPORT_WINDOW_MODEL", None)  # Default: llama-3.1-8b-instant (Groq) / gpt-4o-mini (OpenAI)
+REPORT_TIMEOUT = float(os.getenv("REPORT_TIMEOUT", 20))  # Seconds - windows still running after this are left out
+
+# Report Store - every generated report's scores as memory-mapped columns for /admin/reports/analytics
+REPORT_STORE_ENABLED = os.getenv("REPORT_STORE_ENABLED", "true").lower() == "true"
+REPORT_STORE_DIR = os.getenv("REPORT_STORE_DIR", "data/reports")  # One shard directory per worker
+REPORT_STORE_INITIAL_CAPACITY = int(os.getenv("REPORT_STORE_INITIAL_CAPACITY", 4096))  # Rows per column file before it doubles
+
+# Provider Cassettes - record Groq/OpenAI/ElevenLabs calls with their timing, or replay them offline
+PROVIDER_CASSETTE_MODE = os.getenv("PROVIDER_CASSETTE_MODE", "off")  # "off", "record" or "replay" (no network, no keys)
+PROVIDER_CASSETTE_PATH = os.getenv("PROVIDER_CASSETTE_PATH", "data/cassettes/providers.jsonl")  # Appended to while recording
+PROVIDER_CASSETTE_SPEED = float(os.getenv("PROVIDER_CASSETTE_SPEED", 1.0))  # Replay pacing: 1 = as recorded, 2 = twice as fast, 0 = no delays
+
+# Session Heartbeats (seconds)
+SESSION_HEARTBEAT_INTERVAL = float(os.getenv("SESSION_HEARTBEAT_INTERVAL", 20))  # Ping sessions quiet for this long
+SESSION_HEARTBEAT_TIMEOUT = float(os.getenv("SESSION_HEARTBEAT_TIMEOUT", 60))  # Release sessions with no frames (not even pongs)
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", 1800))  # Release sessions with no pitch activity, 0 = never
+# Session Resume - keep a disconnected session this long so a reconnect can pick it up
+SESSION_RESUME_GRACE = float(os.getenv("SESSION_RESUME_GRACE", 120))  # Seconds, 0 = no resume
+SESSION_OUTBOX_SIZE = int(os.getenv("SESSION_OUTBOX_SIZE", 8))  # Unacked turn responses kept for redelivery
+# Outbound send queue per socket (one audio reply is roughly 50-300 KB of base64)
+SEND_QUEUE_MAX_BYTES = int(os.getenv("SEND_QUEUE_MAX_BYTES", 4 * 1024 * 1024))  # Backlog that disconnects a slow client (it can resume) - keep above a full outbox
+SEND_QUEUE_HIGH_WATER = int(os.getenv("SEND_QUEUE_HIGH_WATER", 512 * 1024))  # Backlog above which a new turn waits for the client
+SEND_QUEUE_WAIT_TIMEOUT = float(os.getenv("SEND_QUEUE_WAIT_TIMEOUT", 10))  # Seconds a turn waits before going ahead anyway
+
+# Spectators - read-only viewers of a live session (/ws/watch?token=<watch token>)
+SPECTATORS_ENABLED = os.getenv("SPECTATORS_ENABLED", "true").lower() == "true"
+SPECTATOR_MAX_PER_SESSION = int(os.getenv("SPECTATOR_MAX_PER_SESSION", 200))
+SPECTATOR_QUEUE_SIZE = int(os.getenv("SPECTATOR_QUEUE_SIZE", 8))  # Frames buffered per viewer before the oldest is dropped
+
 # VC Investor Personality Prompt
 VC_SYSTEM_PROMPT = """You are "Alex Venture", a brutally harsh VC investor with 20+ years in Silicon Valley. You're mean, direct, and cut straight to the point.
 
@@ -1,3 +1,101 @@
+class AudioPlayer {
+    // One shared AudioContext for the page. Clips are decoded as soon as they
+    // arrive and scheduled back to back on the audio clock, so consecutive
+    // replies play without gaps or overlap.
+    constructor({ onStart, onEnd, onIdle } = {}) {
+        this.context = null;
+        this.nextStartTime = 0; // Audio-clock time the last scheduled clip ends
+        this.chain = Promise.resolve(); // Keeps scheduling in arrival order
+        this.active = new Set(); // Sources scheduled or playing
+        this.generation = 0; // Bumped by stop() so clips still decoding are dropped
+        this.onStart = onStart || (() => {});
+        this.onEnd = onEnd || (() => {});
+        this.onIdle = onIdle || (() => {});
+    }
+
+    unlock() {
+        // Browsers only let audio start after a user gesture - call from one
+        const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+        if (!this.context && AudioContextClass) {
+            this.context = new AudioContextClass();
+        }
+        if (this.context && this.context.state === 'suspended') {
+            this.context.resume();
+        }
+        return Boolean(this.context);
+    }
+
+    async decode(base64Audio) {
+        // fetch() turns the data URI into bytes off the main thread
+        const response = await fetch(`data:audio/mpeg;base64,${base64Audio}`);
+        const bytes = await response.arrayBuffer();
+        return this.context.decodeAudioData(bytes);
+    }
+
+    enqueue(base64Audio, meta = {}) {
+        // Resolves once the clip has finished playing (or failed)
+        if (!this.unlock()) {
+            return Promise.reject(new Error('Web Audio not supported'));
+        }
+        const receivedAt = performance.now();
+        const generation = this.generation;
+        const decoded = this.decode(base64Audio); // Decode ahead, in parallel with earlier clips
+        // The next clip waits for this one to be scheduled, not played, so it can start gaplessly
+        const scheduled = this.chain.then(() => decoded).then((buffer) => {
+            // Dropped by stop() while it was still decoding
+            if (generation !== this.generation) return null;
+            return { ended: this.schedule(buffer, meta, receivedAt) };
+        });
+        this.chain = scheduled.then(() => {}, () => {});
+        return scheduled.then((clip) => clip && clip.ended);
+    }
+
+    schedule(buffer, meta, receivedAt) {
+        const context = this.context;
+        const source = context.createBufferSource();
+        source.buffer = buffer;
+        source.connect(context.destination);
+
+        // Start exactly where the previous clip ends, or right away if the queue ran dry
+        const startAt = Math.max(context.currentTime + 0.01, this.nextStartTime);
+        this.nextStartTime = startAt + buffer.duration;
+        source.start(startAt);
+        this.active.add(source);
+
+        const startDelay = Math.max(0, (startAt - context.currentTime) * 1000);
+        setTimeout(() => {
+            if (this.active.has(source)) this.onStart(meta, performance.now() - receivedAt);
+        }, startDelay);
+
+        return new Promise((resolve) => {
+            source.onended = () => {
+                // Let the decoded buffer be collected
+                source.disconnect();
+                source.buffer = null;
+                this.active.delete(source);
+                this.onEnd(meta);
+                if (this.active.size === 0) {
+                    this.onIdle();
+                }
+                resolve();
+            };
+        });
+    }
+
+    stop() {
+        // Drop everything queued or playing (e.g. on reset) - each source still fires onended
+        this.generation += 1;
+        for (const source of this.active) {
+            try {
+                source.stop();
+            } catch (error) {
+                // Already stopped
+            }
+        }
+        this.nextStartTime = 0;
+    }
+}
+
 class VCAgentClient {
     constructor() {
         this.ws = null;
@@ -5,6 +103,20 @@ class VCAgentClient {
         this.recognition = null;
         this.userInteracted = false; // Track if user has interacted
         this.pendingAudio = null; // Store audio that needs user interaction
+        this.idleClosed = false; // Server released the session for inactivity
+        this.lastVcText = null; // Last VC line shown, to skip duplicates on redelivery
+        this.renderedSession = null; // Session whose messages are on screen
+        // ?watch=<watch token> opens a read-only view of someone else's live pitch
+        this.watchToken = new URLSearchParams(window.location.search).get('watch');
+        this.player = new AudioPlayer({
+            onStart: (meta, delayMs) => {
+                this.startSpeakingAnimation();
+                this.sendPlaybackEvent('start', meta, delayMs);
+            },
+            onEnd: (meta) => this.sendPlaybackEvent('end', meta),
+            onIdle: () => this.stopSpeakingAnimation()
+        });
+        this.loadSession();
         this.initializeElements();
         this.setupEventListeners();
     }
@@ -22,43 +134,161 @@ class VCAgentClient {
         this.resetButton.addEventListener('click', () => this.resetConversation());
     }
 
+    loadSession() {
+        // Survives reconnects and page reloads within this tab
+        const saved = JSON.parse(sessionStorage.getItem('pitchSession') || '{}');
+        this.sessionId = saved.sessionId || null;
+        this.resumeToken = saved.resumeToken || null;
+        this.lastSeq = saved.lastSeq || 0; // Highest reliable frame already handled
+    }
+
+    saveSession() {
+        sessionStorage.setItem('pitchSession', JSON.stringify({
+            sessionId: this.sessionId,
+            resumeToken: this.resumeToken,
+            lastSeq: this.lastSeq
+        }));
+    }
+
+    clearSession() {
+        this.sessionId = null;
+        this.resumeToken = null;
+        this.lastSeq = 0;
+        sessionStorage.removeItem('pitchSession');
+    }
+
+    sendAck(seq) {
+        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+            this.ws.send(JSON.stringify({ type: 'ack', seq }));
+        }
+    }
+
+    startWatching() {
+        // Read-only: no recording, audio starts once the viewer clicks (autoplay rules)
+        this.statusIndicator.classList.add('active');
+        this.recordButton.style.display = 'none';
+        this.resetButton.style.display = 'none';
+        if (!this.userInteracted) {
+            this.updateStatus('Watching live - click anywhere to hear the pitch');
+            document.addEventListener('click', () => {
+                this.userInteracted = true;
+                this.player.unlock();
+                this.pendingAudio = null; // Stale by now
+                this.updateStatus('Watching live');
+            }, { once: true });
+        }
+    }
+
+    handleSession(data) {
+        if (data.session_id !== this.sessionId) {
+            // New server-side session - sequence numbers start over
+            this.lastSeq = 0;
+        }
+        this.sessionId = data.session_id;
+        this.resumeToken = data.resume_token;
+        this.saveSession();
+
+        if (data.avatar_image_url) {
+            this.setupFreeAvatar(data.avatar_image_url);
+        }
+
+        if (data.resumed && this.renderedSession !== data.session_id) {
+            // Page was reloaded - rebuild the conversation from the server's history
+            this.messagesContainer.innerHTML = '';
+            for (const turn of data.history || []) {
+                this.addMessage(turn.content, turn.role === 'assistant' ? 'vc' : 'user');
+            }
+        }
+        this.renderedSession = data.session_id;
+        if (data.watch_token) {
+            console.log('Spectator link:', `${window.location.origin}/?watch=${data.watch_token}`);
+        }
+        if (data.resumed) {
+            this.updateStatus('Reconnected. Ready for your next response');
+        }
+    }
+
     connect() {
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws`;
+        const resume = this.resumeToken ? `?resume=${encodeURIComponent(this.resumeToken)}` : '';
+        const wsUrl = this.watchToken
+            ? `${protocol}//${window.location.host}/ws/watch?token=${encodeURIComponent(this.watchToken)}`
+            : `${protocol}//${window.location.host}/ws${resume}`;
         
         this.ws = new WebSocket(wsUrl);
 
         this.ws.onopen = () => {
             console.log('Connected to server');
+            if (this.watchToken) {
+                this.startWatching();
+                return;
+            }
             this.updateStatus('Connected. Click "Start Recording" to begin');
             this.recordButton.disabled = false;
             this.statusIndicator.classList.add('active');
+            this.reportPageTiming();
         };
 
         this.ws.onmessage = async (event) => {
             const data = JSON.parse(event.data);
             
-            if (data.type === 'audio') {
+            if (data.type === 'ping') {
+                // Heartbeat - lets the server release sessions whose socket died
+                this.ws.send(JSON.stringify({ type: 'pong' }));
+                return;
+            }
+            
+            if (data.seq !== undefined) {
+                // Reliable frame - acknowledge it, and skip it if already handled
+                this.sendAck(data.seq);
+                if (data.seq <= this.lastSeq) {
+                    return;
+                }
+                this.lastSeq = data.seq;
+                this.saveSession();
+            }
+            
+            if (data.type === 'session') {
+                this.handleSession(data);
+            } else if (data.type === 'spectate') {
+                // Joined as a viewer - show the exchange so far
+                this.messagesContainer.innerHTML = '';
+                for (const turn of data.history || []) {
+                    this.addMessage(turn.content, turn.role === 'assistant' ? 'vc' : 'user');
+                }
+                if (data.avatar_image_url) {
+                    this.setupFreeAvatar(data.avatar_image_url);
+                }
+            } else if (data.type === 'reset') {
+                // The founder started over (or left)
+                this.player.stop();
+                this.messagesContainer.innerHTML = '';
+                if (data.ended) {
+                    this.updateStatus('The pitch has ended');
+                }
+            } else if (data.type === 'audio') {
                 // Always use free animated avatar (ignore D-ID/HeyGen)
                 if (data.avatar_image_url) {
                     this.setupFreeAvatar(data.avatar_image_url);
                 }
                 
-                // Always show the message text
-                this.addMessage(data.text, 'vc');
+                // Always show the message text (a redelivered line may already be on screen)
+                if (!(data.redelivered && data.text === this.lastVcText)) {
+                    this.addMessage(data.text, 'vc');
+                }
                 
                 // Only play audio if user has interacted, otherwise store it
                 if (this.userInteracted) {
                     try {
-                        await this.playAudio(data.data);
+                        await this.playAudio(data.data, { turn: data.turn });
                     } catch (error) {
                         console.warn('Audio playback failed:', error);
                         // Audio failed but message is already shown, so continue
                     }
-                    this.updateStatus('Ready for your next response');
-                } else {
+                    this.updateStatus(this.watchToken ? 'Watching live' : 'Ready for your next response');
+                } else if (!this.watchToken) {
                     // Store audio for later playback after user interaction
-                    this.pendingAudio = data.data;
+                    this.pendingAudio = { data: data.data, turn: data.turn };
                     this.updateStatus('Click "Start Recording" to begin');
                 }
             } else if (data.type === 'user_message') {
@@ -67,6 +297,14 @@ class VCAgentClient {
             } else if (data.type === 'text_error') {
                 this.addMessage(data.text, 'vc');
                 this.updateStatus('Error occurred. Please try again.');
+            } else if (data.type === 'status') {
+                // Server is under load - show a short wait instead of failing
+                if (data.status === 'queued') {
+                    const where = data.position ? ` (#${data.position} in line)` : '';
+                    this.updateStatus(`High demand - your turn is queued${where}...`);
+                } else if (data.status === 'admitted') {
+                    this.updateStatus('VC is thinking...');
+                }
             }
         };
 
@@ -80,6 +318,26 @@ class VCAgentClient {
             this.updateStatus('Disconnected. Reconnecting...');
             this.statusIndicator.classList.remove('active');
             this.recordButton.disabled = true;
+            if (event.code === 4409) {
+                // Another tab took over this session - start a fresh one here
+                this.clearSession();
+            }
+            if (this.watchToken && event.code !== 1006) {
+                // Session ended or was never there - nothing to reconnect to
+                this.updateStatus(event.code === 4429 ? 'Too many people watching this pitch' : 'The pitch has ended');
+                return;
+            }
+            if (event.code === 4410) {
+                // Server dropped us for falling behind - resume picks up the missed replies
+                this.updateStatus('Slow connection. Reconnecting...');
+            }
+            if (event.code === 4408) {
+                // Server released the session after a long idle period - wait for the user
+                this.updateStatus('Session paused due to inactivity. Click "Start Recording" to continue');
+                this.recordButton.disabled = false;
+                this.idleClosed = true;
+                return;
+            }
             // Reconnect after 2 seconds
             setTimeout(() => {
                 console.log('Attempting to reconnect...');
@@ -99,15 +357,20 @@ class VCAgentClient {
     async startRecording() {
         // Mark user as interacted (allows audio playback)
         this.userInteracted = true;
+        this.player.unlock();
+        
+        if (this.idleClosed) {
+            // Session was released while idle - reconnect first
+            this.idleClosed = false;
+            this.connect();
+            return;
+        }
         
         // Play any pending audio (like welcome message)
         if (this.pendingAudio) {
-            try {
-                await this.playAudio(this.pendingAudio);
-                this.pendingAudio = null;
-            } catch (error) {
-                console.warn('Failed to play pending audio:', error);
-            }
+            const pending = this.pendingAudio;
+            this.pendingAudio = null;
+            await this.playAudio(pending.data, { turn: pending.turn });
         }
         
         try {
@@ -204,38 +467,25 @@ class VCAgentClient {
         }
     }
 
-    async playAudio(base64Audio) {
-        return new Promise((resolve, reject) => {
-            const audio = new Audio(`data:audio/mpeg;base64,${base64Audio}`);
-            
-            // Simple: start animation when audio plays
-            this.startSpeakingAnimation();
-            
-            audio.onended = () => {
-                this.stopSpeakingAnimation();
-                resolve();
-            };
-            audio.onerror = (error) => {
-                console.error('Audio playback error:', error);
-                this.stopSpeakingAnimation();
-                resolve();
-            };
-            
-            // Try to play, handle autoplay restrictions
-            const playPromise = audio.play();
-            if (playPromise !== undefined) {
-                playPromise
-                    .then(() => {
-                        // Audio started playing - animation is already active
-                    })
-                    .catch(error => {
-                        // Autoplay was prevented - this is okay, user will interact
-                        console.warn('Audio autoplay prevented:', error);
-                        this.stopSpeakingAnimation();
-                        resolve();
-                    });
-            }
-        });
+    async playAudio(base64Audio, meta = {}) {
+        // Queued behind any reply still playing; resolves when this one has finished
+        try {
+            await this.player.enqueue(base64Audio, meta);
+        } catch (error) {
+            console.error('Audio playback error:', error);
+            this.stopSpeakingAnimation();
+        }
+    }
+
+    sendPlaybackEvent(event, meta, delayMs = 0) {
+        // Lets the server measure transcript-to-playback latency per turn
+        if (!meta.turn || this.watchToken || !this.ws || this.ws.readyState !== WebSocket.OPEN) return;
+        this.ws.send(JSON.stringify({
+            type: 'playback',
+            event: event,
+            turn: meta.turn,
+            delay_ms: Math.round(delayMs)
+        }));
     }
     
     startSpeakingAnimation() {
@@ -296,11 +546,18 @@ class VCAgentClient {
         messageDiv.appendChild(avatar);
         messageDiv.appendChild(content);
         
+        if (sender === 'vc') {
+            this.lastVcText = text;
+        }
+        
         this.messagesContainer.appendChild(messageDiv);
         this.messagesContainer.scrollTop = this.messagesContainer.scrollHeight;
     }
 
     resetConversation() {
+        // The old pitch's reply should not keep talking over the new one
+        this.player.stop();
+        this.pendingAudio = null;
         if (this.ws && this.ws.readyState === WebSocket.OPEN) {
             this.ws.send(JSON.stringify({ type: 'reset' }));
         }
@@ -312,6 +569,21 @@ class VCAgentClient {
         this.statusText.textContent = text;
     }
 
+    reportPageTiming() {
+        // Once per page load: how long until the founder could start pitching
+        if (this.pageTimingSent || !navigator.sendBeacon) return;
+        this.pageTimingSent = true;
+        const nav = performance.getEntriesByType('navigation')[0];
+        const assets = performance.getEntriesByType('resource')
+            .filter((entry) => entry.name.includes('/static/'));
+        navigator.sendBeacon('/api/page-timing', JSON.stringify({
+            ready_ms: performance.now(),
+            dom_ms: nav ? nav.domContentLoadedEventEnd : null,
+            transfer_bytes: assets.reduce((sum, entry) => sum + (entry.transferSize || 0), 0),
+            cached: assets.length > 0 && assets.every((entry) => entry.transferSize === 0)
+        }));
+    }
+
     setupAvatar(embedUrl, avatarType) {
         // Skip D-ID/HeyGen - we're using free animated avatar instead
         // This function is kept for backwards compatibility but won't be called
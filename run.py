@@ -1,17 +1,23 @@
 #!/usr/bin/env python3
 """
 Entry point for running the VC Investor Voice Agent server
+
+Set WORKERS > 1 to run several worker processes (see backend/launcher.py).
 """
 import uvicorn
-from backend.main import app
+import config
 
 if __name__ == "__main__":
     import os
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(
-        "backend.main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=False  # Disable reload in production
-    )
-
+    if config.WORKERS > 1:
+        from backend.launcher import run_workers
+        run_workers(host=config.HOST, port=port, workers=config.WORKERS, mode=config.WORKER_MODE)
+    else:
+        uvicorn.run(
+            "backend.main:app",
+            host=config.HOST,
+            port=port,
+            reload=False,  # Disable reload in production
+            timeout_graceful_shutdown=int(config.DRAIN_TIMEOUT)
+        )